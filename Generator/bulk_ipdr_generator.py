@@ -0,0 +1,245 @@
+# generators/bulk_ipdr_generator.py
+import csv
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from models.user_model import UserModel
+from models.ipdr_model import IPDRModel
+from app.core.config import settings
+
+NIGHT_SERVICES = ["WhatsApp", "Instagram", "YouTube"]
+DAY_SERVICES = ["WhatsApp", "Facebook", "YouTube", "Gmail", "Banking"]
+CONTACT_SERVICES = ["WhatsApp", "Telegram"]
+# First octets outside the private, loopback, link-local and shared ranges
+PUBLIC_FIRST_OCTETS = np.array([octet for octet in range(1, 224) if octet not in (10, 100, 127, 169, 172, 192)])
+
+
+class _Ragged:
+    """Variable-length lists flattened into one array, for vectorized random picks per row."""
+
+    def __init__(self, lists: List[List]):
+        self.counts = np.array([len(values) for values in lists], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)[:-1])).astype(np.int64)
+        self.values = np.array([value for values in lists for value in values], dtype=object)
+
+    def pick(self, rng: np.random.Generator, owners: np.ndarray) -> np.ndarray:
+        """One random element of each owner's list. Owners must have non-empty lists."""
+        choice = (rng.random(len(owners)) * self.counts[owners]).astype(np.int64)
+        return self.values[self.offsets[owners] + choice]
+
+
+class BulkIPDRGenerator:
+    """
+    High-throughput counterpart of RealisticIPDRGenerator for load testing.
+
+    Follows the same rules (active hours, night/day services, contact
+    B-parties, suspicious overrides) but draws each hour's records as NumPy
+    arrays from precomputed per-hour active-user indexes and writes them to
+    CSV directly, without per-row IPDRModel objects or validation. Hours do
+    not overlap and rows are sorted within each hour, so output is time-ordered.
+    Output is reproducible for a given seed and user list.
+    """
+
+    def __init__(self, users: List[UserModel], time_window_hours: int = 24, records_per_hour: int = 100,
+                 start_time: Optional[datetime] = None, seed: Optional[int] = None):
+        self.users = users
+        self.time_window_hours = time_window_hours
+        self.records_per_hour = records_per_hour
+        self.total_records = time_window_hours * records_per_hour
+        self.start_time = start_time or datetime.now() - timedelta(hours=time_window_hours)
+        self.rng = np.random.default_rng(seed)
+
+        # Filled in while writing
+        self.record_count = 0
+        self.suspicious_count = 0
+        self.service_counts: Counter = Counter()
+
+        self._index_users()
+        self._index_services()
+
+    def _index_users(self):
+        users = self.users
+        self.aadhaar = np.array([u.AadhaarNo for u in users], dtype=object)
+        self.phone = np.array([u.PhoneNo for u in users], dtype=object)
+        self.isp = np.array([u.ISP for u in users], dtype=object)
+        self.city_code = np.array([u.City[:3].upper() for u in users], dtype=object)
+        self.home_lat = np.array([u.HomeLocation["lat"] for u in users])
+        self.home_lng = np.array([u.HomeLocation["lng"] for u in users])
+        self.devices = _Ragged([u.Devices for u in users])
+        self.ips = _Ragged([u.AssignedIPs for u in users])
+        self.large_transfers = np.array([u.IsSuspicious and "large_transfers" in u.SuspiciousType for u in users])
+        self.suspicious_destinations = np.array(
+            [u.IsSuspicious and "suspicious_destinations" in u.SuspiciousType for u in users])
+
+        # Hour of day -> users active then (everyone if nobody is), and each user's position in that list
+        everyone = np.arange(len(users))
+        self.active_by_hour: List[np.ndarray] = []
+        self.active_position = np.full((24, len(users)), -1, dtype=np.int64)
+        for hour in range(24):
+            active = np.array([i for i, u in enumerate(users) if hour in u.UsualActiveHours], dtype=np.int64)
+            self.active_position[hour, active] = np.arange(len(active))
+            self.active_by_hour.append(active if len(active) else everyone)
+        self.contacts_by_hour = [np.flatnonzero(self.active_position[hour] >= 0) for hour in range(24)]
+
+    def _index_services(self):
+        services = settings.GENERATOR_SERVICES
+        self.service_names = np.array(list(services), dtype=object)
+        service_id = {name: i for i, name in enumerate(services)}
+        self.night_services = np.array([service_id[name] for name in NIGHT_SERVICES])
+        self.day_services = np.array([service_id[name] for name in DAY_SERVICES])
+        self.contact_services = np.array([service_id[name] for name in CONTACT_SERVICES])
+
+        details = list(services.values())
+        self.protocol = np.array([d["protocol"] for d in details], dtype=object)
+        self.data_type = np.array([d["data_type"] for d in details], dtype=object)
+        self.upload_max = np.array([d["data_usage"][0] for d in details], dtype=np.int64)
+        self.download_max = np.array([d["data_usage"][1] for d in details], dtype=np.int64)
+        self.ports = _Ragged([d["ports"] or [443] for d in details])
+        servers = [settings.GENERATOR_SERVICE_SERVERS.get(d["name"], []) for d in details]
+        self.has_servers = np.array([bool(s) for s in servers])
+        self.servers = _Ragged([s or [""] for s in servers])
+
+    def _random_public_ips(self, count: int) -> List[str]:
+        rng = self.rng
+        first = rng.choice(PUBLIC_FIRST_OCTETS, count)
+        rest = rng.integers(0, 256, (count, 2))
+        last = rng.integers(1, 255, count)
+        return [f"{a}.{b}.{c}.{d}" for a, (b, c), d in zip(first.tolist(), rest.tolist(), last.tolist())]
+
+    def _record_ids(self, count: int) -> List[str]:
+        """Random version 4 UUID strings, with the version and variant bits set in bulk."""
+        raw = np.frombuffer(self.rng.bytes(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        digits = raw.tobytes().hex()
+        return [f"{digits[i:i + 8]}-{digits[i + 8:i + 12]}-{digits[i + 12:i + 16]}-"
+                f"{digits[i + 16:i + 20]}-{digits[i + 20:i + 32]}" for i in range(0, 32 * count, 32)]
+
+    def _pick_contacts(self, users: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        """Another user active at the same hour for each row, or -1 when there is none."""
+        contacts = np.full(len(users), -1, dtype=np.int64)
+        for hour in np.unique(hours):
+            rows = np.flatnonzero(hours == hour)
+            pool = self.contacts_by_hour[hour]
+            own_position = self.active_position[hour, users[rows]]
+            available = len(pool) - (own_position >= 0)
+            ok = available > 0
+            # Draw among the others by skipping over the user's own slot
+            draw = (self.rng.random(len(rows)) * np.maximum(available, 1)).astype(np.int64)
+            draw += (own_position >= 0) & (draw >= own_position)
+            contacts[rows[ok]] = pool[np.minimum(draw[ok], len(pool) - 1)] if len(pool) else -1
+        return contacts
+
+    def _generate_hour(self, hour: int) -> Dict[str, Any]:
+        rng = self.rng
+        n = self.records_per_hour
+
+        offsets = np.sort(rng.integers(0, 60, n) * 60 + rng.integers(0, 60, n))
+        start = np.datetime64(self.start_time, "us") + np.timedelta64(hour * 3600, "s")
+        start_times = start + offsets.astype("timedelta64[s]")
+        hour_of_day = start_times.astype("datetime64[h]").astype(np.int64) % 24
+
+        users = np.empty(n, dtype=np.int64)
+        for hod in np.unique(hour_of_day):
+            rows = np.flatnonzero(hour_of_day == hod)
+            pool = self.active_by_hour[hod]
+            users[rows] = pool[rng.integers(0, len(pool), len(rows))]
+
+        night = (hour_of_day >= 22) | (hour_of_day <= 6)
+        services = np.where(night, self.night_services[rng.integers(0, len(self.night_services), n)],
+                            self.day_services[rng.integers(0, len(self.day_services), n)])
+
+        durations = np.where(rng.random(n) < 0.3, rng.integers(300, 1801, n), rng.integers(30, 301, n))
+        end_times = start_times + durations.astype("timedelta64[s]")
+
+        # B-party: a contact's IP for some IM sessions, else a service server or a random public IP
+        destinations = self.servers.pick(rng, services)
+        ports = self.ports.pick(rng, services)
+        no_server = np.flatnonzero(~self.has_servers[services])
+        destinations[no_server] = self._random_public_ips(len(no_server))
+        contact_rows = np.flatnonzero(np.isin(services, self.contact_services) & (rng.random(n) < 0.3))
+        if len(contact_rows) and len(self.users) > 1:
+            contacts = self._pick_contacts(users[contact_rows], hour_of_day[contact_rows])
+            found = contacts >= 0
+            contact_rows = contact_rows[found]
+            destinations[contact_rows] = self.ips.pick(rng, contacts[found])
+            ports[contact_rows] = 443
+
+        up_max, down_max = self.upload_max[services], self.download_max[services]
+        uploads = rng.integers((up_max * 0.1).astype(np.int64), up_max + 1)
+        downloads = rng.integers((down_max * 0.1).astype(np.int64), down_max + 1)
+
+        large = self.large_transfers[users]
+        uploads[large] = rng.integers(100_000_000, 1_000_000_001, int(large.sum()))
+        redirected = self.suspicious_destinations[users]
+        destinations[redirected] = rng.choice(np.array(settings.GENERATOR_SUSPICIOUS_IPS, dtype=object),
+                                              int(redirected.sum()))
+        suspicious = large | redirected
+        flags = np.where(large & redirected, "Large data transfer|Suspicious destination",
+                         np.where(large, "Large data transfer", np.where(redirected, "Suspicious destination", "")))
+
+        angle = rng.uniform(0, 2 * math.pi, n)
+        distance = rng.uniform(0, 0.05, n)
+        lats = np.round(self.home_lat[users] + distance * np.cos(angle), 6).tolist()
+        lngs = np.round(self.home_lng[users] + distance * np.sin(angle), 6).tolist()
+
+        record_ids = self._record_ids(n)
+        towers = [f"CT{code}{number}" for code, number in
+                  zip(self.city_code[users].tolist(), rng.integers(1000, 10000, n).tolist())]
+        lacs = [f"LAC{number}" for number in rng.integers(1000, 10000, n).tolist()]
+        service_names = self.service_names[services]
+
+        self.record_count += n
+        self.suspicious_count += int(suspicious.sum())
+        names, counts = np.unique(services, return_counts=True)
+        self.service_counts.update(dict(zip(self.service_names[names].tolist(), counts.tolist())))
+
+        return {
+            "RecordID": record_ids, "AadhaarNo": self.aadhaar[users].tolist(),
+            "IMEI": self.devices.pick(rng, users).tolist(), "MSISDN": self.phone[users].tolist(),
+            "StartTime": start_times, "EndTime": end_times, "Duration": durations.tolist(),
+            "SourceIP": self.ips.pick(rng, users).tolist(), "SourcePort": rng.integers(1024, 65536, n).tolist(),
+            "DestinationIP": destinations.tolist(), "DestinationPort": ports.tolist(),
+            "Protocol": self.protocol[services].tolist(), "BytesUpload": uploads.tolist(),
+            "BytesDownload": downloads.tolist(), "Service": service_names.tolist(), "AppName": service_names.tolist(),
+            "ISP": self.isp[users].tolist(), "CellTowerID": towers, "LAC": lacs, "SessionType": ["Data"] * n,
+            "DataType": self.data_type[services].tolist(),
+            "Location": [f"{lat},{lng}" for lat, lng in zip(lats, lngs)],
+            "IsSuspicious": suspicious.tolist(), "SuspiciousFlags": flags.tolist(), "ConnectionQuality": ["Good"] * n,
+        }
+
+    def iter_hours(self) -> Iterator[Dict[str, Any]]:
+        """
+        Generates the window one hour at a time, resetting the counts first.
+        Each hour is a dict of equal-length column lists keyed by IPDRModel
+        field; StartTime and EndTime are datetime64[us] arrays.
+        """
+        self.record_count = self.suspicious_count = 0
+        self.service_counts = Counter()
+        for hour in range(self.time_window_hours):
+            yield self._generate_hour(hour)
+
+    def _csv_rows(self, columns: Dict[str, Any]) -> Iterator[tuple]:
+        unit = "us" if self.start_time.microsecond else "s"
+        columns = {**columns, **{name: columns[name].astype(f"datetime64[{unit}]").astype(str).tolist()
+                                 for name in ("StartTime", "EndTime")}}
+        return zip(*(columns[name] for name in IPDRModel.__fields__))
+
+    def save_to_csv(self, filename: str = "ipdr_records.csv") -> int:
+        """
+        Generate the whole window hour by hour, appending each hour to the
+        CSV as it is drawn. Returns the number of records written.
+        """
+        print(f"Generating {self.total_records} IPDR records for a {self.time_window_hours}h window (bulk mode)...")
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(IPDRModel.__fields__.keys())
+            for columns in self.iter_hours():
+                writer.writerows(self._csv_rows(columns))
+        print(f"✅ Generated {self.record_count} records ({self.suspicious_count} suspicious)")
+        print(f"✅ IPDR records saved to {filename}")
+        return self.record_count
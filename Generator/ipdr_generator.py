@@ -3,8 +3,9 @@ import csv
 import random
 import uuid
 import math
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
 from faker import Faker
 
 from models.user_model import UserModel
@@ -13,14 +14,35 @@ from app.core.config import settings
 
 fake = Faker("en_IN")
 
+# Window start of seeded runs, so their timestamps do not depend on when they were generated
+SEEDED_WINDOW_START = datetime(2025, 1, 1)
+
 class RealisticIPDRGenerator:
-    def __init__(self, users: List[UserModel], time_window_hours: int = 24, records_per_hour: int = 100):
+    """
+    Generates IPDR records for `users` over a time window.
+
+    By default all records are generated up front and kept in `self.records`.
+    With `stream=True` nothing is kept: `save_to_csv` generates the window
+    hour by hour and writes each hour as soon as it is drawn, so memory stays
+    flat however long the window is. Either way the record, suspicious and
+    per-service counts accumulate as records are generated.
+    """
+
+    def __init__(self, users: List[UserModel], time_window_hours: int = 24, records_per_hour: int = 100,
+                 start_time: Optional[datetime] = None, stream: bool = False):
         self.users = users
         self.time_window_hours = time_window_hours
         self.records_per_hour = records_per_hour
+        # Defaults to the window ending now; pass a fixed start for reproducible datasets
+        self.start_time = start_time or datetime.now() - timedelta(hours=time_window_hours)
         self.total_records = time_window_hours * records_per_hour
+        self.stream = stream
         self.records: List[IPDRModel] = []
-        self._generate_time_based_records()
+        self.record_count = 0
+        self.suspicious_count = 0
+        self.service_counts: Counter = Counter()
+        if not stream:
+            self._generate_time_based_records()
 
     def _get_realistic_b_party(self, a_user: UserModel, service: str, timestamp: datetime) -> Tuple[str, int]:
         if service in ["WhatsApp", "Telegram"] and random.random() < 0.3 and len(self.users) > 1:
@@ -54,7 +76,7 @@ class RealisticIPDRGenerator:
         download = random.randint(int(base_down * 0.1), base_down)
         
         record = IPDRModel(
-            RecordID=str(uuid.uuid4()), AadhaarNo=user.AadhaarNo, IMEI=random.choice(user.Devices),
+            RecordID=str(uuid.UUID(int=random.getrandbits(128), version=4)), AadhaarNo=user.AadhaarNo, IMEI=random.choice(user.Devices),
             MSISDN=user.PhoneNo, StartTime=timestamp, EndTime=timestamp + timedelta(seconds=duration),
             Duration=duration, SourceIP=random.choice(user.AssignedIPs),
             SourcePort=random.randint(1024, 65535), DestinationIP=dest_ip, DestinationPort=dest_port,
@@ -81,32 +103,55 @@ class RealisticIPDRGenerator:
             return random.choice(["WhatsApp", "Instagram", "YouTube"])
         return random.choice(["WhatsApp", "Facebook", "YouTube", "Gmail", "Banking"])
 
+    def _generate_hour(self, hour: int) -> List[IPDRModel]:
+        """Records of one hour of the window, sorted by start time."""
+        hour_start = self.start_time + timedelta(hours=hour)
+        records = []
+        for _ in range(self.records_per_hour):
+            record_time = hour_start + timedelta(minutes=random.randint(0, 59), seconds=random.randint(0, 59))
+            active_users = [u for u in self.users if record_time.hour in u.UsualActiveHours] or self.users
+            user = random.choice(active_users)
+            records.append(self._generate_record(user, record_time))
+
+        # Hours do not overlap, so sorting each hour keeps the whole window in time order
+        records.sort(key=lambda r: r.StartTime)
+        self.record_count += len(records)
+        self.suspicious_count += sum(1 for r in records if r.IsSuspicious)
+        self.service_counts.update(r.Service for r in records)
+        return records
+
+    def iter_hours(self) -> Iterator[List[IPDRModel]]:
+        """Generates the window one hour at a time, resetting the counts first."""
+        self.record_count = self.suspicious_count = 0
+        self.service_counts = Counter()
+        for hour in range(self.time_window_hours):
+            yield self._generate_hour(hour)
+
     def _generate_time_based_records(self):
         print(f"Generating {self.total_records} IPDR records for a {self.time_window_hours}h window...")
-        start_time = datetime.now() - timedelta(hours=self.time_window_hours)
-        
-        for hour in range(self.time_window_hours):
-            hour_start = start_time + timedelta(hours=hour)
-            for _ in range(self.records_per_hour):
-                record_time = hour_start + timedelta(minutes=random.randint(0, 59), seconds=random.randint(0, 59))
-                active_users = [u for u in self.users if record_time.hour in u.UsualActiveHours] or self.users
-                user = random.choice(active_users)
-                self.records.append(self._generate_record(user, record_time))
+        for records in self.iter_hours():
+            self.records.extend(records)
+        print(f"✅ Generated {self.record_count} records ({self.suspicious_count} suspicious)")
 
-        self.records.sort(key=lambda r: r.StartTime)
-        suspicious_count = sum(1 for r in self.records if r.IsSuspicious)
-        print(f"✅ Generated {len(self.records)} records ({suspicious_count} suspicious)")
+    @staticmethod
+    def _to_row(record: IPDRModel) -> dict:
+        row = record.dict()
+        row['StartTime'] = record.StartTime.isoformat()
+        row['EndTime'] = record.EndTime.isoformat()
+        row['Location'] = f"{row['Location'].get('lat', 0)},{row['Location'].get('lng', 0)}"
+        row['SuspiciousFlags'] = '|'.join(record.SuspiciousFlags)
+        return row
 
     def save_to_csv(self, filename: str = "ipdr_records.csv"):
         with open(filename, 'w', newline='', encoding='utf-8') as f:
             fieldnames = IPDRModel.__fields__.keys()
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
-            for record in self.records:
-                row = record.dict()
-                row['StartTime'] = record.StartTime.isoformat()
-                row['EndTime'] = record.EndTime.isoformat()
-                row['Location'] = f"{row['Location'].get('lat', 0)},{row['Location'].get('lng', 0)}"
-                row['SuspiciousFlags'] = '|'.join(record.SuspiciousFlags)
-                writer.writerow(row)
-        print(f"✅ IPDR records saved to {filename}")
\ No newline at end of file
+            if self.stream:
+                print(f"Streaming {self.total_records} IPDR records for a {self.time_window_hours}h window...")
+                for records in self.iter_hours():
+                    writer.writerows(self._to_row(record) for record in records)
+                print(f"✅ Generated {self.record_count} records ({self.suspicious_count} suspicious)")
+            else:
+                writer.writerows(self._to_row(record) for record in self.records)
+        print(f"✅ IPDR records saved to {filename}")
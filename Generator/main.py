@@ -1,17 +1,28 @@
 # main.py
 import sys
 import os
+import random
 from datetime import datetime
+from typing import Optional
+from faker import Faker
 
 # Add project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from user_generator import RealisticUserGenerator
-from ipdr_generator import RealisticIPDRGenerator
+from ipdr_generator import RealisticIPDRGenerator, SEEDED_WINDOW_START
+from bulk_ipdr_generator import BulkIPDRGenerator
+from sharded_generator import ShardedIPDRGenerator
 
-def generate_realistic_investigation_data(hours: int = 24, users_count: int = 100, records_per_hour: int = 100, suspicious_ratio: float = 0.1):
+def generate_realistic_investigation_data(hours: int = 24, users_count: int = 100, records_per_hour: int = 100, suspicious_ratio: float = 0.1, bulk: bool = False, stream: bool = False, parallel: bool = False, seed: Optional[int] = None):
     """
     Generates a realistic IPDR dataset for investigation.
+    With `bulk`, IPDR records are drawn with the vectorized BulkIPDRGenerator
+    and streamed to CSV, for load-testing volumes. With `stream`, the regular
+    generator writes records hour by hour instead of holding them all in memory.
+    With `parallel`, the time window is generated in shards across worker
+    processes. `seed` makes the users and the record draws reproducible, and
+    starts the window at SEEDED_WINDOW_START so timestamps are too.
     """
     print("🚀 Generating Realistic Investigation Dataset")
     print(f"   Time Window: {hours} hours")
@@ -20,6 +31,12 @@ def generate_realistic_investigation_data(hours: int = 24, users_count: int = 10
     print(f"   Total Records: {hours * records_per_hour}")
     print("-" * 50)
     
+    start_time = None
+    if seed is not None:
+        random.seed(seed)
+        Faker.seed(seed)
+        start_time = SEEDED_WINDOW_START
+
     # Step 1: Generate Users
     print("\n👥 Generating user profiles...")
     user_generator = RealisticUserGenerator(
@@ -29,11 +46,31 @@ def generate_realistic_investigation_data(hours: int = 24, users_count: int = 10
     
     # Step 2: Generate IPDR Records
     print("\n📊 Generating IPDR records...")
-    ipdr_generator = RealisticIPDRGenerator(
-        users=user_generator.users,
-        time_window_hours=hours,
-        records_per_hour=records_per_hour
-    )
+    if parallel:
+        ipdr_generator = ShardedIPDRGenerator(
+            users=user_generator.users,
+            time_window_hours=hours,
+            records_per_hour=records_per_hour,
+            start_time=start_time,
+            seed=seed,
+            bulk=bulk
+        )
+    elif bulk:
+        ipdr_generator = BulkIPDRGenerator(
+            users=user_generator.users,
+            time_window_hours=hours,
+            records_per_hour=records_per_hour,
+            start_time=start_time,
+            seed=seed
+        )
+    else:
+        ipdr_generator = RealisticIPDRGenerator(
+            users=user_generator.users,
+            time_window_hours=hours,
+            records_per_hour=records_per_hour,
+            start_time=start_time,
+            stream=stream
+        )
     
     # Step 3: Save Data
     print("\n💾 Saving generated data...")
@@ -61,13 +98,14 @@ def generate_realistic_investigation_data(hours: int = 24, users_count: int = 10
 
 def generate_data_summary(user_gen, ipdr_gen, hours, filename):
     """Generates a summary of the generated data."""
+    total_records, suspicious_records = ipdr_gen.record_count, ipdr_gen.suspicious_count
     with open(filename, 'w', encoding='utf-8') as f:
         f.write("REALISTIC IPDR DATASET SUMMARY\n")
         f.write("=" * 50 + "\n\n")
         
         f.write("📊 DATASET STATISTICS\n")
         f.write(f"Time Window: {hours} hours\n")
-        f.write(f"Total Records: {len(ipdr_gen.records):,}\n")
+        f.write(f"Total Records: {total_records:,}\n")
         f.write(f"Total Users: {len(user_gen.users)}\n\n")
         
         # User breakdown
@@ -76,19 +114,14 @@ def generate_data_summary(user_gen, ipdr_gen, hours, filename):
         f.write(f"Suspicious Users: {suspicious_users}\n\n")
 
         # Record breakdown
-        suspicious_records = len([r for r in ipdr_gen.records if r.IsSuspicious])
-        f.write(f"Normal Records: {len(ipdr_gen.records) - suspicious_records:,}\n")
+        f.write(f"Normal Records: {total_records - suspicious_records:,}\n")
         f.write(f"Suspicious Records: {suspicious_records:,}\n\n")
         
         # Service breakdown
         f.write("📱 SERVICE USAGE BREAKDOWN\n")
         f.write("-" * 30 + "\n")
-        services = {}
-        for record in ipdr_gen.records:
-            services[record.Service] = services.get(record.Service, 0) + 1
-        
-        for service, count in sorted(services.items(), key=lambda x: x[1], reverse=True):
-            percentage = (count / len(ipdr_gen.records)) * 100
+        for service, count in ipdr_gen.service_counts.most_common():
+            percentage = (count / total_records) * 100
             f.write(f"{service}: {count:,} records ({percentage:.1f}%)\n")
         f.write("\n")
 
@@ -102,8 +135,11 @@ def interactive_data_generation():
     print("2. Development Dataset (24 hours, 100 users, 10% suspicious)")
     print("3. Large Dataset (168 hours, 500 users, 8% suspicious)")
     print("4. Custom Configuration")
+    print("5. Load-test Dataset (bulk mode: 168 hours, 2,000 users, 1.68M records)")
+    print("6. Soak-test Dataset (streaming: 720 hours, 500 users, 8% suspicious)")
+    print("7. Parallel Load-test Dataset (sharded bulk mode: 720 hours, 5,000 users, 7.2M records, seed 42)")
     
-    choice = input("\nSelect option (1-4): ").strip()
+    choice = input("\nSelect option (1-7): ").strip()
     
     if choice == "1":
         generate_realistic_investigation_data(hours=1, users_count=50, records_per_hour=50, suspicious_ratio=0.2)
@@ -121,6 +157,15 @@ def interactive_data_generation():
         except ValueError:
             print("❌ Invalid input! Using development preset.")
             generate_realistic_investigation_data()
+    elif choice == "5":
+        generate_realistic_investigation_data(hours=168, users_count=2000, records_per_hour=10000,
+                                              suspicious_ratio=0.08, bulk=True)
+    elif choice == "6":
+        generate_realistic_investigation_data(hours=720, users_count=500, records_per_hour=200,
+                                              suspicious_ratio=0.08, stream=True)
+    elif choice == "7":
+        generate_realistic_investigation_data(hours=720, users_count=5000, records_per_hour=10000,
+                                              suspicious_ratio=0.08, bulk=True, parallel=True, seed=42)
     else:
         print("❌ Invalid choice! Using development preset.")
         generate_realistic_investigation_data()
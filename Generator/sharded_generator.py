@@ -0,0 +1,133 @@
+# generators/sharded_generator.py
+import contextlib
+import io
+import os
+import random
+import shutil
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from faker import Faker
+
+from models.user_model import UserModel
+from ipdr_generator import RealisticIPDRGenerator
+from bulk_ipdr_generator import BulkIPDRGenerator
+from app.core.config import settings
+
+# Per-process user list for shard workers, set up by _init_shard_worker
+_worker_users: List[UserModel] = []
+
+
+def shard_seed(master_seed: int, shard: int) -> int:
+    """Seed of one shard, derived from the master seed so shards draw independent streams."""
+    return int(np.random.SeedSequence(master_seed, spawn_key=(shard,)).generate_state(1)[0])
+
+
+def _init_shard_worker(users: List[UserModel]):
+    """Ship the user list to each worker once instead of with every shard."""
+    global _worker_users
+    _worker_users = users
+
+
+def _generate_shard(task: Tuple[datetime, int, int, int, bool, str]) -> Dict[str, Any]:
+    """Write one shard's records to `path`, returning its counts."""
+    start_time, hours, records_per_hour, seed, bulk, path = task
+    # Keep the per-shard progress lines of the generators out of the parent's output
+    with contextlib.redirect_stdout(io.StringIO()):
+        if bulk:
+            generator = BulkIPDRGenerator(_worker_users, hours, records_per_hour, start_time=start_time, seed=seed)
+        else:
+            random.seed(seed)
+            Faker.seed(seed)
+            generator = RealisticIPDRGenerator(_worker_users, hours, records_per_hour, start_time=start_time,
+                                               stream=True)
+        generator.save_to_csv(path)
+    return {"records": generator.record_count, "suspicious": generator.suspicious_count,
+            "services": dict(generator.service_counts)}
+
+
+class ShardedIPDRGenerator:
+    """
+    Generates the time window in fixed-size shards across worker processes.
+
+    The window is cut into GENERATOR_SHARD_HOURS-long shards. Each shard is
+    generated in a worker with a seed derived from the master seed and
+    written to its own CSV. The shards are then concatenated in order, and
+    since they cover consecutive hours the result stays time-ordered. Output
+    depends on the seed, shard size and start time, never on the worker
+    count, so a seeded run with a fixed `start_time` is byte-identical.
+
+    `bulk` picks BulkIPDRGenerator for shards, otherwise the streaming
+    RealisticIPDRGenerator is used.
+    """
+
+    def __init__(self, users: List[UserModel], time_window_hours: int = 24, records_per_hour: int = 100,
+                 start_time: Optional[datetime] = None, seed: Optional[int] = None, workers: Optional[int] = None,
+                 shard_hours: Optional[int] = None, bulk: bool = True):
+        self.users = users
+        self.time_window_hours = time_window_hours
+        self.records_per_hour = records_per_hour
+        self.total_records = time_window_hours * records_per_hour
+        self.start_time = start_time or datetime.now() - timedelta(hours=time_window_hours)
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self.workers = workers or settings.GENERATOR_WORKERS or os.cpu_count() or 1
+        self.shard_hours = shard_hours or settings.GENERATOR_SHARD_HOURS
+        self.bulk = bulk
+
+        # Filled in while writing
+        self.record_count = 0
+        self.suspicious_count = 0
+        self.service_counts: Counter = Counter()
+
+    def _shards(self, directory: str) -> List[Tuple[datetime, int, int, int, bool, str]]:
+        tasks = []
+        for shard, first_hour in enumerate(range(0, self.time_window_hours, self.shard_hours)):
+            hours = min(self.shard_hours, self.time_window_hours - first_hour)
+            tasks.append((self.start_time + timedelta(hours=first_hour), hours, self.records_per_hour,
+                          shard_seed(self.seed, shard), self.bulk, os.path.join(directory, f"shard_{shard:05d}.csv")))
+        return tasks
+
+    def _run(self, tasks: List[Tuple]) -> List[Dict[str, Any]]:
+        workers = min(self.workers, len(tasks))
+        if workers <= 1:
+            _init_shard_worker(self.users)
+            return [_generate_shard(task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker,
+                                 initargs=(self.users,)) as executor:
+            return list(executor.map(_generate_shard, tasks))
+
+    def save_to_csv(self, filename: str = "ipdr_records.csv") -> int:
+        """
+        Generate every shard and merge them into `filename`. Returns the
+        number of records written.
+        """
+        directory = tempfile.mkdtemp(prefix=".shards_", dir=os.path.dirname(os.path.abspath(filename)))
+        try:
+            tasks = self._shards(directory)
+            print(f"Generating {self.total_records} IPDR records for a {self.time_window_hours}h window in "
+                  f"{len(tasks)} shards across {min(self.workers, len(tasks))} workers (seed {self.seed})...")
+            results = self._run(tasks)
+
+            self.record_count = sum(result["records"] for result in results)
+            self.suspicious_count = sum(result["suspicious"] for result in results)
+            self.service_counts = Counter()
+            for result in results:
+                self.service_counts.update(result["services"])
+
+            with open(filename, 'wb') as merged:
+                for i, task in enumerate(tasks):
+                    with open(task[-1], 'rb') as shard:
+                        header = shard.readline()
+                        if i == 0:
+                            merged.write(header)
+                        shutil.copyfileobj(shard, merged, 1024 * 1024)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        print(f"✅ Generated {self.record_count} records ({self.suspicious_count} suspicious)")
+        print(f"✅ IPDR records saved to {filename}")
+        return self.record_count
@@ -56,6 +56,36 @@ class Settings(BaseSettings):
         description="Database connection URL. Supports SQLite and PostgreSQL."
     )
     
+    IPDR_READ_MODE: str = Field(
+        default="database",
+        description="Where bulk IPDR analytics read from: 'database' or 'columnar' (Parquet snapshot, requires pyarrow)"
+    )
+    
+    IPDR_PARTITIONING: str = Field(
+        default="none",
+        description="Time partitioning of IPDR log storage: 'none', 'day' or 'week'"
+    )
+    
+    IPDR_STORAGE_LAYOUT: str = Field(
+        default="text",
+        description="Physical IPDR log layout: 'text' or 'compact' (packed IPs, dictionary-coded categoricals, real lat/long)"
+    )
+    
+    COLUMNAR_EXPORT_PATH: str = Field(
+        default="data/columnar/ipdr",
+        description="Directory of the day-partitioned Parquet snapshot written by export-columnar"
+    )
+    
+    BENCH_DATA_PATH: str = Field(
+        default="data/bench",
+        description="Directory where `bench` caches its generated datasets, one per size and seed"
+    )
+    
+    BENCH_RESULTS_PATH: str = Field(
+        default="reports/bench",
+        description="Directory of the JSON results written by `bench`"
+    )
+    
     # =============================================================================
     # Application Configuration
     # =============================================================================
@@ -87,6 +117,16 @@ class Settings(BaseSettings):
         description="Optional log file path. If None, uses default log directory"
     )
     
+    METRICS_EXPORT: bool = Field(
+        default=True,
+        description="Write ingest and query metrics as a Prometheus text file when a command exits"
+    )
+    
+    METRICS_PATH: str = Field(
+        default="logs",
+        description="Directory for the ipdr_<command>.prom metrics files (point a node_exporter textfile collector here)"
+    )
+    
     # =============================================================================
     # Data Processing Configuration
     # =============================================================================
@@ -126,6 +166,21 @@ class Settings(BaseSettings):
         description="Maximum depth for network analysis to prevent infinite loops"
     )
     
+    NETWORK_HUB_FANOUT_CAP: int = Field(
+        default=1000,
+        description="Destination IPs contacted by more users than this are treated as hubs (CDNs, messaging servers). 0 disables the cap"
+    )
+    
+    NETWORK_COTEMPORAL_WINDOW_MINUTES: int = Field(
+        default=5,
+        description="Sessions of two users to the same destination within the same window count as co-temporal"
+    )
+    
+    NETWORK_HUB_POLICY: str = Field(
+        default="skip",
+        description="How network analysis treats hub IPs: 'skip' ignores them, 'downweight' only links their heaviest users"
+    )
+    
     # =============================================================================
     # Performance Configuration
     # =============================================================================
@@ -136,7 +191,43 @@ class Settings(BaseSettings):
     
     QUERY_TIMEOUT_SECONDS: int = Field(
         default=30,
-        description="Database query timeout in seconds"
+        description="Seconds SQLite waits for a competing writer's lock before failing. 0 disables it"
+    )
+    
+    POSTGRES_STATEMENT_TIMEOUT_SECONDS: int = Field(
+        default=0,
+        description="PostgreSQL statement_timeout in seconds for every connection. 0 (default) leaves statements "
+                    "unbounded, since COPY batches, index rebuilds and storage migrations run long"
+    )
+    
+    POSTGRES_COPY: bool = Field(
+        default=True,
+        description="Load CSVs into PostgreSQL with COPY FROM STDIN instead of INSERT batches"
+    )
+    
+    COPY_BATCH_SIZE: int = Field(
+        default=50_000,
+        description="Rows streamed per COPY batch (and per commit) when loading into PostgreSQL"
+    )
+    
+    DB_PERFORMANCE_PROFILE: str = Field(
+        default="balanced",
+        description="Engine tuning: 'off' (driver defaults), 'balanced' (WAL, pooled) or 'bulk' (fastest ingest, relaxed durability)"
+    )
+    
+    ANALYSIS_CHUNK_SIZE: int = Field(
+        default=500_000,
+        description="Number of IPDR rows pulled per chunk by the vectorized suspicious scoring pass"
+    )
+    
+    INCREMENTAL_SCORING: bool = Field(
+        default=True,
+        description="Score suspicious users from per-user aggregates kept at ingest, re-evaluating only users changed since the last run"
+    )
+    
+    REPORT_WORKERS: Optional[int] = Field(
+        default=None,
+        description="Worker processes used to build the suspicious analysis report. None uses every CPU core"
     )
     
     # =============================================================================
@@ -245,6 +336,16 @@ class Settings(BaseSettings):
         },
         description="Server IPs for external services"
     )
+    
+    GENERATOR_WORKERS: Optional[int] = Field(
+        default=None,
+        description="Worker processes used by sharded IPDR generation. None uses every CPU core"
+    )
+    
+    GENERATOR_SHARD_HOURS: int = Field(
+        default=24,
+        description="Hours of the time window generated per shard by sharded IPDR generation"
+    )
 
     # =============================================================================
     # Geolocation Configuration
@@ -253,6 +354,26 @@ class Settings(BaseSettings):
         default="data/geoip/GeoLite2-City.mmdb",
         description="Path to the GeoIP database file"
     )
+    
+    GEOIP_CACHE_SIZE: int = Field(
+        default=50_000,
+        description="Maximum number of IP lookups (including negative results) kept in the in-process LRU cache"
+    )
+    
+    GEOIP_PERSISTENT_CACHE: bool = Field(
+        default=True,
+        description="Persist GeoIP lookups in the project database so repeat runs skip MMDB lookups"
+    )
+    
+    GEOIP_CACHE_TTL_DAYS: int = Field(
+        default=30,
+        description="Persistent GeoIP cache entries older than this are ignored and looked up again"
+    )
+    
+    GEOIP_LOOKUP_WORKERS: int = Field(
+        default=8,
+        description="Number of threads used by batched GeoIP lookups"
+    )
 
     # =============================================================================
     # Pydantic Configuration
@@ -346,6 +467,101 @@ class Settings(BaseSettings):
         if v < 1 or v > 5:
             raise ValueError('Network analysis depth must be between 1 and 5')
         return v
+    
+    @validator('NETWORK_HUB_POLICY')
+    def validate_hub_policy(cls, v):
+        """
+        Validate the hub IP handling policy for network analysis.
+        
+        Args:
+            v (str): Hub policy name
+            
+        Returns:
+            str: Validated and normalized policy
+            
+        Raises:
+            ValueError: If policy is not supported
+        """
+        v_lower = v.lower()
+        if v_lower not in ('skip', 'downweight'):
+            raise ValueError("Network hub policy must be 'skip' or 'downweight'")
+        return v_lower
+
+    @validator('IPDR_READ_MODE')
+    def validate_read_mode(cls, v):
+        """
+        Validate the IPDR analytics read mode.
+        
+        Args:
+            v (str): Read mode name
+            
+        Returns:
+            str: Validated and normalized read mode
+            
+        Raises:
+            ValueError: If read mode is not supported
+        """
+        v_lower = v.lower()
+        if v_lower not in ('database', 'columnar'):
+            raise ValueError("IPDR read mode must be 'database' or 'columnar'")
+        return v_lower
+
+    @validator('IPDR_PARTITIONING')
+    def validate_partitioning(cls, v):
+        """
+        Validate the IPDR storage partitioning granularity.
+        
+        Args:
+            v (str): Partitioning granularity
+            
+        Returns:
+            str: Validated and normalized granularity
+            
+        Raises:
+            ValueError: If granularity is not supported
+        """
+        v_lower = v.lower()
+        if v_lower not in ('none', 'day', 'week'):
+            raise ValueError("IPDR partitioning must be 'none', 'day' or 'week'")
+        return v_lower
+
+    @validator('IPDR_STORAGE_LAYOUT')
+    def validate_storage_layout(cls, v):
+        """
+        Validate the IPDR log storage layout.
+        
+        Args:
+            v (str): Layout name
+            
+        Returns:
+            str: Validated and normalized layout name
+            
+        Raises:
+            ValueError: If layout is not supported
+        """
+        v_lower = v.lower()
+        if v_lower not in ('text', 'compact'):
+            raise ValueError("IPDR storage layout must be 'text' or 'compact'")
+        return v_lower
+
+    @validator('DB_PERFORMANCE_PROFILE')
+    def validate_performance_profile(cls, v):
+        """
+        Validate the database performance profile.
+        
+        Args:
+            v (str): Profile name
+            
+        Returns:
+            str: Validated and normalized profile name
+            
+        Raises:
+            ValueError: If profile is not supported
+        """
+        v_lower = v.lower()
+        if v_lower not in ('off', 'balanced', 'bulk'):
+            raise ValueError("Database performance profile must be 'off', 'balanced' or 'bulk'")
+        return v_lower
 
 # =============================================================================
 # Global Settings Instance
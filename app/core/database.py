@@ -1,18 +1,89 @@
 # app/core/database.py
+from typing import Any, Dict
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
 from app.core.config import settings
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+# SQLite pragmas set on every new connection, per DB_PERFORMANCE_PROFILE.
+# WAL lets the suspicious scan read while an ingest writes; "bulk" also skips
+# fsyncs, trading durability on power loss for ingest speed.
+SQLITE_PRAGMAS: Dict[str, Dict[str, Any]] = {
+    "off": {},
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative means KiB, i.e. 64 MB
+        "temp_store": "MEMORY",
+    },
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "mmap_size": 1024 * 1024 * 1024,
+        "cache_size": -256 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _engine_options(url: str, profile: str) -> Dict[str, Any]:
+    """create_engine keyword arguments for the given URL and performance profile."""
+    if _is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+    if profile == "off":
+        return {}
+
+    options: Dict[str, Any] = {
+        "pool_size": settings.CONNECTION_POOL_SIZE,
+        "max_overflow": settings.CONNECTION_POOL_SIZE * 2,
+        "pool_use_lifo": True,  # Reuse warm connections and let idle extras time out
+    }
+    # Opt-in only: bulk loads, rebuilds and migrations share these connections and run long
+    if settings.POSTGRES_STATEMENT_TIMEOUT_SECONDS and url.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.POSTGRES_STATEMENT_TIMEOUT_SECONDS * 1000}"}
+    return options
+
+def _apply_sqlite_pragmas(engine, profile: str):
+    """Register a connect hook that sets the profile's pragmas on each new SQLite connection."""
+    pragmas = dict(SQLITE_PRAGMAS[profile])
+    if not pragmas:
+        return
+    if settings.QUERY_TIMEOUT_SECONDS:
+        # Wait for a competing writer instead of failing with "database is locked"
+        pragmas["busy_timeout"] = settings.QUERY_TIMEOUT_SECONDS * 1000
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def build_engine():
+    """
+    Create a database engine from settings, tuned by DB_PERFORMANCE_PROFILE.
+    Worker processes call this to get their own connection pool instead of
+    sharing the parent's connections across a fork.
+    """
+    profile = settings.DB_PERFORMANCE_PROFILE
+    engine = create_engine(
+        settings.DATABASE_URL,
+        echo=False,  # Set to True only for debugging SQL queries
+        pool_pre_ping=True,  # Verify connections before use
+        pool_recycle=3600,   # Recycle connections every hour
+        **_engine_options(settings.DATABASE_URL, profile)
+    )
+    if _is_sqlite(settings.DATABASE_URL):
+        _apply_sqlite_pragmas(engine, profile)
+    return engine
+
 # Create the database engine with improved configuration
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=False,  # Set to True only for debugging SQL queries
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
-    pool_pre_ping=True,  # Verify connections before use
-    pool_recycle=3600    # Recycle connections every hour
-)
+engine = build_engine()
 
 def get_session():
     """
@@ -40,9 +111,25 @@ def init_db():
         # Import all models here so they are registered with SQLModel
         from app.models.user_model import UserModel
         from app.models.ipdr_log_model import IPDRLogModel
+        from app.models.user_destination_model import UserDestinationModel
+        from app.models.geoip_cache_model import GeoIPCacheModel
+        from app.models.ipdr_partition_model import IPDRPartitionModel
+        from app.models.ipdr_dimension_model import IPDRDimensionModel
+        from app.models.user_activity_model import UserActivityModel, UserServiceUsageModel, ScoringStateModel
+        from app.models.user_rollup_model import (
+            UserDailyRollupModel, UserDestinationDailyRollupModel, UserServiceDailyRollupModel
+        )
+        from app.models.index_state_model import IndexStateModel
         
         # Create all tables
         SQLModel.metadata.create_all(engine)
+        ensure_scoring_state()
+        ensure_index_state()
+        
+        if settings.IPDR_STORAGE_LAYOUT == "compact":
+            ensure_compact_storage()
+        if settings.IPDR_PARTITIONING != "none":
+            ensure_partitioned_storage()
         
         logger.info("Database initialized successfully.")
         logger.info(f"Database URL: {settings.DATABASE_URL}")
@@ -51,6 +138,139 @@ def init_db():
         logger.error(f"Failed to initialize database: {str(e)}")
         raise
 
+def ensure_partitioned_storage():
+    """
+    Switch an empty IPDR log table to time-partitioned storage so partitions
+    are created automatically at ingest. Existing logs are left in place and
+    need an explicit `python main.py partition` migration.
+    """
+    from sqlmodel import select
+    from app.models.ipdr_log_model import IPDRLogModel
+    from app.crud.ipdr_partition_crud import IPDRPartitionCRUD
+
+    partitions = IPDRPartitionCRUD()
+    with Session(engine) as session:
+        if partitions.is_active(session):
+            return
+        if session.exec(select(IPDRLogModel.id).limit(1)).first() is None:
+            partitions.enable(session)
+            logger.info(f"IPDR logs will be stored in {settings.IPDR_PARTITIONING} partitions.")
+        else:
+            logger.warning("IPDR_PARTITIONING is set but existing logs are in a single table. "
+                           "Run `python main.py partition` to migrate them.")
+
+def ensure_scoring_state():
+    """
+    Mark the per-user activity aggregates complete on a database without IPDR
+    logs, so ingest keeps them exact from the first batch. Databases that
+    already hold logs get them rebuilt by the first suspicious scoring run.
+    """
+    from sqlmodel import select
+    from app.models.ipdr_log_model import IPDRLogModel
+    from app.crud.user_activity_crud import UserActivityCRUD
+
+    activity = UserActivityCRUD()
+    with Session(engine) as session:
+        if activity.get_state(session) is not None:
+            return
+        if session.exec(select(IPDRLogModel.AadhaarNo).limit(1)).first() is None:
+            activity.reset(session)
+            session.commit()
+
+def ensure_index_state():
+    """
+    Mark the user ↔ destination index and the daily rollups complete on a
+    database without IPDR logs, so ingest keeps them exact from the first
+    batch. Databases that already hold logs get them rebuilt on first use.
+    """
+    from sqlmodel import select
+    from app.models.ipdr_log_model import IPDRLogModel
+    from app.crud.user_destination_crud import UserDestinationCRUD
+    from app.crud.user_rollup_crud import UserRollupCRUD
+
+    with Session(engine) as session:
+        if session.exec(select(IPDRLogModel.AadhaarNo).limit(1)).first() is not None:
+            return
+        for index in (UserDestinationCRUD(), UserRollupCRUD()):
+            if not index.is_complete(session):
+                index.reset(session)
+        session.commit()
+
+def ensure_compact_storage():
+    """
+    Convert an empty text-layout IPDR log table to the compact layout.
+    Existing logs are left in place and need an explicit
+    `python main.py compact-storage` conversion.
+    """
+    from app.crud.ipdr_compact_crud import IPDRCompactStorageCRUD
+
+    compact = IPDRCompactStorageCRUD()
+    with Session(engine) as session:
+        if compact.is_active(session):
+            return
+        if not compact.has_logs(session) and not compact.partitions.is_active(session):
+            compact.enable(session)
+            logger.info("IPDR logs will be stored in the compact layout.")
+        else:
+            logger.warning("IPDR_STORAGE_LAYOUT is compact but existing logs use the text layout. "
+                           "Run `python main.py compact-storage` to convert them.")
+
+def create_indexes():
+    """
+    Create any declared model indexes that are missing on an existing database.
+    `create_all` skips indexes of tables that already exist, so databases
+    created before an index was declared need this instead of a reload.
+
+    Returns:
+        List of index names that were created.
+    """
+    from sqlalchemy import inspect
+    from app.models.user_model import UserModel
+    from app.models.ipdr_log_model import IPDRLogModel
+    from app.models.user_destination_model import UserDestinationModel
+    from app.models.user_activity_model import UserActivityModel
+    from app.crud.ipdr_partition_crud import IPDRPartitionCRUD
+
+    created = []
+    inspector = inspect(engine)
+    tables = [UserModel.__table__, UserDestinationModel.__table__, UserActivityModel.__table__]
+    partitions = IPDRPartitionCRUD()
+    with Session(engine) as session:
+        # Partitioned logs carry their indexes on each partition table
+        if partitions.is_active(session):
+            tables.extend(partitions.get_tables(session))
+        else:
+            tables.append(IPDRLogModel.__table__)
+
+    for table in tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                continue
+            logger.info(f"Creating index {index.name} on {table.name}...")
+            index.create(engine)
+            created.append(index.name)
+    return created
+
+def get_performance_profile() -> Dict[str, Any]:
+    """
+    The active performance profile and the settings actually in effect,
+    read back from a live connection where the database reports them.
+    """
+    from sqlmodel import text
+
+    profile: Dict[str, Any] = {"name": settings.DB_PERFORMANCE_PROFILE, "dialect": engine.dialect.name}
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            for pragma in ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout"):
+                profile[pragma] = conn.execute(text(f"PRAGMA {pragma}")).scalar()
+        elif engine.dialect.name == "postgresql":
+            profile["statement_timeout"] = conn.execute(text("SHOW statement_timeout")).scalar()
+    pool = engine.pool
+    if hasattr(pool, "size"):
+        profile["pool_size"] = pool.size()
+    return profile
+
 def check_db_connection():
     """
     Check if database connection is working.
@@ -0,0 +1,243 @@
+# app/core/metrics.py
+"""
+In-process metrics written as a Prometheus text-format file at command exit.
+
+The CLI is short-lived, so nothing is served: `main.py` writes one
+``ipdr_<command>.prom`` file per command under METRICS_PATH for a
+node_exporter textfile collector to pick up. Every series carries a
+``command`` label so files from different commands never collide.
+Counters therefore describe one run, not a lifetime total.
+"""
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self, extra: Dict[str, str]) -> List[str]:
+        raise NotImplementedError
+
+    def render(self, extra: Dict[str, str]) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        return lines + self.samples(extra)
+
+    def _labels(self, key: LabelValues, extra: Dict[str, str], more: Tuple[Tuple[str, str], ...] = ()) -> str:
+        names = list(extra) + list(self.labelnames) + [name for name, _ in more]
+        values = list(extra.values()) + list(key) + [value for _, value in more]
+        return _format_labels(names, values)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self, extra: Dict[str, str]) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key, extra)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that is set rather than accumulated."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self, extra: Dict[str, str]) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key, extra)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self, extra: Dict[str, str]) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = self._labels(key, extra, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key, extra)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{self._labels(key, extra)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of this process and their text-format rendering."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, extra_labels: Optional[Dict[str, str]] = None) -> str:
+        extra = dict(extra_labels or {})
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render(extra))
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str, extra_labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Write all metrics to `path`, replacing it atomically so a collector
+        never reads a half-written file.
+
+        Returns:
+            The path written.
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        temporary.write_text(self.render(extra_labels), encoding="utf-8")
+        os.replace(temporary, target)
+        return str(target)
+
+
+registry = MetricsRegistry()
+
+# Ingest
+ROWS_INGESTED = registry.counter(
+    "ipdr_rows_ingested_total", "Rows loaded from CSV files into the database", ("table",))
+ROWS_REJECTED = registry.counter(
+    "ipdr_rows_rejected_total", "CSV rows that failed to parse or insert", ("table",))
+
+# Queries
+CRUD_QUERY_SECONDS = registry.histogram(
+    "ipdr_crud_query_duration_seconds", "Latency of CRUD methods", ("crud", "method"))
+
+# Analysis
+GEOIP_CACHE_LOOKUPS = registry.counter(
+    "ipdr_geoip_cache_lookups_total", "GeoIP lookup cache hits and misses", ("result",))
+USERS_SCORED = registry.counter(
+    "ipdr_users_scored_total", "Users with activity scored by the suspicious-user rules")
+USERS_FLAGGED = registry.counter(
+    "ipdr_users_flagged_total", "Users flagged by at least one suspicious-user rule")
+NETWORK_NODES_EXPANDED = registry.counter(
+    "ipdr_network_nodes_expanded_total", "Users expanded by the network cluster BFS", ("depth",))
+
+# Command
+COMMAND_DURATION = registry.gauge(
+    "ipdr_command_duration_seconds", "Wall time of the last run of the command")
+COMMAND_SUCCESS = registry.gauge(
+    "ipdr_command_success", "1 if the last run of the command succeeded, else 0")
+COMMAND_LAST_RUN = registry.gauge(
+    "ipdr_command_last_run_timestamp_seconds", "Unix time the last run of the command finished")
+
+
+def observe_query(func: Callable) -> Callable:
+    """Decorator recording a CRUD method's latency, labelled with its class and method name."""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            CRUD_QUERY_SECONDS.observe(time.perf_counter() - started,
+                                       crud=type(self).__name__, method=func.__name__)
+    return wrapper
+
+
+def write_command_metrics(command: str, duration: float, succeeded: bool, directory: str) -> str:
+    """
+    Record the command outcome and write the registry to
+    ``<directory>/ipdr_<command>.prom``.
+
+    Returns:
+        The path written.
+    """
+    COMMAND_DURATION.set(duration)
+    COMMAND_SUCCESS.set(1 if succeeded else 0)
+    COMMAND_LAST_RUN.set(time.time())
+    file_name = f"ipdr_{command.replace('-', '_')}.prom"
+    return registry.write_textfile(str(Path(directory) / file_name), {"command": command})
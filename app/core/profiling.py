@@ -0,0 +1,186 @@
+# app/core/profiling.py
+"""
+Lightweight timing spans for `--profile` runs.
+
+Code marks phases with ``with span("name"):``. Spans nest by call stack and
+repeated spans under the same parent (parser batches, BFS levels) are merged,
+counting calls. While profiling is enabled every SQL statement is counted
+against the innermost open span via a SQLAlchemy engine event. When it is
+disabled, ``span`` returns a shared no-op context manager.
+
+Spans opened in worker processes are not collected; the parent span still
+covers their wall time.
+"""
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class Span:
+    """Accumulated wall time, call count and SQL statements of one phase."""
+
+    __slots__ = ("name", "seconds", "calls", "queries", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.queries = 0  # statements issued directly inside this span
+        self.children: Dict[str, "Span"] = {}
+
+    def child(self, name: str) -> "Span":
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = Span(name)
+        return node
+
+    @property
+    def total_queries(self) -> int:
+        return self.queries + sum(child.total_queries for child in self.children.values())
+
+    @property
+    def self_seconds(self) -> float:
+        return max(0.0, self.seconds - sum(child.seconds for child in self.children.values()))
+
+
+class _ActiveSpan:
+    __slots__ = ("name", "node", "token", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> Span:
+        self.node = (_current.get() or _root).child(self.name)
+        self.token = _current.set(self.node)
+        self.started = time.perf_counter()
+        return self.node
+
+    def __exit__(self, exc_type, exc, tb):
+        self.node.seconds += time.perf_counter() - self.started
+        self.node.calls += 1
+        _current.reset(self.token)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+_enabled = False
+_root = Span("total")
+_current: ContextVar[Optional[Span]] = ContextVar("profiling_span", default=None)
+_started = 0.0
+_profiler: Optional[cProfile.Profile] = None
+
+
+def span(name: str):
+    """Context manager timing the enclosed block as phase `name` when profiling is enabled."""
+    return _ActiveSpan(name) if _enabled else _NO_SPAN
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def profiled(name: str) -> Callable:
+    """Decorator timing every call of the function as phase `name`."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    (_current.get() or _root).queries += 1
+
+
+def enable(name: str = "total", dump: bool = False):
+    """
+    Start collecting spans and SQL counts under a root span called `name`.
+    With `dump`, also run cProfile and tracemalloc until `finish`.
+    """
+    global _enabled, _root, _started, _profiler
+    _root = Span(name)
+    _enabled = True
+    if not event.contains(Engine, "before_cursor_execute", _count_query):
+        event.listen(Engine, "before_cursor_execute", _count_query)
+    if dump:
+        tracemalloc.start()
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    _started = time.perf_counter()
+
+
+def finish(log_dir: str = "logs") -> List[str]:
+    """
+    Stop profiling and write the cProfile stats and tracemalloc top
+    allocations to `log_dir` if they were collected.
+
+    Returns:
+        Paths of the files written.
+    """
+    global _enabled, _profiler
+    _root.seconds = time.perf_counter() - _started
+    _root.calls = 1
+    _enabled = False
+    event.remove(Engine, "before_cursor_execute", _count_query)
+    if _profiler is None:
+        return []
+
+    _profiler.disable()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    directory = Path(log_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = directory / f"profile_{datetime.now():%Y%m%d_%H%M%S}"
+    paths = [f"{stem}.pstats", f"{stem}_pstats.txt", f"{stem}_tracemalloc.txt", f"{stem}_spans.txt"]
+
+    _profiler.dump_stats(paths[0])
+    summary = io.StringIO()
+    pstats.Stats(_profiler, stream=summary).sort_stats("cumulative").print_stats(50)
+    Path(paths[1]).write_text(summary.getvalue(), encoding="utf-8")
+
+    top = snapshot.statistics("lineno")[:25]
+    Path(paths[2]).write_text("\n".join(str(stat) for stat in top) + "\n", encoding="utf-8")
+    Path(paths[3]).write_text(report() + "\n", encoding="utf-8")
+    _profiler = None
+    return paths
+
+
+def report() -> str:
+    """Breakdown tree of the collected spans."""
+    total = _root.seconds or 1e-9
+    lines = [
+        f"{'Phase':<48}{'Total (s)':>11}{'Self (s)':>10}{'%':>7}{'Calls':>8}{'SQL':>8}",
+        "-" * 92,
+    ]
+
+    def walk(node: Span, depth: int):
+        label = ("  " * depth + node.name)[:47]
+        lines.append(f"{label:<48}{node.seconds:>11.3f}{node.self_seconds:>10.3f}"
+                     f"{node.seconds / total:>7.1%}{node.calls:>8}{node.total_queries:>8}")
+        for child in node.children.values():
+            walk(child, depth + 1)
+
+    walk(_root, 0)
+    return "\n".join(lines)
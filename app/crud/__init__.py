@@ -2,9 +2,26 @@
 # app/crud/__init__.py
 from app.crud.user_crud import UserCRUD
 from app.crud.ipdr_crud import IPDRLogCRUD
+from app.crud.user_destination_crud import UserDestinationCRUD
+from app.crud.user_activity_crud import UserActivityCRUD
+from app.crud.user_rollup_crud import UserRollupCRUD
+from app.crud.geoip_cache_crud import GeoIPCacheCRUD
+from app.crud.ipdr_partition_crud import IPDRPartitionCRUD
+from app.crud.ipdr_compact_crud import IPDRCompactStorageCRUD
 
 # Create singleton instances for dependency injection
 user_crud = UserCRUD()
 ipdr_crud = IPDRLogCRUD()
+user_destination_crud = UserDestinationCRUD()
+user_activity_crud = UserActivityCRUD()
+user_rollup_crud = UserRollupCRUD()
+geoip_cache_crud = GeoIPCacheCRUD()
+ipdr_partition_crud = IPDRPartitionCRUD()
+ipdr_compact_crud = IPDRCompactStorageCRUD()
 
-__all__ = ["user_crud", "ipdr_crud", "UserCRUD", "IPDRLogCRUD"]
\ No newline at end of file
+__all__ = [
+    "user_crud", "ipdr_crud", "user_destination_crud", "geoip_cache_crud", "ipdr_partition_crud",
+    "ipdr_compact_crud", "user_activity_crud", "user_rollup_crud",
+    "UserCRUD", "IPDRLogCRUD", "UserDestinationCRUD", "GeoIPCacheCRUD", "IPDRPartitionCRUD",
+    "IPDRCompactStorageCRUD", "UserActivityCRUD", "UserRollupCRUD"
+]
\ No newline at end of file
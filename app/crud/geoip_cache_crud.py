@@ -0,0 +1,60 @@
+# app/crud/geoip_cache_crud.py
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+from sqlmodel import Session, select
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.geoip_cache_model import GeoIPCacheModel
+from app.crud.base import BaseCRUD
+
+
+class GeoIPCacheCRUD(BaseCRUD[GeoIPCacheModel]):
+    """
+    CRUD operations for the persistent GeoIP lookup cache.
+    Overrides read to use IPAddress as the primary key.
+    """
+
+    def __init__(self):
+        super().__init__(GeoIPCacheModel)
+
+    def read(self, session: Session, ip_address: str) -> Optional[GeoIPCacheModel]:
+        """Override base read method to use IPAddress as primary key."""
+        return session.get(GeoIPCacheModel, ip_address)
+
+    def get_recent(
+        self,
+        session: Session,
+        limit: int,
+        cached_after: Optional[datetime] = None
+    ) -> List[GeoIPCacheModel]:
+        """Get the most recently cached entries, optionally ignoring ones older than `cached_after`."""
+        statement = select(GeoIPCacheModel)
+        if cached_after is not None:
+            statement = statement.where(GeoIPCacheModel.CachedAt >= cached_after)
+        statement = statement.order_by(GeoIPCacheModel.CachedAt.desc()).limit(limit)
+        return session.exec(statement).all()
+
+    def bulk_upsert(self, session: Session, rows: List[Dict[str, Any]]) -> int:
+        """Insert or refresh a batch of cache entries in one statement and commit once."""
+        if not rows:
+            return 0
+
+        table = GeoIPCacheModel.__table__
+        dialect = session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            statement = dialect_insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.IPAddress],
+                set_={c.name: statement.excluded[c.name] for c in table.columns if c.name != "IPAddress"}
+            )
+            session.execute(statement, rows)
+        else:
+            for row in rows:
+                existing = self.read(session, row["IPAddress"])
+                if existing:
+                    session.delete(existing)
+            session.flush()
+            session.execute(insert(table), rows)
+        session.commit()
+        return len(rows)
@@ -0,0 +1,20 @@
+# app/crud/index_state.py
+"""
+Completeness markers of the tables derived from the IPDR logs (see IndexStateModel).
+
+A derived table's contents cannot tell whether it is complete: a database
+loaded before the table existed is left partly filled by the first batch
+ingested afterwards. So completeness is recorded explicitly when the table
+is built or emptied along with the logs.
+"""
+from sqlmodel import Session
+from app.models.index_state_model import IndexStateModel
+
+
+def is_complete(session: Session, name: str) -> bool:
+    return session.get(IndexStateModel, name) is not None
+
+
+def mark_complete(session: Session, name: str):
+    """Record that the `name` table reflects every IPDR log. Does not commit."""
+    session.merge(IndexStateModel(Name=name))
@@ -0,0 +1,181 @@
+# app/crud/ipdr_compact_crud.py
+from typing import List, Dict, Any, Optional
+from sqlmodel import Session, select
+from sqlalchemy import MetaData, Table, event, func, insert, inspect, text
+from sqlalchemy.types import _Binary
+from app.models.ipdr_log_model import IPDRLogModel, COMPACT_STORAGE, DICTIONARY_COLUMNS
+from app.models.ipdr_dimension_model import IPDRDimensionModel
+from app.models.compact_types import dimension_registry
+from app.crud.base import BaseCRUD
+from app.crud.ipdr_partition_crud import IPDRPartitionCRUD
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# SmallInteger codes
+MAX_DIMENSION_CODE = 32767
+
+
+class IPDRCompactStorageCRUD(BaseCRUD[IPDRDimensionModel]):
+    """
+    Dimension values and layout migration for compact IPDR storage.
+
+    In the compact layout IPs are stored packed and the DICTIONARY_COLUMNS
+    as codes into ipdrdimensionmodel. Values must be registered here before
+    rows using them are written; reads decode through the shared registry.
+    """
+
+    MIGRATION_CHUNK_SIZE = 50_000
+
+    # The physical table already uses the compact layout, keyed by database URL
+    _active: Dict[str, bool] = {}
+
+    def __init__(self):
+        super().__init__(IPDRDimensionModel)
+        self.partitions = IPDRPartitionCRUD()
+
+    def register(self, session: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Make sure every dictionary-column value in `rows` has a code, inserting
+        new dimension rows in the session's transaction. Does not commit.
+
+        Returns:
+            Number of new dimension values.
+        """
+        if not COMPACT_STORAGE or not rows:
+            return 0
+
+        table = IPDRDimensionModel.__table__
+        added = 0
+        for name in DICTIONARY_COLUMNS:
+            missing = {row[name] for row in rows if row.get(name) is not None} - dimension_registry.known_values(name, session.connection())
+            if not missing:
+                continue
+
+            # Values registered earlier in this transaction are only visible through the session
+            existing = session.execute(
+                select(table.c.Code, table.c.Value).where(table.c.Name == name, table.c.Value.in_(missing))
+            ).all()
+            for code, value in existing:
+                dimension_registry.add(name, value, code)
+            missing -= {value for _, value in existing}
+            if not missing:
+                continue
+
+            next_code = session.execute(
+                select(func.coalesce(func.max(table.c.Code), 0)).where(table.c.Name == name)
+            ).scalar() + 1
+            if next_code + len(missing) > MAX_DIMENSION_CODE:
+                raise ValueError(f"Too many distinct {name} values for a dictionary-encoded column")
+
+            new_rows = [{"Name": name, "Code": next_code + i, "Value": value} for i, value in enumerate(sorted(missing))]
+            session.execute(insert(table), new_rows)
+            for row in new_rows:
+                dimension_registry.add(name, row["Value"], row["Code"])
+            added += len(new_rows)
+        return added
+
+    def get_values(self, session: Session, name: str) -> Dict[int, str]:
+        """Code -> value map of one dimension."""
+        table = IPDRDimensionModel.__table__
+        return dict(session.execute(select(table.c.Code, table.c.Value).where(table.c.Name == name)).all())
+
+    # =========================================================================
+    # Layout
+    # =========================================================================
+    @staticmethod
+    def _cache_key(session: Session) -> str:
+        return str(session.get_bind().url)
+
+    def is_active(self, session: Session) -> bool:
+        """Whether the stored IPDR logs already use the compact layout."""
+        key = self._cache_key(session)
+        if key not in self._active:
+            self._active[key] = self._physical_layout_is_compact(session)
+        return self._active[key]
+
+    def _physical_layout_is_compact(self, session: Session) -> bool:
+        inspector = inspect(session.connection())
+        if self.partitions.is_active(session):
+            partitions = self.partitions.get_partitions(session)
+            if not partitions:
+                # New partitions are created from the model, so nothing is stored in another layout
+                return True
+            table_name = partitions[0].TableName
+        else:
+            table_name = IPDRLogModel.__table__.name
+        columns = {c["name"]: c["type"] for c in inspector.get_columns(table_name)}
+        return isinstance(columns.get("SourceIP"), _Binary)
+
+    def has_logs(self, session: Session) -> bool:
+        return session.exec(select(IPDRLogModel.id).limit(1)).first() is not None
+
+    @staticmethod
+    def _to_compact(row: Dict[str, Any]) -> Dict[str, Any]:
+        values = {key: value for key, value in row.items() if key != "Location"}
+        values.update(IPDRLogModel.location_values(row.get("Location") or {}))
+        return values
+
+    def enable(self, session: Session) -> Dict[str, int]:
+        """
+        Rewrite a text-layout ipdrlogmodel table in the compact layout,
+        keeping log ids. Runs in one transaction and commits.
+
+        Returns:
+            Dict with the number of rows converted and dimension values created.
+
+        Raises:
+            ValueError: If the compact layout is not configured or logs are partitioned.
+        """
+        if not COMPACT_STORAGE:
+            raise ValueError("Set IPDR_STORAGE_LAYOUT=compact before converting IPDR storage.")
+        if self.is_active(session):
+            return {"rows": 0, "dimension_values": 0}
+        if self.partitions.is_active(session):
+            raise ValueError("Partitioned IPDR logs cannot be converted in place. "
+                             "Convert to the compact layout before running `partition`.")
+
+        base = IPDRLogModel.__table__
+        conn = session.connection()
+        legacy = Table(base.name, MetaData(), autoload_with=conn)
+        # Index names are schema-wide, so the old ones must go before the new table is created
+        for index in legacy.indexes:
+            index.drop(conn)
+        legacy_name = f"{base.name}_legacy"
+        session.execute(text(f"ALTER TABLE {base.name} RENAME TO {legacy_name}"))
+        legacy = Table(legacy_name, MetaData(), autoload_with=conn)
+        base.create(conn)
+
+        converted = added = 0
+        last_id: Optional[int] = 0
+        while True:
+            rows = conn.execute(
+                select(legacy).where(legacy.c.id > last_id).order_by(legacy.c.id).limit(self.MIGRATION_CHUNK_SIZE)
+            ).mappings().all()
+            if not rows:
+                break
+            values = [self._to_compact(dict(row)) for row in rows]
+            added += self.register(session, values)
+            session.execute(insert(base), values)
+            converted += len(values)
+            last_id = rows[-1]["id"]
+            logger.info(f"Converted {converted} IPDR logs to the compact layout...")
+
+        legacy.drop(conn)
+        if conn.dialect.name == "postgresql":
+            # Rows kept their ids, so move the new id sequence past them
+            session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{base.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {base.name}), 0) + 1, false)"
+            ))
+        session.commit()
+        self._active[self._cache_key(session)] = True
+        logger.info(f"Converted {converted} IPDR logs to the compact layout ({added} dimension values).")
+        return {"rows": converted, "dimension_values": added}
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_dimensions(session, previous_transaction):
+    """Dimension values registered in a rolled-back transaction never reached the database."""
+    if COMPACT_STORAGE:
+        dimension_registry.invalidate()
@@ -1,11 +1,22 @@
 # app/crud/ipdr_crud.py
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from sqlmodel import Session, select, and_, or_, func
+from sqlalchemy import insert, update
 from app.models.ipdr_log_model import IPDRLogModel
 from app.crud.base import BaseCRUD
+from app.crud.user_destination_crud import UserDestinationCRUD
+from app.crud.user_activity_crud import UserActivityCRUD
+from app.crud.user_rollup_crud import UserRollupCRUD
+from app.crud.ipdr_partition_crud import IPDRPartitionCRUD
+from app.crud.ipdr_compact_crud import IPDRCompactStorageCRUD
+from app.crud.pg_copy import supports_copy, copy_rows
+from app.core.metrics import observe_query
 from sqlalchemy.orm.attributes import flag_modified
 
+# Log columns the user ↔ destination index, activity aggregates and rollups are derived from
+INDEXED_COLUMNS = {"AadhaarNo", "StartTime", "Duration", "DestinationIP", "BytesUpload", "BytesDownload", "Service"}
+
 
 class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
     """
@@ -13,11 +24,147 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
     
     This class handles database operations for IPDR (Internet Protocol
     Detail Records) logs, including specialized queries for network analysis.
+    When time-partitioned storage is enabled, writes and time-window reads
+    are routed to the partition tables (see IPDRPartitionCRUD). In the compact
+    storage layout, writes register new dimension values first (see
+    IPDRCompactStorageCRUD).
     """
     
     def __init__(self):
         super().__init__(IPDRLogModel)
+        self.destination_index = UserDestinationCRUD()
+        self.activity_index = UserActivityCRUD()
+        self.rollups = UserRollupCRUD()
+        self.partitions = IPDRPartitionCRUD()
+        self.compact = IPDRCompactStorageCRUD()
+    
+    @observe_query
+    def insert_rows(self, session: Session, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert plain column dicts into the log table or its partitions. Does not commit.
+        On PostgreSQL the rows are streamed with COPY instead of an INSERT batch.
+        """
+        self.compact.register(session, rows)
+        if self.partitions.is_active(session):
+            self.partitions.insert_rows(session, rows)
+        elif supports_copy(session):
+            copy_rows(session, IPDRLogModel.__table__, rows)
+        else:
+            session.execute(insert(IPDRLogModel.__table__), rows)
+    
+    @observe_query
+    def bulk_insert(self, session: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert a batch of plain column dicts with a single executemany and
+        commit once. Bypasses ORM object construction entirely.
+        The user ↔ destination index, the per-user activity aggregates and
+        the daily rollups are updated in the same transaction.
+        """
+        if not rows:
+            return 0
+        self.insert_rows(session, rows)
+        self.apply_index_increments(session, rows)
+        session.commit()
+        return len(rows)
+
+    def apply_index_increments(self, session: Session, rows: List[Dict[str, Any]]) -> None:
+        """
+        Fold freshly inserted log column dicts into every table derived from
+        the logs: the user ↔ destination index, the per-user activity
+        aggregates and the daily rollups. Does not commit.
+        """
+        self.destination_index.apply_increments(session, rows)
+        self.activity_index.apply_increments(session, rows)
+        self.rollups.apply_increments(session, rows)
+
+    def subtract_index_log(self, session: Session, log: IPDRLogModel) -> None:
+        """
+        Remove a stored log from every table derived from the logs, before it
+        is changed or deleted. The stored row is read back so exactly what
+        was counted is subtracted. Does not commit.
+        """
+        if self.partitions.is_active(session):
+            table = self.partitions.get_table_for(session, log.StartTime)
+        else:
+            table = IPDRLogModel.__table__
+        stored = select(table).where(table.c.id == log.id).subquery()
+        self.destination_index.subtract_logs(session, stored)
+        self.activity_index.subtract_logs(session, stored)
+        self.rollups.subtract_logs(session, stored)
+    
+    @observe_query
+    def create(self, session: Session, obj_in: IPDRLogModel) -> IPDRLogModel:
+        """
+        Create a single log, routed to its partition when storage is partitioned.
+        The derived tables are updated in the same transaction.
+        """
+        if not self.partitions.is_active(session):
+            self.compact.register(session, [obj_in.model_dump()])
+            session.add(obj_in)
+            self.apply_index_increments(session, [obj_in.model_dump()])
+            session.commit()
+            session.refresh(obj_in)
+            return obj_in
+        row = obj_in.model_dump(exclude={"id"})
+        (log_id,) = self.partitions.insert_rows(session, [row])
+        self.apply_index_increments(session, [row])
+        session.commit()
+        return self.read(session, log_id)
+    
+    @observe_query
+    def update(self, session: Session, db_obj: IPDRLogModel, obj_in: Dict[str, Any]) -> IPDRLogModel:
+        """
+        Update a log, writing through to its partition when storage is partitioned;
+        a new StartTime outside that partition moves the log to the covering one.
+        Changes to INDEXED_COLUMNS move the log's counts in the derived tables
+        in the same transaction.
+        """
+        self.compact.register(session, [obj_in])
+        reindex = not INDEXED_COLUMNS.isdisjoint(obj_in)
+        if reindex:
+            self.subtract_index_log(session, db_obj)
+        if self.partitions.is_active(session):
+            table = self.partitions.get_table_for(session, db_obj.StartTime)
+            target = self.partitions.get_table_for(session, obj_in.get("StartTime", db_obj.StartTime))
+            if target is None or target.name != table.name:
+                self.partitions.move_row(session, db_obj.id, db_obj.StartTime, obj_in)
+            else:
+                session.execute(update(table).where(table.c.id == db_obj.id).values(**obj_in))
+        else:
+            for field, value in obj_in.items():
+                setattr(db_obj, field, value)
+            session.add(db_obj)
+        if reindex:
+            self.apply_index_increments(session, [{**db_obj.model_dump(), **obj_in}])
+        session.commit()
+        session.refresh(db_obj)
+        return db_obj
+    
+    @observe_query
+    def delete(self, session: Session, id: Any) -> Optional[IPDRLogModel]:
+        """
+        Delete a log, from its partition when storage is partitioned, and
+        subtract it from the derived tables in the same transaction.
+        """
+        obj = self.read(session, id)
+        if obj:
+            self.subtract_index_log(session, obj)
+            if self.partitions.is_active(session):
+                session.expunge(obj)
+                self.partitions.delete_row(session, obj.id, obj.StartTime)
+            else:
+                session.delete(obj)
+            session.commit()
+        return obj
     
+    @observe_query
+    def count(self, session: Session) -> int:
+        """Count logs, from the partition catalog when storage is partitioned."""
+        if self.partitions.is_active(session):
+            return self.partitions.count_rows(session)
+        return super().count(session)
+
+    @observe_query
     def get_logs_by_aadhaar(
         self, 
         session: Session, 
@@ -30,6 +177,35 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
         ).limit(limit)
         return session.exec(statement).all()
     
+    @observe_query
+    def get_session_times(
+        self,
+        session: Session,
+        aadhaar_nos: List[str],
+        destination_ips: Optional[List[str]] = None,
+        chunk_size: int = 500
+    ) -> List[Tuple[str, str, datetime]]:
+        """
+        Get (AadhaarNo, DestinationIP, StartTime) tuples for a set of users, without hydrating logs.
+        With `destination_ips`, only sessions to those destinations are returned.
+        """
+        destination_chunks = [None] if destination_ips is None else [
+            destination_ips[j:j + chunk_size] for j in range(0, len(destination_ips), chunk_size)
+        ]
+        rows = []
+        for i in range(0, len(aadhaar_nos), chunk_size):
+            for destinations in destination_chunks:
+                statement = select(
+                    IPDRLogModel.AadhaarNo,
+                    IPDRLogModel.DestinationIP,
+                    IPDRLogModel.StartTime
+                ).where(IPDRLogModel.AadhaarNo.in_(aadhaar_nos[i:i + chunk_size]))
+                if destinations is not None:
+                    statement = statement.where(IPDRLogModel.DestinationIP.in_(destinations))
+                rows.extend(session.exec(statement).all())
+        return rows
+    
+    @observe_query
     def get_logs_by_ip(
         self, 
         session: Session, 
@@ -48,6 +224,7 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
             ).limit(limit)
         return session.exec(statement).all()
     
+    @observe_query
     def get_logs_by_time_range(
         self,
         session: Session,
@@ -59,6 +236,18 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
         Get logs where the session started within a specific time period.
         Optionally filters for a specific user.
         """
+        if self.partitions.is_active(session):
+            # Only partitions overlapping the window are consulted
+            logs = []
+            for partition in self.partitions.get_overlapping(session, start_time, end_time):
+                table = self.partitions.get_table(partition)
+                conditions = [table.c.StartTime >= start_time, table.c.StartTime <= end_time]
+                if aadhaar_no:
+                    conditions.append(table.c.AadhaarNo == aadhaar_no)
+                statement = select(IPDRLogModel).from_statement(select(table).where(and_(*conditions)))
+                logs.extend(session.exec(statement).scalars())
+            return logs
+        
         conditions = [
             IPDRLogModel.StartTime >= start_time,
             IPDRLogModel.StartTime <= end_time
@@ -70,11 +259,13 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
         statement = select(IPDRLogModel).where(and_(*conditions))
         return session.exec(statement).all()
 
+    @observe_query
     def get_suspicious_logs(self, session: Session) -> List[IPDRLogModel]:
         """Get all logs that have been flagged as suspicious."""
         statement = select(IPDRLogModel).where(IPDRLogModel.IsSuspicious == True)
         return session.exec(statement).all()
 
+    @observe_query
     def get_connection_pairs(
         self,
         session: Session,
@@ -99,6 +290,7 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
         
         return session.exec(statement.limit(limit)).all()
 
+    @observe_query
     def update_log_suspicion_status(
         self,
         session: Session,
@@ -108,6 +300,11 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
     ) -> Optional[IPDRLogModel]:
         """Update the suspicion status and flags for a specific log entry."""
         log = self.read(session, log_id)
+        if log and self.partitions.is_active(session):
+            values = {"IsSuspicious": is_suspicious}
+            if suspicious_flags is not None:
+                values["SuspiciousFlags"] = suspicious_flags
+            return self.update(session, log, values)
         if log:
             log.IsSuspicious = is_suspicious
             if suspicious_flags is not None:
@@ -119,6 +316,7 @@ class IPDRLogCRUD(BaseCRUD[IPDRLogModel]):
             session.refresh(log)
         return log
     
+    @observe_query
     def get_logs_with_high_data_usage(
         self,
         session: Session,
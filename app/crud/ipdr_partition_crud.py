@@ -0,0 +1,382 @@
+# app/crud/ipdr_partition_crud.py
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from sqlalchemy import (
+    MetaData, Table, Column, Index, CheckConstraint, inspect, insert, delete,
+    union_all, cast, null, false, func, text, update, case
+)
+from app.models.ipdr_log_model import IPDRLogModel
+from app.models.ipdr_partition_model import IPDRPartitionModel
+from app.crud.base import BaseCRUD
+from app.crud.user_destination_crud import UserDestinationCRUD
+from app.crud.user_activity_crud import UserActivityCRUD
+from app.crud.user_rollup_crud import UserRollupCRUD
+from app.crud.pg_copy import supports_copy, copy_rows
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class IPDRPartitionCRUD(BaseCRUD[IPDRPartitionModel]):
+    """
+    Time-partitioned storage for IPDR logs.
+
+    Once enabled, each day or week of sessions lives in its own table with
+    the same columns and indexes as ``ipdrlogmodel``, and ``ipdrlogmodel``
+    itself becomes a ``UNION ALL`` view over them, so existing queries keep
+    working unchanged. Writes are routed to the partition covering each
+    row's StartTime (created on demand), time-window reads can consult only
+    the overlapping partitions, and retention drops whole tables.
+    """
+
+    # Stay below SQLite's limit of 500 terms per compound SELECT
+    VIEW_TERMS_PER_GROUP = 400
+
+    # PostgreSQL sequence handing out log ids across partitions
+    ID_SEQUENCE = "ipdrpartition_id_seq"
+
+    # ipdrlogmodel is a view in this database, keyed by database URL
+    _active: Dict[str, bool] = {}
+
+    def __init__(self):
+        super().__init__(IPDRPartitionModel)
+        self.destination_index = UserDestinationCRUD()
+        self.activity_index = UserActivityCRUD()
+        self.rollups = UserRollupCRUD()
+        self._metadata = MetaData()
+
+    def read(self, session: Session, table_name: str) -> Optional[IPDRPartitionModel]:
+        """Override base read method to use TableName as primary key."""
+        return session.get(IPDRPartitionModel, table_name)
+
+    # =========================================================================
+    # State
+    # =========================================================================
+    @staticmethod
+    def _cache_key(session: Session) -> str:
+        return str(session.get_bind().url)
+
+    def is_active(self, session: Session) -> bool:
+        """Whether IPDR logs are stored in partitions, i.e. ipdrlogmodel is a view."""
+        key = self._cache_key(session)
+        if key not in self._active:
+            view_names = inspect(session.connection()).get_view_names()
+            self._active[key] = IPDRLogModel.__table__.name in view_names
+        return self._active[key]
+
+    def get_partitions(self, session: Session) -> List[IPDRPartitionModel]:
+        """All partitions in time order."""
+        return session.exec(select(IPDRPartitionModel).order_by(IPDRPartitionModel.RangeStart)).all()
+
+    def get_overlapping(self, session: Session, start_time: datetime, end_time: datetime) -> List[IPDRPartitionModel]:
+        """Partitions whose range intersects [start_time, end_time]."""
+        return session.exec(
+            select(IPDRPartitionModel)
+            .where(IPDRPartitionModel.RangeStart <= end_time, IPDRPartitionModel.RangeEnd > start_time)
+            .order_by(IPDRPartitionModel.RangeStart)
+        ).all()
+
+    def count_rows(self, session: Session) -> int:
+        """Total logs across partitions, from the catalog."""
+        return session.exec(select(func.coalesce(func.sum(IPDRPartitionModel.RowCount), 0))).one()
+
+    # =========================================================================
+    # Partition tables
+    # =========================================================================
+    def _granularity(self, partitions: List[IPDRPartitionModel]) -> str:
+        """Configured granularity, or the one existing partitions were created with."""
+        if settings.IPDR_PARTITIONING != "none":
+            return settings.IPDR_PARTITIONING
+        if partitions and partitions[-1].RangeEnd - partitions[-1].RangeStart >= timedelta(days=7):
+            return "week"
+        return "day"
+
+    @staticmethod
+    def partition_bounds(timestamp: datetime, granularity: str) -> Tuple[datetime, datetime]:
+        """The [start, end) range of the day or ISO week containing `timestamp`."""
+        start = datetime(timestamp.year, timestamp.month, timestamp.day)
+        if granularity == "week":
+            start -= timedelta(days=start.weekday())
+            return start, start + timedelta(days=7)
+        return start, start + timedelta(days=1)
+
+    @staticmethod
+    def partition_name(range_start: datetime, granularity: str) -> str:
+        prefix = "w" if granularity == "week" else "d"
+        return f"{IPDRLogModel.__table__.name}_{prefix}{range_start:%Y%m%d}"
+
+    def get_table(self, partition: IPDRPartitionModel) -> Table:
+        """SQLAlchemy Table for a partition, mirroring the IPDR columns and indexes."""
+        name = partition.TableName
+        if name in self._metadata.tables:
+            return self._metadata.tables[name]
+
+        base = IPDRLogModel.__table__
+        columns = [
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+            for c in base.columns
+        ]
+        start = partition.RangeStart.isoformat(sep=" ")
+        end = partition.RangeEnd.isoformat(sep=" ")
+        table = Table(
+            name, self._metadata, *columns,
+            CheckConstraint(f"\"StartTime\" >= '{start}' AND \"StartTime\" < '{end}'", name=f"ck_{name}_range")
+        )
+        for index in base.indexes:
+            Index(index.name.replace(base.name, name, 1), *[table.c[c.name] for c in index.columns])
+        return table
+
+    def get_tables(self, session: Session) -> List[Table]:
+        return [self.get_table(partition) for partition in self.get_partitions(session)]
+
+    def _create_partition(
+        self,
+        session: Session,
+        timestamp: datetime,
+        partitions: List[IPDRPartitionModel]
+    ) -> IPDRPartitionModel:
+        """Create the partition covering `timestamp`, clipped so it never overlaps an existing one."""
+        granularity = self._granularity(partitions)
+        start, end = self.partition_bounds(timestamp, granularity)
+        for existing in partitions:
+            if existing.RangeEnd <= timestamp:
+                start = max(start, existing.RangeEnd)
+            elif existing.RangeStart > timestamp:
+                end = min(end, existing.RangeStart)
+
+        partition = IPDRPartitionModel(
+            TableName=self.partition_name(start, granularity), RangeStart=start, RangeEnd=end
+        )
+        self.get_table(partition).create(session.connection(), checkfirst=True)
+        session.add(partition)
+        session.flush()
+        partitions.append(partition)
+        partitions.sort(key=lambda p: p.RangeStart)
+        logger.info(f"Created IPDR partition {partition.TableName} [{start} – {end})")
+        return partition
+
+    def _rebuild_view(self, session: Session, partitions: List[IPDRPartitionModel]):
+        """Point the ipdrlogmodel view at exactly `partitions`."""
+        base = IPDRLogModel.__table__
+        column_names = [c.name for c in base.columns]
+        selects = [
+            select(*[self.get_table(p).c[name] for name in column_names])
+            for p in sorted(partitions, key=lambda p: p.RangeStart)
+        ]
+        if not selects:
+            body = select(*[cast(null(), c.type).label(c.name) for c in base.columns]).where(false())
+        else:
+            groups = [
+                union_all(*selects[i:i + self.VIEW_TERMS_PER_GROUP]) if len(selects[i:i + self.VIEW_TERMS_PER_GROUP]) > 1
+                else selects[i]
+                for i in range(0, len(selects), self.VIEW_TERMS_PER_GROUP)
+            ]
+            body = groups[0] if len(groups) == 1 else union_all(*[select(*g.subquery().c) for g in groups])
+
+        bind = session.get_bind()
+        sql = str(body.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+        session.execute(text(f"DROP VIEW IF EXISTS {base.name}"))
+        session.execute(text(f"CREATE VIEW {base.name} AS {sql}"))
+
+    # =========================================================================
+    # Writes
+    # =========================================================================
+    def _allocate_ids(self, session: Session, count: int, partitions: List[IPDRPartitionModel]) -> List[int]:
+        """
+        Reserve `count` new log ids, in ascending order.
+
+        PostgreSQL draws them from a sequence seeded from the catalog, so
+        concurrent loaders never hand out the same id. SQLite admits one
+        writer at a time and refuses to upgrade a stale read to a write,
+        so the catalog maximum is safe to continue from there.
+        """
+        if session.get_bind().dialect.name != "postgresql":
+            next_id = max((p.MaxId for p in partitions), default=0) + 1
+            return list(range(next_id, next_id + count))
+
+        start = max((p.MaxId for p in partitions), default=0) + 1
+        session.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {self.ID_SEQUENCE} START WITH {start}"))
+        return sorted(session.execute(
+            text(f"SELECT nextval('{self.ID_SEQUENCE}') FROM generate_series(1, :n)"), {"n": count}
+        ).scalars())
+
+    @staticmethod
+    def _add_to_catalog(session: Session, partition: IPDRPartitionModel, rows: int, max_id: Optional[int] = None):
+        """Adjust a partition's RowCount (and raise its MaxId) in SQL, so concurrent writers do not overwrite each other."""
+        values = {"RowCount": IPDRPartitionModel.RowCount + rows}
+        if max_id is not None:
+            values["MaxId"] = case((IPDRPartitionModel.MaxId < max_id, max_id), else_=IPDRPartitionModel.MaxId)
+        session.execute(
+            update(IPDRPartitionModel).where(IPDRPartitionModel.TableName == partition.TableName).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+        session.expire(partition, ["RowCount", "MaxId"])
+
+    def insert_rows(self, session: Session, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Route IPDR column dicts to their partitions, creating partitions as needed.
+        Log ids are allocated across partitions so they stay unique (see `_allocate_ids`).
+        Does not commit.
+
+        Returns:
+            The ids assigned to `rows`, in order.
+        """
+        partitions = list(self.get_partitions(session))
+        ids = self._allocate_ids(session, len(rows), partitions)
+        self._write_rows(session, [{**row, "id": log_id} for row, log_id in zip(rows, ids)], partitions)
+        return ids
+
+    def _write_rows(self, session: Session, rows: List[Dict[str, Any]], partitions: List[IPDRPartitionModel]):
+        """Route rows that already carry their ids to their partitions, creating partitions as needed."""
+        created = False
+        grouped = defaultdict(list)
+        for row in rows:
+            timestamp = row["StartTime"]
+            partition = next((p for p in partitions if p.RangeStart <= timestamp < p.RangeEnd), None)
+            if partition is None:
+                partition = self._create_partition(session, timestamp, partitions)
+                created = True
+            grouped[partition.TableName].append(row)
+
+        by_name = {p.TableName: p for p in partitions}
+        for table_name, partition_rows in grouped.items():
+            partition = by_name[table_name]
+            # Partitions created by an earlier process are not in this instance's metadata yet
+            table = self.get_table(partition)
+            if supports_copy(session):
+                copy_rows(session, table, partition_rows)
+            else:
+                session.execute(insert(table), partition_rows)
+            self._add_to_catalog(session, partition, len(partition_rows), max(row["id"] for row in partition_rows))
+        session.flush()
+        if created:
+            self._rebuild_view(session, partitions)
+
+    def delete_row(self, session: Session, log_id: int, start_time: datetime) -> bool:
+        """Delete one log from the partition covering `start_time`. Does not commit."""
+        partition = self._partition_for(session, start_time)
+        if partition is None:
+            return False
+        table = self.get_table(partition)
+        deleted = session.execute(delete(table).where(table.c.id == log_id)).rowcount
+        if deleted:
+            self._add_to_catalog(session, partition, -deleted)
+        return bool(deleted)
+
+    def move_row(self, session: Session, log_id: int, start_time: datetime, values: Dict[str, Any]) -> bool:
+        """
+        Apply `values` to one log whose new StartTime falls in another partition:
+        the row is deleted from the partition covering `start_time` and written,
+        under the same id, to the partition covering the new time. Does not commit.
+        """
+        table = self.get_table_for(session, start_time)
+        if table is None:
+            return False
+        stored = session.execute(select(table).where(table.c.id == log_id)).mappings().first()
+        if stored is None:
+            return False
+        self.delete_row(session, log_id, start_time)
+        self._write_rows(session, [{**stored, **values}], list(self.get_partitions(session)))
+        return True
+
+    def _partition_for(self, session: Session, timestamp: datetime) -> Optional[IPDRPartitionModel]:
+        return session.exec(
+            select(IPDRPartitionModel).where(
+                IPDRPartitionModel.RangeStart <= timestamp, IPDRPartitionModel.RangeEnd > timestamp
+            )
+        ).first()
+
+    def get_table_for(self, session: Session, timestamp: datetime) -> Optional[Table]:
+        """Partition table holding sessions that started at `timestamp`."""
+        partition = self._partition_for(session, timestamp)
+        return self.get_table(partition) if partition else None
+
+    # =========================================================================
+    # Lifecycle
+    # =========================================================================
+    def enable(self, session: Session) -> Dict[str, int]:
+        """
+        Switch to partitioned storage: move existing logs into partitions,
+        drop the ipdrlogmodel table and replace it with the view. Commits.
+
+        Returns:
+            Dict with the number of rows moved and partitions created.
+        """
+        if self.is_active(session):
+            return {"rows": 0, "partitions": len(self.get_partitions(session))}
+
+        base = IPDRLogModel.__table__
+        partitions: List[IPDRPartitionModel] = []
+        moved = 0
+        first, last = session.execute(select(func.min(base.c.StartTime), func.max(base.c.StartTime))).one()
+        if first is not None:
+            granularity = self._granularity(partitions)
+            start, _ = self.partition_bounds(first, granularity)
+            while start <= last:
+                _, end = self.partition_bounds(start, granularity)
+                in_range = (base.c.StartTime >= start) & (base.c.StartTime < end)
+                rows = session.execute(select(func.count()).select_from(base).where(in_range)).scalar()
+                if rows:
+                    partition = self._create_partition(session, start, partitions)
+                    table = self.get_table(partition)
+                    session.execute(insert(table).from_select(
+                        [c.name for c in base.columns], select(*base.columns).where(in_range)
+                    ))
+                    partition.RowCount = rows
+                    partition.MaxId = session.execute(select(func.max(table.c.id))).scalar() or 0
+                    moved += rows
+                start = end
+
+        session.flush()
+        base.drop(session.connection())
+        self._rebuild_view(session, partitions)
+        session.commit()
+        self._active[self._cache_key(session)] = True
+        logger.info(f"Partitioned {moved} IPDR logs into {len(partitions)} partitions.")
+        return {"rows": moved, "partitions": len(partitions)}
+
+    def drop_before(self, session: Session, cutoff: datetime) -> List[str]:
+        """
+        Drop every partition that ends on or before `cutoff` as a whole table,
+        subtracting its sessions from the user ↔ destination index, the
+        per-user activity aggregates and the daily rollups. Commits.
+
+        Returns:
+            Names of the dropped partitions.
+        """
+        partitions = self.get_partitions(session)
+        expired = [p for p in partitions if p.RangeEnd <= cutoff]
+        return self._drop(session, expired, [p for p in partitions if p.RangeEnd > cutoff], update_index=True)
+
+    def drop_all(self, session: Session) -> List[str]:
+        """Drop every partition, leaving an empty view. Does not touch the indexes, aggregates or rollups. Commits."""
+        return self._drop(session, self.get_partitions(session), [], update_index=False)
+
+    def _drop(
+        self,
+        session: Session,
+        expired: List[IPDRPartitionModel],
+        remaining: List[IPDRPartitionModel],
+        update_index: bool
+    ) -> List[str]:
+        if not expired:
+            return []
+        # The view must stop referencing the tables before they can be dropped
+        self._rebuild_view(session, remaining)
+        dropped = []
+        for partition in expired:
+            table = self.get_table(partition)
+            if update_index:
+                self.destination_index.subtract_logs(session, table)
+                self.activity_index.subtract_logs(session, table)
+                self.rollups.subtract_logs(session, table)
+            table.drop(session.connection(), checkfirst=True)
+            self._metadata.remove(table)
+            session.delete(partition)
+            dropped.append(partition.TableName)
+        session.commit()
+        logger.info(f"Dropped {len(dropped)} IPDR partitions.")
+        return dropped
@@ -0,0 +1,106 @@
+# app/crud/pg_copy.py
+"""
+PostgreSQL ``COPY ... FROM STDIN`` helpers for bulk loads.
+
+Rows are serialized to CSV in memory and streamed through the session's own
+DBAPI connection, so the copy joins the session transaction and commits or
+rolls back with it. Both psycopg2 (``copy_expert``) and psycopg 3
+(``cursor.copy``) are supported.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlmodel import Session
+from sqlalchemy import Table, MetaData, Column
+from app.models.compact_types import IPAddressType, DictionaryEncoded, dimension_registry
+from app.core.config import settings
+
+
+def supports_copy(session: Session) -> bool:
+    """Whether bulk loads on this session should go through COPY."""
+    return settings.POSTGRES_COPY and session.get_bind().dialect.name == "postgresql"
+
+
+def _copy_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, (bytes, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return str(value)
+
+
+def _to_csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> str:
+    """
+    Serialize rows as COPY CSV. Every non-null value is quoted so empty
+    strings stay empty strings, while None is written unquoted and loads as NULL.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_copy_value(row.get(name)) for name in columns])
+    return buffer.getvalue()
+
+
+def copy_rows(session: Session, table: Table, rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> int:
+    """
+    COPY column dicts into `table`. Columns default to the keys of the first
+    row, so an omitted ``id`` falls back to the table's sequence. Does not commit.
+
+    Returns:
+        Number of rows copied.
+    """
+    if not rows:
+        return 0
+    columns = columns or list(rows[0].keys())
+    quoted_columns = ", ".join(f'"{name}"' for name in columns)
+    statement = f'COPY "{table.name}" ({quoted_columns}) FROM STDIN WITH (FORMAT csv)'
+
+    # COPY bypasses SQLAlchemy binding, so apply the compact IPDR encodings here
+    dialect = session.get_bind().dialect
+    converters = {
+        name: table.c[name].type for name in columns
+        if isinstance(table.c[name].type, (IPAddressType, DictionaryEncoded))
+    }
+    if converters:
+        with dimension_registry.bound(session.connection()):
+            rows = [
+                {**row, **{name: type_.process_bind_param(row.get(name), dialect) for name, type_ in converters.items()}}
+                for row in rows
+            ]
+    data = _to_csv(rows, columns)
+
+    dbapi_connection = session.connection().connection.dbapi_connection
+    cursor = dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(statement, io.StringIO(data))
+        else:  # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(data)
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def create_staging_table(session: Session, table: Table) -> Table:
+    """
+    Create an empty temporary table with `table`'s columns (no constraints),
+    dropped automatically when the transaction commits.
+    """
+    staging = Table(
+        f"{table.name}_staging",
+        MetaData(),
+        *[Column(c.name, c.type) for c in table.columns],
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+    staging.create(session.connection())
+    return staging
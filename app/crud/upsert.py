@@ -0,0 +1,49 @@
+# app/crud/upsert.py
+"""
+Counter upserts for the incrementally maintained index and aggregate tables.
+
+Rows are added onto existing ones with ``INSERT ... ON CONFLICT DO UPDATE``
+on SQLite and PostgreSQL, and with update-then-insert on other dialects.
+"""
+from typing import Any, Dict, List, Optional
+from sqlmodel import Session
+from sqlalchemy import Table, insert, update, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def upsert_add(
+    session: Session,
+    table: Table,
+    keys: List[str],
+    counters: List[str],
+    params: List[Dict[str, Any]],
+    stamp: Optional[str] = None
+):
+    """
+    Add the `counters` of each row in `params` onto the row with the same `keys`,
+    inserting rows that do not exist yet. A `stamp` column is overwritten
+    rather than added. Does not commit.
+    """
+    if not params:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = dialect_insert(table)
+        set_ = {name: table.c[name] + statement.excluded[name] for name in counters}
+        if stamp:
+            set_[stamp] = statement.excluded[stamp]
+        session.execute(statement.on_conflict_do_update(index_elements=[table.c[k] for k in keys], set_=set_), params)
+        return
+
+    values = {name: table.c[name] + bindparam(f"b_{name}") for name in counters}
+    if stamp:
+        values[stamp] = bindparam(f"b_{stamp}")
+    statement = update(table).where(*[table.c[k] == bindparam(f"b_{k}") for k in keys]).values(**values)
+    missing = []
+    for p in params:
+        result = session.execute(statement, {f"b_{name}": value for name, value in p.items()})
+        if result.rowcount == 0:
+            missing.append(p)
+    if missing:
+        session.execute(insert(table), missing)
@@ -0,0 +1,234 @@
+# app/crud/user_activity_crud.py
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, select, func, delete, case, or_, and_, extract
+from sqlalchemy import insert, update, bindparam
+from app.models.user_activity_model import UserActivityModel, UserServiceUsageModel, ScoringStateModel
+from app.models.ipdr_log_model import IPDRLogModel
+from app.crud.base import BaseCRUD
+from app.crud.upsert import upsert_add
+from app.core.config import settings
+
+ACTIVITY_COLUMNS = ["SessionCount", "BytesUpload", "BytesDownload", "LateNightSessions", "ExfiltrationSessions"]
+
+
+class UserActivityCRUD(BaseCRUD[UserActivityModel]):
+    """
+    CRUD operations for the per-user activity aggregates behind incremental
+    suspicious scoring.
+
+    Like the user ↔ destination index, each ingested batch is folded into
+    running totals in the same transaction as the logs, and retention
+    subtracts dropped partitions. Late-night and exfiltration sessions are
+    counted with the ANALYSIS_THRESHOLDS in force at ingest; the scoring
+    state records those thresholds, and a mismatch triggers a rebuild.
+    """
+
+    # Keep IN-lists well below SQLite's bound-parameter limit
+    CHUNK_SIZE = 500
+    STATE_NAME = "suspicious"
+
+    def __init__(self):
+        super().__init__(UserActivityModel)
+
+    @staticmethod
+    def thresholds_key() -> str:
+        """Fingerprint of the thresholds the aggregates and flags depend on."""
+        return json.dumps(settings.ANALYSIS_THRESHOLDS, sort_keys=True)
+
+    @staticmethod
+    def _session_rules() -> Tuple[int, int, int, int]:
+        t = settings.ANALYSIS_THRESHOLDS
+        return (t["late_night_start_hour"], t["late_night_end_hour"],
+                t["short_duration_minutes"] * 60, t["high_data_session_mb"] * 1024 * 1024)
+
+    def apply_increments(self, session: Session, log_rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Fold a batch of freshly inserted IPDR column dicts into the aggregates.
+        Does not commit, so callers can keep it in the same transaction as the logs.
+
+        Returns:
+            Number of users touched.
+        """
+        start_hour, end_hour, short_seconds, high_session_bytes = self._session_rules()
+        totals = defaultdict(lambda: [0, 0, 0, 0, 0])
+        services = defaultdict(int)
+        for row in log_rows:
+            upload = row.get("BytesUpload") or 0
+            download = row.get("BytesDownload") or 0
+            hour = row["StartTime"].hour
+            entry = totals[row["AadhaarNo"]]
+            entry[0] += 1
+            entry[1] += upload
+            entry[2] += download
+            entry[3] += hour >= start_hour or hour <= end_hour
+            entry[4] += (row.get("Duration") or 0) < short_seconds and upload + download > high_session_bytes
+            if row.get("Service"):
+                services[(row["AadhaarNo"], row["Service"])] += 1
+        if not totals:
+            return 0
+
+        # Version counts as a counter: a new row starts at 1, an existing one is bumped by 1
+        upsert_add(
+            session, UserActivityModel.__table__, ["AadhaarNo"], ACTIVITY_COLUMNS + ["Version"],
+            [{"AadhaarNo": aadhaar_no, **dict(zip(ACTIVITY_COLUMNS, values)), "Version": 1}
+             for aadhaar_no, values in totals.items()]
+        )
+        if services:
+            upsert_add(
+                session, UserServiceUsageModel.__table__, ["AadhaarNo", "Service"], ["SessionCount"],
+                [{"AadhaarNo": aadhaar_no, "Service": service, "SessionCount": count}
+                 for (aadhaar_no, service), count in services.items()]
+            )
+        return len(totals)
+
+    def _aggregate_logs(self, log_table):
+        """Per-user activity totals of `log_table`, in ACTIVITY_COLUMNS order."""
+        start_hour, end_hour, short_seconds, high_session_bytes = self._session_rules()
+        hour = extract("hour", log_table.c.StartTime)
+        total_bytes = log_table.c.BytesUpload + log_table.c.BytesDownload
+        return select(
+            log_table.c.AadhaarNo,
+            func.count(),
+            func.coalesce(func.sum(log_table.c.BytesUpload), 0),
+            func.coalesce(func.sum(log_table.c.BytesDownload), 0),
+            func.sum(case((or_(hour >= start_hour, hour <= end_hour), 1), else_=0)),
+            func.sum(case((and_(log_table.c.Duration < short_seconds, total_bytes > high_session_bytes), 1), else_=0)),
+        ).group_by(log_table.c.AadhaarNo)
+
+    @staticmethod
+    def _aggregate_services(log_table):
+        return (
+            select(log_table.c.AadhaarNo, log_table.c.Service, func.count())
+            .where(log_table.c.Service.is_not(None))
+            .group_by(log_table.c.AadhaarNo, log_table.c.Service)
+        )
+
+    def subtract_logs(self, session: Session, log_table) -> int:
+        """
+        Remove the sessions stored in `log_table` (an IPDR log table or partition)
+        from the aggregates, deleting users and services that drop to zero. Does not commit.
+
+        Returns:
+            Number of users touched.
+        """
+        aggregated = session.execute(self._aggregate_logs(log_table)).all()
+        if not aggregated:
+            return 0
+
+        table = UserActivityModel.__table__
+        statement = (
+            update(table)
+            .where(table.c.AadhaarNo == bindparam("b_aadhaar"))
+            .values(Version=table.c.Version + 1,
+                    **{name: table.c[name] - bindparam(f"b_{name}") for name in ACTIVITY_COLUMNS})
+        )
+        session.execute(statement, [
+            {"b_aadhaar": aadhaar_no,
+             **{f"b_{name}": int(value) for name, value in zip(ACTIVITY_COLUMNS, values)}}
+            for aadhaar_no, *values in aggregated
+        ])
+        session.execute(delete(table).where(table.c.SessionCount <= 0))
+
+        services = UserServiceUsageModel.__table__
+        session.execute(
+            update(services)
+            .where(services.c.AadhaarNo == bindparam("b_aadhaar"), services.c.Service == bindparam("b_service"))
+            .values(SessionCount=services.c.SessionCount - bindparam("b_count")),
+            [{"b_aadhaar": aadhaar_no, "b_service": service, "b_count": count}
+             for aadhaar_no, service, count in session.execute(self._aggregate_services(log_table)).all()]
+        )
+        session.execute(delete(services).where(services.c.SessionCount <= 0))
+        return len(aggregated)
+
+    def rebuild(self, session: Session) -> int:
+        """Recompute all aggregates from the IPDR log table and commit. Every user is left pending evaluation."""
+        session.exec(delete(UserActivityModel))
+        session.exec(delete(UserServiceUsageModel))
+        log_table = IPDRLogModel.__table__
+        # Rows pass through Python so compact-layout columns come back decoded
+        activity = [{"AadhaarNo": aadhaar_no, **dict(zip(ACTIVITY_COLUMNS, map(int, values)))}
+                    for aadhaar_no, *values in session.execute(self._aggregate_logs(log_table)).all()]
+        services = [{"AadhaarNo": aadhaar_no, "Service": service, "SessionCount": count}
+                    for aadhaar_no, service, count in session.execute(self._aggregate_services(log_table)).all()]
+        if activity:
+            session.execute(insert(UserActivityModel.__table__), activity)
+        if services:
+            session.execute(insert(UserServiceUsageModel.__table__), services)
+        session.commit()
+        return len(activity)
+
+    def reset(self, session: Session):
+        """
+        Empty the aggregates and mark them complete, for use when the IPDR logs
+        are cleared. Does not commit.
+        """
+        session.exec(delete(UserActivityModel))
+        session.exec(delete(UserServiceUsageModel))
+        self.set_state(session, None)
+
+    def get_state(self, session: Session) -> Optional[ScoringStateModel]:
+        return session.get(ScoringStateModel, self.STATE_NAME)
+
+    def set_state(self, session: Session, scored_at: Optional[datetime]):
+        """Record the time of a scoring run with the current thresholds. Does not commit."""
+        state = self.get_state(session) or ScoringStateModel(Name=self.STATE_NAME)
+        state.ScoredAt = scored_at
+        state.ThresholdsKey = self.thresholds_key()
+        session.add(state)
+
+    def get_changed(self, session: Session, include_all: bool = False) -> List[Tuple]:
+        """
+        (AadhaarNo, SessionCount, BytesUpload, BytesDownload, LateNightSessions,
+        ExfiltrationSessions, Version) rows changed since they were last
+        evaluated, or all rows with `include_all`.
+        """
+        statement = select(
+            UserActivityModel.AadhaarNo,
+            *[UserActivityModel.__table__.c[c] for c in ACTIVITY_COLUMNS],
+            UserActivityModel.Version
+        )
+        if not include_all:
+            statement = statement.where(UserActivityModel.Version != UserActivityModel.ScoredVersion)
+        return session.exec(statement).all()
+
+    def mark_pending(self, session: Session):
+        """Leave every user pending evaluation, so the next scoring run re-evaluates all of them. Does not commit."""
+        table = UserActivityModel.__table__
+        session.execute(update(table).values(ScoredVersion=0))
+
+    def count_services(self, session: Session, aadhaar_nos: Optional[List[str]] = None) -> Dict[str, int]:
+        """Distinct services per user, for the given users or everyone."""
+        statement = select(UserServiceUsageModel.AadhaarNo, func.count()).group_by(UserServiceUsageModel.AadhaarNo)
+        if aadhaar_nos is None:
+            return dict(session.exec(statement).all())
+        counts = {}
+        for i in range(0, len(aadhaar_nos), self.CHUNK_SIZE):
+            chunk = aadhaar_nos[i:i + self.CHUNK_SIZE]
+            counts.update(session.exec(statement.where(UserServiceUsageModel.AadhaarNo.in_(chunk))).all())
+        return counts
+
+    def store_results(self, session: Session, versions: Dict[str, int], results: Dict[str, List[str]]):
+        """
+        Save the rules each evaluated user triggered (none for unflagged users),
+        given the Version each was read at. A user changed by ingest since that
+        read keeps a newer Version and is evaluated again next run. Does not commit.
+        """
+        table = UserActivityModel.__table__
+        params = [{"b_aadhaar": a, "b_version": version, "b_flagged": a in results, "b_rules": results.get(a, [])}
+                  for a, version in versions.items()]
+        if params:
+            session.execute(
+                update(table).where(table.c.AadhaarNo == bindparam("b_aadhaar"))
+                .values(ScoredVersion=bindparam("b_version"), IsFlagged=bindparam("b_flagged"),
+                        Rules=bindparam("b_rules")),
+                params
+            )
+
+    def get_flagged(self, session: Session) -> Dict[str, List[str]]:
+        """Mapping of AadhaarNo to triggered rules for every currently flagged user."""
+        return dict(session.exec(
+            select(UserActivityModel.AadhaarNo, UserActivityModel.Rules).where(UserActivityModel.IsFlagged)
+        ).all())
@@ -1,8 +1,12 @@
 # app/crud/user_crud.py
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from sqlmodel import Session, select
+from sqlalchemy import insert, update, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
 from app.models.user_model import UserModel
 from app.crud.base import BaseCRUD
+from app.crud.pg_copy import supports_copy, copy_rows, create_staging_table
+from app.core.metrics import observe_query
 from sqlalchemy.orm.attributes import flag_modified
 
 class UserCRUD(BaseCRUD[UserModel]):
@@ -14,10 +18,12 @@ class UserCRUD(BaseCRUD[UserModel]):
     def __init__(self):
         super().__init__(UserModel)
     
+    @observe_query
     def read(self, session: Session, aadhaar_no: str) -> Optional[UserModel]:
         """Override base read method to use AadhaarNo as primary key."""
         return session.get(UserModel, aadhaar_no)
     
+    @observe_query
     def delete(self, session: Session, aadhaar_no: str) -> Optional[UserModel]:
         """Override base delete method for AadhaarNo primary key."""
         obj = self.read(session, aadhaar_no)
@@ -26,41 +32,115 @@ class UserCRUD(BaseCRUD[UserModel]):
             session.commit()
         return obj
         
+    @staticmethod
+    def _on_conflict(statement, update_existing: bool):
+        """Skip users that already exist, or overwrite their profile columns but never the analysis flags."""
+        table = UserModel.__table__
+        if update_existing:
+            protected = {"AadhaarNo", "IsSuspicious", "SuspiciousType"}
+            return statement.on_conflict_do_update(
+                index_elements=[table.c.AadhaarNo],
+                set_={c.name: statement.excluded[c.name] for c in table.columns if c.name not in protected}
+            )
+        return statement.on_conflict_do_nothing(index_elements=[table.c.AadhaarNo])
+
+    @observe_query
+    def bulk_upsert(
+        self,
+        session: Session,
+        rows: List[Dict[str, Any]],
+        update_existing: bool = False
+    ) -> int:
+        """
+        Insert a batch of user column dicts in one statement and commit once.
+
+        On SQLite and PostgreSQL this is an ``INSERT ... ON CONFLICT`` on
+        AadhaarNo: existing users are skipped (DO NOTHING) or, with
+        ``update_existing``, have their profile columns overwritten (DO UPDATE).
+        On PostgreSQL the batch is first COPY'd into a temporary staging table
+        and upserted from there with ``INSERT ... SELECT``.
+        Analysis flags (IsSuspicious, SuspiciousType) are never overwritten.
+        Other dialects fall back to filtering out existing keys first.
+
+        Returns:
+            Number of rows inserted or updated. Drivers that do not report a
+            rowcount for executemany are assumed to have written every row.
+        """
+        if not rows:
+            return 0
+
+        table = UserModel.__table__
+        dialect = session.get_bind().dialect.name
+
+        if supports_copy(session):
+            # COPY into a temporary staging table, then upsert from it in one statement
+            staging = create_staging_table(session, table)
+            copy_rows(session, staging, rows)
+            columns = list(rows[0].keys())
+            source = select(*[staging.c[name] for name in columns]).distinct(staging.c.AadhaarNo)
+            statement = self._on_conflict(postgresql.insert(table).from_select(columns, source), update_existing)
+            result = session.execute(statement)
+        elif dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            statement = self._on_conflict(dialect_insert(table), update_existing)
+            result = session.execute(statement, rows)
+        else:
+            existing = set(session.exec(
+                select(UserModel.AadhaarNo).where(UserModel.AadhaarNo.in_([r["AadhaarNo"] for r in rows]))
+            ).all())
+            new_rows = [r for r in rows if r["AadhaarNo"] not in existing]
+            if not new_rows:
+                session.commit()
+                return 0
+            result = session.execute(insert(table), new_rows)
+            rows = new_rows
+
+        session.commit()
+        return result.rowcount if result.rowcount >= 0 else len(rows)
+
+    @observe_query
     def get_user_by_phone(self, session: Session, phone_no: str) -> Optional[UserModel]:
         """Find user by their unique phone number."""
         statement = select(UserModel).where(UserModel.PhoneNo == phone_no)
         return session.exec(statement).first()
     
+    @observe_query
     def get_users_by_city(self, session: Session, city: str) -> List[UserModel]:
         """Get all users from a specific city (case-insensitive)."""
         statement = select(UserModel).where(UserModel.City.ilike(f"%{city}%"))
         return session.exec(statement).all()
         
+    @observe_query
     def get_users_by_state(self, session: Session, state: str) -> List[UserModel]:
         """Get all users from a specific state (case-insensitive)."""
         statement = select(UserModel).where(UserModel.State.ilike(f"%{state}%"))
         return session.exec(statement).all()
         
+    @observe_query
     def get_suspicious_users(self, session: Session) -> List[UserModel]:
         """Get all users flagged as suspicious."""
         statement = select(UserModel).where(UserModel.IsSuspicious == True)
         return session.exec(statement).all()
         
+    @observe_query
     def get_users_by_isp(self, session: Session, isp: str) -> List[UserModel]:
         """Get all users by Internet Service Provider (case-insensitive)."""
         statement = select(UserModel).where(UserModel.ISP.ilike(f"%{isp}%"))
         return session.exec(statement).all()
     
+    @observe_query
     def get_users_by_age_range(self, session: Session, min_age: int, max_age: int) -> List[UserModel]:
         """Get users within a specified age range (inclusive)."""
         statement = select(UserModel).where(UserModel.Age >= min_age, UserModel.Age <= max_age)
         return session.exec(statement).all()
         
+    @observe_query
     def search_users_by_name(self, session: Session, name_pattern: str) -> List[UserModel]:
         """Search users by name pattern (case-insensitive partial match)."""
         statement = select(UserModel).where(UserModel.Name.ilike(f"%{name_pattern}%"))
         return session.exec(statement).all()
     
+    @observe_query
     def get_users_with_multiple_devices(self, session: Session, min_devices: int = 2) -> List[UserModel]:
         """
         Get users with multiple devices registered.
@@ -73,6 +153,7 @@ class UserCRUD(BaseCRUD[UserModel]):
         users = session.exec(statement).all()
         return [user for user in users if user.Devices and len(user.Devices) >= min_devices]
     
+    @observe_query
     def update_user_suspicion_status(
         self, 
         session: Session, 
@@ -91,4 +172,35 @@ class UserCRUD(BaseCRUD[UserModel]):
             session.add(user)
             session.commit()
             session.refresh(user)
-        return user
\ No newline at end of file
+        return user
+    
+    @observe_query
+    def bulk_update_suspicion_status(self, session: Session, suspicious_types: Dict[str, List[str]]) -> int:
+        """
+        Flag many users as suspicious with one executemany UPDATE and a single commit.
+        
+        Args:
+            suspicious_types: Mapping of AadhaarNo to the list of suspicious types to store.
+        """
+        if not suspicious_types:
+            return 0
+        table = UserModel.__table__
+        statement = (
+            update(table)
+            .where(table.c.AadhaarNo == bindparam("b_aadhaar"))
+            .values(IsSuspicious=True, SuspiciousType=bindparam("b_types"))
+        )
+        session.execute(statement, [
+            {"b_aadhaar": aadhaar_no, "b_types": types} for aadhaar_no, types in suspicious_types.items()
+        ])
+        session.commit()
+        return len(suspicious_types)
+    
+    @observe_query
+    def get_users_by_aadhaar(self, session: Session, aadhaar_nos: List[str], chunk_size: int = 500) -> List[UserModel]:
+        """Load many users by AadhaarNo, preserving the order of the input list."""
+        users = {}
+        for i in range(0, len(aadhaar_nos), chunk_size):
+            statement = select(UserModel).where(UserModel.AadhaarNo.in_(aadhaar_nos[i:i + chunk_size]))
+            users.update((user.AadhaarNo, user) for user in session.exec(statement).all())
+        return [users[a] for a in aadhaar_nos if a in users]
\ No newline at end of file
@@ -0,0 +1,206 @@
+# app/crud/user_destination_crud.py
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+from collections import defaultdict
+from sqlmodel import Session, select, func, delete
+from sqlalchemy import insert, update, bindparam
+from app.models.user_destination_model import UserDestinationModel
+from app.models.ipdr_log_model import IPDRLogModel
+from app.models.compact_types import IPAddressType
+from app.crud.base import BaseCRUD
+from app.crud.upsert import upsert_add
+from app.crud import index_state
+
+
+class UserDestinationCRUD(BaseCRUD[UserDestinationModel]):
+    """
+    CRUD operations for the user ↔ destination IP index.
+
+    Rows are keyed by (AadhaarNo, DestinationIP) and hold the number of
+    sessions and bytes exchanged, so cluster expansion can walk the
+    bipartite graph instead of scanning IPDR logs. Readers rebuild it first
+    unless its completeness marker is set (see app/crud/index_state.py).
+    """
+
+    # Keep IN-lists well below SQLite's bound-parameter limit
+    CHUNK_SIZE = 500
+    STATE_NAME = "user_destination"
+
+    def __init__(self):
+        super().__init__(UserDestinationModel)
+
+    def apply_increments(self, session: Session, log_rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Fold a batch of freshly inserted IPDR column dicts into the index.
+        Does not commit, so callers can keep it in the same transaction as the logs.
+
+        Returns:
+            Number of (user, destination) pairs touched.
+        """
+        increments = defaultdict(lambda: [0, 0])
+        for row in log_rows:
+            if not row.get("DestinationIP"):
+                continue
+            entry = increments[(row["AadhaarNo"], row["DestinationIP"])]
+            entry[0] += 1
+            entry[1] += (row.get("BytesUpload") or 0) + (row.get("BytesDownload") or 0)
+        if not increments:
+            return 0
+
+        params = [
+            {"AadhaarNo": aadhaar_no, "DestinationIP": dest_ip, "SessionCount": count, "TotalBytes": total}
+            for (aadhaar_no, dest_ip), (count, total) in increments.items()
+        ]
+        upsert_add(session, UserDestinationModel.__table__, ["AadhaarNo", "DestinationIP"],
+                   ["SessionCount", "TotalBytes"], params)
+        return len(params)
+
+    def subtract_logs(self, session: Session, log_table) -> int:
+        """
+        Remove the sessions stored in `log_table` (an IPDR log table or partition)
+        from the index, deleting pairs that drop to zero. Does not commit.
+
+        Returns:
+            Number of (user, destination) pairs touched.
+        """
+        aggregated = session.execute(
+            select(
+                log_table.c.AadhaarNo,
+                log_table.c.DestinationIP,
+                func.count(),
+                func.coalesce(func.sum(log_table.c.BytesUpload + log_table.c.BytesDownload), 0)
+            )
+            .where(log_table.c.DestinationIP.is_not(None), log_table.c.DestinationIP != '')
+            .group_by(log_table.c.AadhaarNo, log_table.c.DestinationIP)
+        ).all()
+        if not aggregated:
+            return 0
+
+        table = UserDestinationModel.__table__
+        statement = (
+            update(table)
+            .where(table.c.AadhaarNo == bindparam("b_aadhaar"), table.c.DestinationIP == bindparam("b_dest"))
+            .values(SessionCount=table.c.SessionCount - bindparam("b_count"),
+                    TotalBytes=table.c.TotalBytes - bindparam("b_bytes"))
+        )
+        session.execute(statement, [
+            {"b_aadhaar": aadhaar_no, "b_dest": dest_ip, "b_count": count, "b_bytes": int(total)}
+            for aadhaar_no, dest_ip, count, total in aggregated
+        ])
+        session.execute(delete(table).where(table.c.SessionCount <= 0))
+        return len(aggregated)
+
+    def is_complete(self, session: Session) -> bool:
+        """Whether the index reflects every IPDR log, i.e. was built and kept in step since."""
+        return index_state.is_complete(session, self.STATE_NAME)
+
+    def reset(self, session: Session):
+        """
+        Empty the index and mark it complete, for use when the IPDR logs are
+        cleared. Does not commit.
+        """
+        session.exec(delete(UserDestinationModel))
+        index_state.mark_complete(session, self.STATE_NAME)
+
+    def rebuild(self, session: Session) -> int:
+        """Recompute the whole index from the IPDR log table, mark it complete and commit."""
+        session.exec(delete(UserDestinationModel))
+        aggregated = (
+            select(
+                IPDRLogModel.AadhaarNo,
+                IPDRLogModel.DestinationIP,
+                func.count(IPDRLogModel.id),
+                func.coalesce(func.sum(IPDRLogModel.BytesUpload + IPDRLogModel.BytesDownload), 0)
+            )
+            .where(IPDRLogModel.DestinationIP.is_not(None), IPDRLogModel.DestinationIP != '')
+            .group_by(IPDRLogModel.AadhaarNo, IPDRLogModel.DestinationIP)
+        )
+        table = UserDestinationModel.__table__
+        columns = ["AadhaarNo", "DestinationIP", "SessionCount", "TotalBytes"]
+        if isinstance(IPDRLogModel.__table__.c.DestinationIP.type, IPAddressType):
+            # Compact storage keeps IPs packed, so decode them on the way into the text index
+            rows = [dict(zip(columns, row)) for row in session.exec(aggregated).all()]
+            if rows:
+                session.execute(insert(table), rows)
+        else:
+            session.execute(insert(table).from_select(columns, aggregated))
+        index_state.mark_complete(session, self.STATE_NAME)
+        session.commit()
+        return self.count(session)
+
+    def get_destinations_for_users(
+        self,
+        session: Session,
+        aadhaar_nos: Iterable[str]
+    ) -> List[Tuple[str, str, int, int]]:
+        """Return (AadhaarNo, DestinationIP, SessionCount, TotalBytes) rows for the given users."""
+        aadhaar_nos = list(aadhaar_nos)
+        rows = []
+        for i in range(0, len(aadhaar_nos), self.CHUNK_SIZE):
+            rows.extend(session.exec(
+                select(
+                    UserDestinationModel.AadhaarNo,
+                    UserDestinationModel.DestinationIP,
+                    UserDestinationModel.SessionCount,
+                    UserDestinationModel.TotalBytes
+                ).where(UserDestinationModel.AadhaarNo.in_(aadhaar_nos[i:i + self.CHUNK_SIZE]))
+            ).all())
+        return rows
+
+    def count_destinations(self, session: Session, aadhaar_nos: Optional[List[str]] = None) -> Dict[str, int]:
+        """Number of distinct destination IPs contacted by each of the given users, or by everyone."""
+        statement = select(UserDestinationModel.AadhaarNo, func.count()).group_by(UserDestinationModel.AadhaarNo)
+        if aadhaar_nos is None:
+            return dict(session.exec(statement).all())
+        counts = {}
+        for i in range(0, len(aadhaar_nos), self.CHUNK_SIZE):
+            counts.update(session.exec(
+                statement.where(UserDestinationModel.AadhaarNo.in_(aadhaar_nos[i:i + self.CHUNK_SIZE]))
+            ).all())
+        return counts
+
+    def get_fanout(self, session: Session, destination_ips: Iterable[str]) -> Dict[str, int]:
+        """Number of distinct users that contacted each destination IP."""
+        destination_ips = list(destination_ips)
+        fanout = {}
+        for i in range(0, len(destination_ips), self.CHUNK_SIZE):
+            fanout.update(session.exec(
+                select(UserDestinationModel.DestinationIP, func.count())
+                .where(UserDestinationModel.DestinationIP.in_(destination_ips[i:i + self.CHUNK_SIZE]))
+                .group_by(UserDestinationModel.DestinationIP)
+            ).all())
+        return fanout
+
+    def get_users_for_destinations(
+        self,
+        session: Session,
+        destination_ips: Iterable[str],
+        per_destination_limit: Optional[int] = None
+    ) -> List[Tuple[str, str, int, int]]:
+        """
+        Return (DestinationIP, AadhaarNo, SessionCount, TotalBytes) rows for the given IPs.
+        With ``per_destination_limit`` only the heaviest users of each IP by session count are returned.
+        """
+        destination_ips = list(destination_ips)
+        columns = (
+            UserDestinationModel.DestinationIP,
+            UserDestinationModel.AadhaarNo,
+            UserDestinationModel.SessionCount,
+            UserDestinationModel.TotalBytes
+        )
+        rows = []
+        for i in range(0, len(destination_ips), self.CHUNK_SIZE):
+            condition = UserDestinationModel.DestinationIP.in_(destination_ips[i:i + self.CHUNK_SIZE])
+            if per_destination_limit is None:
+                rows.extend(session.exec(select(*columns).where(condition)).all())
+                continue
+
+            rank = func.row_number().over(
+                partition_by=UserDestinationModel.DestinationIP,
+                order_by=UserDestinationModel.SessionCount.desc()
+            ).label("rank")
+            ranked = select(*columns, rank).where(condition).subquery()
+            rows.extend(session.exec(
+                select(ranked.c.DestinationIP, ranked.c.AadhaarNo, ranked.c.SessionCount, ranked.c.TotalBytes)
+                .where(ranked.c.rank <= per_destination_limit)
+            ).all())
+        return rows
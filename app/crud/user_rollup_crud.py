@@ -0,0 +1,357 @@
+# app/crud/user_rollup_crud.py
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, select, func, delete, case, extract, cast
+from sqlalchemy import Date, insert, update, bindparam
+from app.models.user_rollup_model import (
+    UserDailyRollupModel, UserDestinationDailyRollupModel, UserServiceDailyRollupModel, HOUR_COLUMNS
+)
+from app.models.ipdr_log_model import IPDRLogModel
+from app.models.compact_types import IPAddressType
+from app.crud.base import BaseCRUD
+from app.crud.upsert import upsert_add
+from app.crud import index_state
+
+ROLLUP_COLUMNS = ["SessionCount", "BytesUpload", "BytesDownload", "TotalDuration"] + HOUR_COLUMNS
+SERVICE_KEYS = ["AadhaarNo", "Day", "DestinationIP", "Service", "Protocol"]
+
+
+class UserRollupCRUD(BaseCRUD[UserDailyRollupModel]):
+    """
+    CRUD operations for the daily per-user rollups: one row per
+    (AadhaarNo, day) and one per (AadhaarNo, day, DestinationIP), holding
+    session counts, bytes, durations and an hour-of-day histogram, plus
+    session counts per (AadhaarNo, day, DestinationIP, Service, Protocol).
+
+    Like the user ↔ destination index, each ingested batch is added to the
+    rollups in the same transaction as the logs, and retention subtracts
+    dropped partitions, so time-window summaries read one row per day
+    instead of the raw logs. Readers rebuild the rollups first unless their
+    completeness marker is set (see app/crud/index_state.py).
+    """
+
+    STATE_NAME = "daily_rollups"
+
+    def __init__(self):
+        super().__init__(UserDailyRollupModel)
+
+    @staticmethod
+    def _increments(log_rows: Iterable[Dict[str, Any]]) -> Tuple[Dict[Tuple, List[int]], Dict[Tuple, List[int]],
+                                                                   Dict[Tuple, int]]:
+        """
+        Sum a batch of IPDR column dicts per (user, day), per (user, day,
+        destination) and per (user, day, destination, service, protocol).
+        """
+        daily = defaultdict(lambda: [0] * len(ROLLUP_COLUMNS))
+        by_destination = defaultdict(lambda: [0] * len(ROLLUP_COLUMNS))
+        by_service = defaultdict(int)
+        for row in log_rows:
+            start = row["StartTime"]
+            key = (row["AadhaarNo"], start.date())
+            by_service[key + tuple(row.get(name) or '' for name in SERVICE_KEYS[2:])] += 1
+            targets = [daily[key]]
+            if row.get("DestinationIP"):
+                targets.append(by_destination[key + (row["DestinationIP"],)])
+            for entry in targets:
+                entry[0] += 1
+                entry[1] += row.get("BytesUpload") or 0
+                entry[2] += row.get("BytesDownload") or 0
+                entry[3] += row.get("Duration") or 0
+                entry[4 + start.hour] += 1
+        return daily, by_destination, by_service
+
+    def apply_increments(self, session: Session, log_rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Fold a batch of freshly inserted IPDR column dicts into the rollups.
+        Does not commit, so callers can keep it in the same transaction as the logs.
+
+        Returns:
+            Number of (user, day) rows touched.
+        """
+        daily, by_destination, by_service = self._increments(log_rows)
+        upsert_add(
+            session, UserDailyRollupModel.__table__, ["AadhaarNo", "Day"], ROLLUP_COLUMNS,
+            [{"AadhaarNo": aadhaar_no, "Day": day, **dict(zip(ROLLUP_COLUMNS, values))}
+             for (aadhaar_no, day), values in daily.items()]
+        )
+        upsert_add(
+            session, UserDestinationDailyRollupModel.__table__, ["AadhaarNo", "Day", "DestinationIP"], ROLLUP_COLUMNS,
+            [{"AadhaarNo": aadhaar_no, "Day": day, "DestinationIP": dest_ip, **dict(zip(ROLLUP_COLUMNS, values))}
+             for (aadhaar_no, day, dest_ip), values in by_destination.items()]
+        )
+        upsert_add(
+            session, UserServiceDailyRollupModel.__table__, SERVICE_KEYS, ["SessionCount"],
+            [{**dict(zip(SERVICE_KEYS, key)), "SessionCount": count} for key, count in by_service.items()]
+        )
+        return len(daily)
+
+    @staticmethod
+    def _day(session: Session, log_table):
+        start = log_table.c.StartTime
+        # SQLite has no date type; date() yields the same ISO text a Date column stores
+        return func.date(start, type_=Date) if session.get_bind().dialect.name == "sqlite" else cast(start, Date)
+
+    def _aggregate_logs(self, session: Session, log_table, per_destination: bool):
+        """
+        Rollup rows of `log_table` grouped in SQL: the key columns
+        (AadhaarNo, Day[, DestinationIP]) followed by ROLLUP_COLUMNS.
+        """
+        start = log_table.c.StartTime
+        day = self._day(session, log_table)
+        hour = extract("hour", start)
+        keys = [log_table.c.AadhaarNo, day]
+        if per_destination:
+            keys.append(log_table.c.DestinationIP)
+        statement = select(
+            *keys,
+            func.count(),
+            func.coalesce(func.sum(log_table.c.BytesUpload), 0),
+            func.coalesce(func.sum(log_table.c.BytesDownload), 0),
+            func.coalesce(func.sum(log_table.c.Duration), 0),
+            *[func.sum(case((hour == h, 1), else_=0)) for h in range(24)]
+        ).group_by(*keys)
+        if per_destination:
+            statement = statement.where(log_table.c.DestinationIP.is_not(None), log_table.c.DestinationIP != '')
+        return statement
+
+    def _aggregate_services(self, session: Session, log_table) -> Dict[Tuple, int]:
+        """
+        Session counts of `log_table` per SERVICE_KEYS. Grouped in SQL, then
+        merged in Python once missing values become '', which also decodes
+        compact-layout columns.
+        """
+        keys = [log_table.c.AadhaarNo, self._day(session, log_table),
+                log_table.c.DestinationIP, log_table.c.Service, log_table.c.Protocol]
+        counts = defaultdict(int)
+        for aadhaar_no, day, *values, count in session.execute(select(*keys, func.count()).group_by(*keys)):
+            counts[(aadhaar_no, day, *(value or '' for value in values))] += count
+        return counts
+
+    def subtract_logs(self, session: Session, log_table) -> int:
+        """
+        Remove the sessions stored in `log_table` (an IPDR log table or partition)
+        from the rollups, deleting rows that drop to zero. Does not commit.
+
+        Returns:
+            Number of (user, day) rows touched.
+        """
+        touched = 0
+        for model, keys in ((UserDailyRollupModel, ["AadhaarNo", "Day"]),
+                            (UserDestinationDailyRollupModel, ["AadhaarNo", "Day", "DestinationIP"])):
+            aggregated = session.execute(
+                self._aggregate_logs(session, log_table, model is UserDestinationDailyRollupModel)
+            ).all()
+            if not aggregated:
+                continue
+            table = model.__table__
+            statement = (
+                update(table)
+                .where(*[table.c[k] == bindparam(f"b_{k}") for k in keys])
+                .values(**{name: table.c[name] - bindparam(f"b_{name}") for name in ROLLUP_COLUMNS})
+            )
+            session.execute(statement, [
+                {**{f"b_{k}": value for k, value in zip(keys, row)},
+                 **{f"b_{name}": int(value) for name, value in zip(ROLLUP_COLUMNS, row[len(keys):])}}
+                for row in aggregated
+            ])
+            session.execute(delete(table).where(table.c.SessionCount <= 0))
+            if model is UserDailyRollupModel:
+                touched = len(aggregated)
+
+        services = UserServiceDailyRollupModel.__table__
+        counts = self._aggregate_services(session, log_table)
+        if counts:
+            session.execute(
+                update(services)
+                .where(*[services.c[k] == bindparam(f"b_{k}") for k in SERVICE_KEYS])
+                .values(SessionCount=services.c.SessionCount - bindparam("b_count")),
+                [{**{f"b_{k}": value for k, value in zip(SERVICE_KEYS, key)}, "b_count": count}
+                 for key, count in counts.items()]
+            )
+            session.execute(delete(services).where(services.c.SessionCount <= 0))
+        return touched
+
+    def is_complete(self, session: Session) -> bool:
+        """Whether the rollups reflect every IPDR log, i.e. were built and kept in step since."""
+        return index_state.is_complete(session, self.STATE_NAME)
+
+    @staticmethod
+    def _clear(session: Session):
+        for model in (UserDailyRollupModel, UserDestinationDailyRollupModel, UserServiceDailyRollupModel):
+            session.exec(delete(model))
+
+    def reset(self, session: Session):
+        """
+        Empty the rollups and mark them complete, for use when the IPDR logs
+        are cleared. Does not commit.
+        """
+        self._clear(session)
+        index_state.mark_complete(session, self.STATE_NAME)
+
+    def rebuild(self, session: Session) -> int:
+        """Recompute the rollups from the IPDR log table, mark them complete and commit."""
+        self._clear(session)
+        log_table = IPDRLogModel.__table__
+        for model, keys in ((UserDailyRollupModel, ["AadhaarNo", "Day"]),
+                            (UserDestinationDailyRollupModel, ["AadhaarNo", "Day", "DestinationIP"])):
+            per_destination = model is UserDestinationDailyRollupModel
+            aggregated = self._aggregate_logs(session, log_table, per_destination)
+            columns = keys + ROLLUP_COLUMNS
+            if per_destination and isinstance(log_table.c.DestinationIP.type, IPAddressType):
+                # Compact storage keeps IPs packed, so decode them on the way into the text rollup
+                rows = [dict(zip(columns, row)) for row in session.execute(aggregated).all()]
+                if rows:
+                    session.execute(insert(model.__table__), rows)
+            else:
+                session.execute(insert(model.__table__).from_select(columns, aggregated))
+        services = [{**dict(zip(SERVICE_KEYS, key)), "SessionCount": count}
+                    for key, count in self._aggregate_services(session, log_table).items()]
+        if services:
+            session.execute(insert(UserServiceDailyRollupModel.__table__), services)
+        index_state.mark_complete(session, self.STATE_NAME)
+        session.commit()
+        return self.count(session)
+
+    def get_daily_totals(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        A user's totals over the days from `start_day` to `end_day` (inclusive,
+        open-ended when omitted): the summed ROLLUP_COLUMNS, the number of
+        active days and the 24-hour session histogram under "Hours".
+        """
+        statement = select(
+            func.count(),
+            *[func.coalesce(func.sum(UserDailyRollupModel.__table__.c[name]), 0) for name in ROLLUP_COLUMNS]
+        ).where(UserDailyRollupModel.AadhaarNo == aadhaar_no)
+        if start_day is not None:
+            statement = statement.where(UserDailyRollupModel.Day >= start_day)
+        if end_day is not None:
+            statement = statement.where(UserDailyRollupModel.Day <= end_day)
+        active_days, *sums = session.exec(statement).one()
+        totals = dict(zip(ROLLUP_COLUMNS, map(int, sums)))
+        totals["ActiveDays"] = active_days
+        totals["Hours"] = [totals.pop(name) for name in HOUR_COLUMNS]
+        return totals
+
+    def count_destinations(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None
+    ) -> int:
+        """Distinct destination IPs a user contacted over the days from `start_day` to `end_day` (inclusive)."""
+        statement = select(func.count(func.distinct(UserDestinationDailyRollupModel.DestinationIP))).where(
+            UserDestinationDailyRollupModel.AadhaarNo == aadhaar_no
+        )
+        if start_day is not None:
+            statement = statement.where(UserDestinationDailyRollupModel.Day >= start_day)
+        if end_day is not None:
+            statement = statement.where(UserDestinationDailyRollupModel.Day <= end_day)
+        return session.exec(statement).one()
+
+    def get_destination_totals(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, int, int, int]]:
+        """
+        (DestinationIP, SessionCount, BytesUpload, BytesDownload) of a user's
+        destinations over the days from `start_day` to `end_day` (inclusive),
+        busiest first.
+        """
+        session_count = func.sum(UserDestinationDailyRollupModel.SessionCount)
+        statement = (
+            select(
+                UserDestinationDailyRollupModel.DestinationIP,
+                session_count,
+                func.sum(UserDestinationDailyRollupModel.BytesUpload),
+                func.sum(UserDestinationDailyRollupModel.BytesDownload)
+            )
+            .where(UserDestinationDailyRollupModel.AadhaarNo == aadhaar_no)
+            .group_by(UserDestinationDailyRollupModel.DestinationIP)
+            .order_by(session_count.desc(), UserDestinationDailyRollupModel.DestinationIP)
+        )
+        if start_day is not None:
+            statement = statement.where(UserDestinationDailyRollupModel.Day >= start_day)
+        if end_day is not None:
+            statement = statement.where(UserDestinationDailyRollupModel.Day <= end_day)
+        if limit:
+            statement = statement.limit(limit)
+        return [(dest_ip, count, int(upload), int(download))
+                for dest_ip, count, upload, download in session.exec(statement).all()]
+
+    def _service_window(self, statement, start_day: Optional[date], end_day: Optional[date]):
+        if start_day is not None:
+            statement = statement.where(UserServiceDailyRollupModel.Day >= start_day)
+        if end_day is not None:
+            statement = statement.where(UserServiceDailyRollupModel.Day <= end_day)
+        return statement
+
+    def get_distinct_values(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        name: str,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None
+    ) -> List[str]:
+        """
+        Distinct non-empty values of the `name` column (Service or Protocol) a
+        user had over the days from `start_day` to `end_day` (inclusive).
+        """
+        column = UserServiceDailyRollupModel.__table__.c[name]
+        statement = (
+            select(column).distinct()
+            .where(UserServiceDailyRollupModel.AadhaarNo == aadhaar_no, column != '')
+            .order_by(column)
+        )
+        return list(session.exec(self._service_window(statement, start_day, end_day)).all())
+
+    def get_destination_values(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        name: str,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Distinct (DestinationIP, value of the `name` column) pairs of a user
+        over the days from `start_day` to `end_day` (inclusive).
+        """
+        column = UserServiceDailyRollupModel.__table__.c[name]
+        statement = (
+            select(UserServiceDailyRollupModel.DestinationIP, column).distinct()
+            .where(UserServiceDailyRollupModel.AadhaarNo == aadhaar_no,
+                   UserServiceDailyRollupModel.DestinationIP != '', column != '')
+            .order_by(UserServiceDailyRollupModel.DestinationIP, column)
+        )
+        return [tuple(row) for row in session.exec(self._service_window(statement, start_day, end_day)).all()]
+
+    def get_service_totals(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None
+    ) -> List[Tuple[str, int]]:
+        """(Service, SessionCount) of a user over the days from `start_day` to `end_day` (inclusive), busiest first."""
+        session_count = func.sum(UserServiceDailyRollupModel.SessionCount)
+        statement = (
+            select(UserServiceDailyRollupModel.Service, session_count)
+            .where(UserServiceDailyRollupModel.AadhaarNo == aadhaar_no, UserServiceDailyRollupModel.Service != '')
+            .group_by(UserServiceDailyRollupModel.Service)
+            .order_by(session_count.desc(), UserServiceDailyRollupModel.Service)
+        )
+        return [(service, int(count)) for service, count in
+                session.exec(self._service_window(statement, start_day, end_day)).all()]
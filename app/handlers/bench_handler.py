@@ -0,0 +1,78 @@
+# app/handlers/bench_handler.py
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.handlers.base_handler import BaseHandler
+from app.core.logger import get_logger
+from bench import DEFAULT_SEED, run_benchmark
+
+logger = get_logger(__name__)
+
+class BenchHandler(BaseHandler):
+    """
+    Handler for the benchmark suite: times ingest, the suspicious scan and
+    investigation queries on generated datasets, writes the results as JSON
+    and optionally compares them with an earlier results file.
+    """
+
+    def __init__(
+        self,
+        sizes: List[str],
+        seed: Optional[int] = None,
+        repeat: int = 3,
+        output: Optional[str] = None,
+        compare: Optional[str] = None,
+        database_url: Optional[str] = None
+    ):
+        self.sizes = sizes
+        self.seed = seed
+        self.repeat = repeat
+        self.output = output
+        self.compare = compare
+        self.database_url = database_url
+
+    def handle(self):
+        """
+        Runs the benchmark and prints one timing table per dataset size.
+        """
+        logger.info(f"⏱️ Running benchmark for sizes: {', '.join(self.sizes)}")
+        try:
+            baseline = self._load_baseline()
+            results = run_benchmark(self.sizes, seed=self.seed if self.seed is not None else DEFAULT_SEED,
+                                    repeat=self.repeat, output=self.output, database_url=self.database_url)
+
+            for size, run in results["runs"].items():
+                self._print_run(size, run, baseline.get("runs", {}).get(size))
+
+            logger.info(f"✅ Benchmark results saved to {results['output']}")
+
+        except Exception as e:
+            logger.error(f"❌ Benchmark failed: {str(e)}")
+            raise
+
+    def _load_baseline(self) -> Dict[str, Any]:
+        if not self.compare:
+            return {}
+        return json.loads(Path(self.compare).read_text(encoding="utf-8"))
+
+    def _print_run(self, size: str, run: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+        dataset = run["dataset"]
+        print(f"\n⏱️  BENCHMARK {size} ({dataset['users']:,} users, "
+              f"{dataset['hours'] * dataset['records_per_hour']:,} records, seed {dataset['seed']})")
+        print("=" * 88)
+        print(f"{'Phase':<36}{'Seconds':>11}{'Peak RSS (MB)':>15}{'Growth':>10}{'Baseline':>10}{'Change':>9}")
+        print("-" * 88)
+        baseline_phases = (baseline or {}).get("phases", {})
+        for name, phase in run["phases"].items():
+            before = baseline_phases.get(name, {}).get("seconds")
+            # Phases carry process_peak_rss_mb instead where the peak cannot be reset per phase
+            peak = phase.get("peak_rss_mb", phase.get("process_peak_rss_mb"))
+            growth = f"{phase['rss_growth_mb']:.1f}" if "rss_growth_mb" in phase else "-"
+            line = f"{name:<36}{phase['seconds']:>11.3f}{peak:>15.1f}{growth:>10}"
+            if before:
+                change = f"{(phase['seconds'] - before) / before:+.0%}"
+                print(f"{line}{before:>10.3f}{change:>9}")
+            else:
+                print(line)
+        print("=" * 88)
+        print(f"Investigated user: {run['target_aadhaar']}  |  Peak RSS: {run['peak_rss_mb']:.1f} MB")
@@ -0,0 +1,39 @@
+# app/handlers/compact_storage_handler.py
+from sqlmodel import Session
+from app.handlers.base_handler import BaseHandler
+from app.core.logger import get_logger
+from app.core.database import engine
+from app.crud import ipdr_crud
+from app.models.ipdr_log_model import DICTIONARY_COLUMNS
+
+logger = get_logger(__name__)
+
+class CompactStorageHandler(BaseHandler):
+    """
+    Handler for the compact IPDR storage layout: converts a text-layout log
+    table in place and lists the dimension tables.
+    """
+
+    def handle(self):
+        """
+        Converts IPDR logs to the compact layout if needed and prints the dimension sizes.
+        """
+        logger.info("🗜️ Converting IPDR logs to the compact storage layout...")
+        try:
+            with Session(engine) as session:
+                compact = ipdr_crud.compact
+                if compact.is_active(session):
+                    logger.info("IPDR logs already use the compact layout.")
+                else:
+                    stats = compact.enable(session)
+                    logger.info(f"✅ Converted {stats['rows']} logs, {stats['dimension_values']} dimension values.")
+
+                print("\n🗜️  IPDR DIMENSIONS")
+                print("=" * 50)
+                for name in DICTIONARY_COLUMNS:
+                    print(f"{name:<25}{len(compact.get_values(session, name)):>10,} values")
+                print("=" * 50)
+
+        except Exception as e:
+            logger.error(f"❌ Compact storage conversion failed: {str(e)}")
+            raise
@@ -0,0 +1,41 @@
+# app/handlers/export_columnar_handler.py
+from typing import Optional
+from sqlmodel import Session
+from app.handlers.base_handler import BaseHandler
+from app.core.logger import get_logger
+from app.core.database import engine
+from app.services.columnar_service import ColumnarService
+
+logger = get_logger(__name__)
+
+class ExportColumnarHandler(BaseHandler):
+    """
+    Handler for exporting the IPDR table to a day-partitioned Parquet snapshot
+    that analytics can read with IPDR_READ_MODE=columnar.
+    """
+
+    def __init__(self, output_path: Optional[str] = None):
+        self.columnar_service = ColumnarService(path=output_path)
+
+    def handle(self):
+        """
+        Writes the snapshot and prints a short summary.
+        """
+        logger.info(f"🧱 Exporting IPDR logs to columnar snapshot at {self.columnar_service.path}...")
+        try:
+            with Session(engine) as session:
+                stats = self.columnar_service.export(session)
+
+            if not stats['rows']:
+                logger.warning("⚠️ No IPDR logs found, snapshot is empty. Please load data first.")
+                return
+
+            logger.info("✅ Columnar export completed successfully.")
+            print(f"\n🧱 Exported {stats['rows']:,} IPDR logs in {stats['elapsed_seconds']}s")
+            print(f"   📅 Daily partitions: {stats['partitions']}")
+            print(f"   📄 Parquet files: {stats['files']} ({stats['size_mb']} MB)")
+            print(f"   📍 Location: {stats['path']}")
+
+        except Exception as e:
+            logger.error(f"❌ Columnar export failed: {str(e)}")
+            raise
@@ -1,9 +1,11 @@
 # app/handlers/load_data_handler.py
 from app.handlers.base_handler import BaseHandler
 from app.core.logger import get_logger
-from app.services.user_service import UserService
-from app.services.ipdr_service import IpdrService
-from app.core.database import engine
+from app.crud import user_crud, ipdr_crud, user_activity_crud, user_destination_crud, user_rollup_crud
+from app.operators.dummy_parser import UserCSVParser
+from app.operators.ipdr_log_parser import IPDRLogCSVParser
+from app.core.database import engine, ensure_partitioned_storage, ensure_compact_storage
+from app.core.config import settings
 from sqlmodel import Session, text
 
 logger = get_logger(__name__)
@@ -25,28 +27,27 @@ class LoadDataHandler(BaseHandler):
 
         logger.info("🚀 Loading sample data...")
         try:
-            user_service = UserService()
-            ipdr_service = IpdrService()
-
             # Define paths to the sample data files
             user_data_path = "Generator/realistic_users_24h_20250824_021654.csv"
             ipdr_data_path = "Generator/realistic_ipdr_24h_20250824_021654.csv"
 
-            # Load users
-            if user_service.count_users() == 0:
-                logger.info(f"Loading users from {user_data_path}...")
-                user_service.load_users_from_csv(user_data_path)
-                logger.info("✅ Users loaded successfully.")
-            else:
-                logger.info("Users already exist in the database. Skipping user loading.")
+            with Session(engine) as session:
+                # Load users
+                if user_crud.count(session) == 0:
+                    logger.info(f"Loading users from {user_data_path}...")
+                    UserCSVParser(user_crud).parse_and_load(user_data_path, session)
+                    logger.info("✅ Users loaded successfully.")
+                else:
+                    logger.info("Users already exist in the database. Skipping user loading.")
 
-            # Load IPDR logs
-            if ipdr_service.count_logs() == 0:
-                logger.info(f"Loading IPDR logs from {ipdr_data_path}...")
-                ipdr_service.load_ipdr_logs_from_csv(ipdr_data_path)
-                logger.info("✅ IPDR logs loaded successfully.")
-            else:
-                logger.info("IPDR logs already exist in the database. Skipping log loading.")
+                # Load IPDR logs (streamed in batches of MAX_BATCH_SIZE)
+                if ipdr_crud.count(session) == 0:
+                    logger.info(f"Loading IPDR logs from {ipdr_data_path}...")
+                    stats = IPDRLogCSVParser(ipdr_crud).parse_and_load(ipdr_data_path, session)
+                    logger.info(f"✅ IPDR logs loaded: {stats['loaded']} rows "
+                                f"({stats['rows_per_second']:,.0f} rows/sec), {stats['rejected']} rejected.")
+                else:
+                    logger.info("IPDR logs already exist in the database. Skipping log loading.")
             
             logger.info("✅ Sample data loading process completed.")
 
@@ -59,10 +60,21 @@ class LoadDataHandler(BaseHandler):
         logger.info("🔄 Clearing existing data...")
         try:
             with Session(engine) as session:
-                session.exec(text("DELETE FROM ipdrlogmodel"))
+                if ipdr_crud.partitions.is_active(session):
+                    ipdr_crud.partitions.drop_all(session)
+                else:
+                    session.exec(text("DELETE FROM ipdrlogmodel"))
                 session.exec(text("DELETE FROM usermodel"))
+                user_activity_crud.reset(session)
+                user_destination_crud.reset(session)
+                user_rollup_crud.reset(session)
                 session.commit()
                 logger.info("🗑️ Existing data cleared successfully.")
+            # The log table is empty now, so it can switch layout and partitioning before the reload
+            if settings.IPDR_STORAGE_LAYOUT == "compact":
+                ensure_compact_storage()
+            if settings.IPDR_PARTITIONING != "none":
+                ensure_partitioned_storage()
         except Exception as e:
             logger.error(f"❌ Failed to clear data: {str(e)}")
             raise
@@ -0,0 +1,65 @@
+# app/handlers/partition_handler.py
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import Session
+from app.handlers.base_handler import BaseHandler
+from app.core.logger import get_logger
+from app.core.database import engine
+from app.crud import ipdr_crud
+
+logger = get_logger(__name__)
+
+class PartitionHandler(BaseHandler):
+    """
+    Handler for time-partitioned IPDR storage: migrates the log table into
+    partitions, applies retention by dropping whole partitions and lists them.
+    """
+
+    def __init__(self, drop_before: Optional[str] = None, retain_days: Optional[int] = None):
+        self.drop_before = drop_before
+        self.retain_days = retain_days
+
+    def handle(self):
+        """
+        Enables partitioning if needed, drops expired partitions and prints the catalog.
+        """
+        logger.info("🗓️ Managing IPDR partitions...")
+        try:
+            with Session(engine) as session:
+                partitions = ipdr_crud.partitions
+                if not partitions.is_active(session):
+                    logger.info("Migrating IPDR logs into time partitions...")
+                    stats = partitions.enable(session)
+                    logger.info(f"✅ Moved {stats['rows']} logs into {stats['partitions']} partitions.")
+
+                cutoff = self._retention_cutoff()
+                if cutoff:
+                    dropped = partitions.drop_before(session, cutoff)
+                    if dropped:
+                        logger.info(f"🗑️ Dropped {len(dropped)} partitions ending before {cutoff:%Y-%m-%d}: {', '.join(dropped)}")
+                    else:
+                        logger.info(f"No partitions end before {cutoff:%Y-%m-%d}.")
+
+                self._print_partitions(partitions.get_partitions(session))
+
+        except Exception as e:
+            logger.error(f"❌ Partition management failed: {str(e)}")
+            raise
+
+    def _retention_cutoff(self) -> Optional[datetime]:
+        if self.drop_before:
+            return datetime.fromisoformat(self.drop_before)
+        if self.retain_days is not None:
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            return today - timedelta(days=self.retain_days)
+        return None
+
+    def _print_partitions(self, partitions):
+        print(f"\n🗓️  IPDR PARTITIONS ({len(partitions)})")
+        print("=" * 70)
+        print(f"{'Table':<30}{'From':<13}{'To':<13}{'Rows':>14}")
+        print("-" * 70)
+        for partition in partitions:
+            print(f"{partition.TableName:<30}{partition.RangeStart:%Y-%m-%d}   {partition.RangeEnd:%Y-%m-%d}   "
+                  f"{partition.RowCount:>14,}")
+        print("=" * 70)
@@ -1,20 +1,44 @@
 # app/handlers/suspicious_analysis_handler.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
 from sqlmodel import Session
 from app.handlers.base_handler import BaseHandler
+from app.core.config import settings
 from app.core.logger import get_logger
-from app.core.database import engine
+from app.core.database import engine, build_engine
+from app.core.profiling import span
 from app.services.user_service import UserService
-from app.services.ipdr_service import IpdrService
 from app.services.investigation_service import InvestigationService
-import pandas as pd
 
 logger = get_logger(__name__)
 
+# Per-process state for report workers, set up by _init_report_worker
+_worker_engine = None
+_worker_service: Optional[InvestigationService] = None
+
+def _init_report_worker():
+    """Give each worker process its own engine instead of the parent's pooled connections."""
+    global _worker_engine, _worker_service
+    _worker_engine = build_engine()
+    _worker_service = InvestigationService()
+
+def _summarize_user(aadhaar_no: str) -> Dict[str, Any]:
+    """Compute one user's report fields inside a worker process."""
+    with Session(_worker_engine) as session:
+        return _worker_service.get_report_summary(session, aadhaar_no)
+
 class SuspiciousAnalysisHandler(BaseHandler):
     """
     Handler for running suspicious user analysis.
+
+    Per-user report summaries are computed across a process pool and the
+    sections are streamed to the report file in order as they complete.
     """
 
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.REPORT_WORKERS or os.cpu_count() or 1
+
     def handle(self):
         """
         Executes the suspicious user analysis and report generation.
@@ -23,11 +47,11 @@ class SuspiciousAnalysisHandler(BaseHandler):
         try:
             with Session(engine) as session:
                 user_service = UserService()
-                investigation_service = InvestigationService()
 
                 logger.info("Identifying suspicious users based on activity patterns...")
-                suspicious_users = user_service.find_suspicious_users(session)
-                
+                with span("find suspicious users"):
+                    suspicious_users = user_service.find_suspicious_users(session)
+
                 if not suspicious_users:
                     logger.warning("⚠️ No suspicious users found in the database.")
                     return
@@ -35,11 +59,12 @@ class SuspiciousAnalysisHandler(BaseHandler):
                 report_path = "reports/suspicious_analysis_report.txt"
                 logger.info(f"Generating suspicious analysis report at: {report_path}")
 
-                with open(report_path, "w") as f:
+                with span("write report"), open(report_path, "w") as f:
                     self._write_report_header(f, len(suspicious_users))
 
-                    for i, user in enumerate(suspicious_users, 1):
-                        self._write_user_section(f, user, i, session, investigation_service)
+                    summaries = self._iter_summaries(session, [user.AadhaarNo for user in suspicious_users])
+                    for i, (user, summary) in enumerate(zip(suspicious_users, summaries), 1):
+                        self._write_user_section(f, user, i, summary)
 
                 logger.info(f"✅ Suspicious analysis report generated successfully.")
                 print(f"\n📄 Report saved to {report_path}")
@@ -48,6 +73,20 @@ class SuspiciousAnalysisHandler(BaseHandler):
             logger.error(f"❌ Suspicious analysis failed: {str(e)}")
             raise
 
+    def _iter_summaries(self, session: Session, aadhaar_nos: List[str]) -> Iterator[Dict[str, Any]]:
+        """Yield report summaries in input order, fanning out over worker processes when useful."""
+        workers = min(self.workers, len(aadhaar_nos))
+        if workers <= 1:
+            investigation_service = InvestigationService()
+            for aadhaar_no in aadhaar_nos:
+                yield investigation_service.get_report_summary(session, aadhaar_no)
+            return
+
+        logger.info(f"Summarizing {len(aadhaar_nos)} users across {workers} worker processes...")
+        chunksize = max(1, len(aadhaar_nos) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_report_worker) as executor:
+            yield from executor.map(_summarize_user, aadhaar_nos, chunksize=chunksize)
+
     def _write_report_header(self, f, count):
         f.write("="*80 + "\n")
         f.write("🚨 SUSPICIOUS USER ACTIVITY ANALYSIS REPORT\n")
@@ -57,7 +96,7 @@ class SuspiciousAnalysisHandler(BaseHandler):
         f.write("- Communication with a large number of unique B-parties\n")
         f.write("- Activity during odd hours (e.g., 1 AM - 5 AM)\n\n")
 
-    def _write_user_section(self, f, user, index, session, investigation_service):
+    def _write_user_section(self, f, user, index, summary):
         f.write("-" * 70 + "\n")
         f.write(f"SUSPICIOUS USER #{index}\n")
         f.write("-" * 70 + "\n")
@@ -66,9 +105,6 @@ class SuspiciousAnalysisHandler(BaseHandler):
         f.write(f"📞 Phone:        {user.PhoneNo}\n")
         f.write(f"🏠 Address:      {user.Address}\n\n")
 
-        # Get a summary from the investigation service
-        summary = investigation_service.get_user_summary(session, user.AadhaarNo)
-        
         f.write("📊 Activity Summary:\n")
         f.write(f"   - Total Sessions: {summary['total_sessions']}\n")
         f.write(f"   - Total Data Usage: {summary['total_data_usage_gb']:.2f} GB\n")
@@ -80,13 +116,12 @@ class SuspiciousAnalysisHandler(BaseHandler):
             f.write(f"   - ❗️ Operates during odd hours: {summary['off_hours_activity_percentage']:.2f}% of activity is between 1 AM and 5 AM.\n")
         else:
             f.write("   - Normal operating hours observed.\n")
-        
+
         f.write(f"   - Most Active Day: {summary['most_active_day']}\n\n")
 
         f.write("🤝 Communication Network:\n")
         f.write(f"   - Unique B-Parties: {summary['unique_b_parties']}\n")
         f.write(f"   - Top Contact (by frequency): {summary['top_b_party_by_freq']}\n")
         f.write(f"   - Top Contact (by data): {summary['top_b_party_by_data']} ({summary['top_b_party_data_gb']:.2f} GB)\n\n")
-        
-        f.write("✍️ Analyst's Note: This user is flagged due to a combination of high data usage, a wide communication network, and/or off-hours activity. Further investigation is recommended.\n\n")
 
+        f.write("✍️ Analyst's Note: This user is flagged due to a combination of high data usage, a wide communication network, and/or off-hours activity. Further investigation is recommended.\n\n")
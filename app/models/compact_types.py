@@ -0,0 +1,209 @@
+# app/models/compact_types.py
+"""
+Column types for the compact IPDR storage layout.
+
+They convert at the SQLAlchemy boundary, so models and queries keep working
+with plain strings: ``IPDRLogModel.DestinationIP == "8.8.8.8"`` binds the
+packed address, and results come back as text. Only raw SQL sees the
+stored form.
+"""
+import ipaddress
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from sqlalchemy import LargeBinary, SmallInteger, and_, event, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.types import TypeDecorator
+
+from app.models.ipdr_dimension_model import IPDRDimensionModel
+
+# Bound for values missing from the dimension table, so comparisons against them match nothing
+UNKNOWN_CODE = -1
+
+# Connection of the statement being executed: type processors get no connection
+# of their own, so registry misses read the dimension table through this one.
+# Results are decoded after execute() returns, so it stays set until the next
+# statement; a weak reference keeps it from holding the connection open.
+_statement_connection: ContextVar[Optional[Callable[[], Optional[Connection]]]] = ContextVar(
+    "statement_connection", default=None
+)
+
+
+def _track_statement_connection(conn, clauseelement, multiparams, params, execution_options):
+    _statement_connection.set(weakref.ref(conn))
+
+
+def track_statement_connections():
+    """Record each statement's connection for registry misses. Only needed by the compact layout."""
+    if not event.contains(Engine, "before_execute", _track_statement_connection):
+        event.listen(Engine, "before_execute", _track_statement_connection)
+
+
+@lru_cache(maxsize=65536)
+def _ip_text(packed: bytes) -> str:
+    return str(ipaddress.ip_address(packed)) if packed else ""
+
+
+class IPAddressType(TypeDecorator):
+    """
+    IPv4/IPv6 address stored packed: 4 bytes for IPv4, 16 bytes for IPv6.
+    Equality is a short binary compare and, within one address family, byte
+    order is numeric order, so CIDR ranges become BETWEEN scans (see ``ip_range``).
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None or isinstance(value, bytes):
+            return value
+        if value == "":
+            return b""
+        return ipaddress.ip_address(value).packed
+
+    def process_result_value(self, value: Any, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return _ip_text(bytes(value))
+
+
+def ip_range(column, network: str):
+    """SQL condition matching addresses of an IPAddressType `column` inside the CIDR `network`."""
+    net = ipaddress.ip_network(network, strict=False)
+    # Pin the length so IPv6 values sharing a leading byte prefix cannot fall inside an IPv4 range
+    return and_(
+        func.length(column) == len(net.network_address.packed),
+        column.between(str(net.network_address), str(net.broadcast_address)),
+    )
+
+
+class DimensionRegistry:
+    """
+    In-process copy of the ipdrdimensionmodel table, mapping value <-> code
+    per dictionary-encoded column. Loaded lazily and refreshed when an unseen
+    value or code turns up, reading through the caller's connection (or the
+    one executing the statement being bound or decoded), so it sees the
+    caller's database and transaction. New values are added by
+    IPDRCompactStorageCRUD.register before rows that use them are written.
+    """
+
+    def __init__(self):
+        self._codes: Dict[str, Dict[str, int]] = {}
+        self._values: Dict[str, Dict[int, str]] = {}
+        self._loaded = False
+        self._misses: Set[Tuple[str, Any]] = set()
+        self._lock = threading.RLock()
+
+    def add(self, name: str, value: str, code: int):
+        with self._lock:
+            self._codes.setdefault(name, {})[value] = code
+            self._values.setdefault(name, {})[code] = value
+            self._misses.discard((name, value))
+            self._misses.discard((name, code))
+
+    def known_values(self, name: str, connection: Optional[Connection] = None) -> Set[str]:
+        self.ensure_loaded(connection)
+        with self._lock:
+            return set(self._codes.get(name, {}))
+
+    @contextmanager
+    def bound(self, connection: Connection):
+        """Read misses through `connection` while converting values outside a statement execution."""
+        token = _statement_connection.set(weakref.ref(connection))
+        try:
+            yield self
+        finally:
+            _statement_connection.reset(token)
+
+    def invalidate(self):
+        """Forget everything, e.g. after a rollback discarded newly registered values."""
+        with self._lock:
+            self._codes.clear()
+            self._values.clear()
+            self._misses.clear()
+            self._loaded = False
+
+    def ensure_loaded(self, connection: Optional[Connection] = None):
+        with self._lock:
+            if not self._loaded:
+                self._reload(connection)
+
+    def _reload(self, connection: Optional[Connection] = None) -> bool:
+        """Re-read the dimension table. False when there was no usable connection to read through."""
+        conn = connection
+        if conn is None:
+            tracked = _statement_connection.get()
+            conn = tracked() if tracked else None
+        if conn is None or conn.closed or conn.invalidated:
+            return False  # Keep what is cached
+
+        table = IPDRDimensionModel.__table__
+        # Check first: a failed query would abort the caller's PostgreSQL transaction
+        if inspect(conn).has_table(table.name):
+            rows = conn.execute(select(table.c.Name, table.c.Code, table.c.Value)).all()
+        else:
+            rows = []  # Not created yet
+
+        self._codes.clear()
+        self._values.clear()
+        for name, code, value in rows:
+            self._codes.setdefault(name, {})[value] = code
+            self._values.setdefault(name, {})[code] = value
+        self._misses.clear()
+        self._loaded = True
+        return True
+
+    def code(self, name: str, value: str) -> int:
+        code = self._codes.get(name, {}).get(value)
+        if code is not None:
+            return code
+        with self._lock:
+            self.ensure_loaded()
+            code = self._codes.get(name, {}).get(value)
+            if code is None and (name, value) not in self._misses and self._reload():
+                code = self._codes.get(name, {}).get(value)
+                if code is None:
+                    self._misses.add((name, value))
+            return UNKNOWN_CODE if code is None else code
+
+    def value(self, name: str, code: int) -> Optional[str]:
+        # Hot path for every decoded result row: plain dict reads, no lock
+        value = self._values.get(name, {}).get(code)
+        if value is not None:
+            return value
+        with self._lock:
+            self.ensure_loaded()
+            value = self._values.get(name, {}).get(code)
+            if value is None and (name, code) not in self._misses and self._reload():
+                value = self._values.get(name, {}).get(code)
+                if value is None:
+                    self._misses.add((name, code))
+            return value
+
+
+dimension_registry = DimensionRegistry()
+
+
+class DictionaryEncoded(TypeDecorator):
+    """
+    Low-cardinality string stored as a small integer code from the
+    ipdrdimensionmodel table. `name` is the dimension, normally the column name.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[int]:
+        if value is None or isinstance(value, int):
+            return value
+        return dimension_registry.code(self.name, value)
+
+    def process_result_value(self, value: Any, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return dimension_registry.value(self.name, value)
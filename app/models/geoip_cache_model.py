@@ -0,0 +1,22 @@
+# app/models/geoip_cache_model.py
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class GeoIPCacheModel(SQLModel, table=True):
+    """
+    Persistent GeoIP lookup cache stored in the project database.
+    Found=False rows record negative results (private or unknown IPs)
+    so repeat runs can skip the MMDB lookup for them as well.
+    """
+    IPAddress: str = Field(primary_key=True)
+    Found: bool = False
+    Country: Optional[str] = None
+    City: Optional[str] = None
+    PostalCode: Optional[str] = None
+    Latitude: Optional[float] = None
+    Longitude: Optional[float] = None
+    ISP: Optional[str] = None
+    Organization: Optional[str] = None
+    CachedAt: datetime = Field(default_factory=datetime.now, index=True)
@@ -0,0 +1,14 @@
+# app/models/index_state_model.py
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class IndexStateModel(SQLModel, table=True):
+    """
+    Completeness marker of a table derived from the IPDR logs, such as the
+    user ↔ destination index or the daily rollups. A row means the table was
+    built from every log and has been maintained since; no row means it
+    cannot be trusted and is rebuilt from the IPDR logs.
+    """
+    Name: str = Field(primary_key=True)
+    CompletedAt: datetime = Field(default_factory=datetime.now)
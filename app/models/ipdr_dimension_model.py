@@ -0,0 +1,18 @@
+# app/models/ipdr_dimension_model.py
+from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint
+
+
+class IPDRDimensionModel(SQLModel, table=True):
+    """
+    Dimension values for the dictionary-encoded IPDR columns of the compact
+    storage layout. Name is the IPDR column (e.g. "Service"), and log rows
+    store the small integer Code instead of repeating Value.
+    """
+    __table_args__ = (
+        UniqueConstraint("Name", "Value", name="uq_ipdrdimensionmodel_Name_Value"),
+    )
+
+    Name: str = Field(primary_key=True)
+    Code: int = Field(primary_key=True)
+    Value: str
@@ -1,39 +1,76 @@
 from sqlmodel import SQLModel, Field, Column, JSON
-from typing import Optional, List, Dict
+from sqlalchemy import Index
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 import ipaddress
 
+from app.core.config import settings
+from app.models.compact_types import IPAddressType, DictionaryEncoded, track_statement_connections
+
+# Compact layout: packed IPs, dictionary-coded categoricals and real lat/long columns.
+# Attribute types stay str either way; see app/models/compact_types.py
+COMPACT_STORAGE = settings.IPDR_STORAGE_LAYOUT == "compact"
+if COMPACT_STORAGE:
+    track_statement_connections()
+
+# Columns stored as small-int codes in the compact layout
+DICTIONARY_COLUMNS = ["Protocol", "Service", "AppName", "ISP", "SessionType", "DataType", "ConnectionQuality"]
+
+def _ip_field(**kwargs) -> Any:
+    return Field(sa_type=IPAddressType, **kwargs) if COMPACT_STORAGE else Field(**kwargs)
+
+def _dictionary_field(name: str, **kwargs) -> Any:
+    return Field(sa_type=DictionaryEncoded(name), **kwargs) if COMPACT_STORAGE else Field(**kwargs)
+
 
 class IPDRLogModel(SQLModel, table=True):
+    # ✅ Composite indexes for the hot lookups. Their leading columns also
+    # serve plain AadhaarNo and DestinationIP equality filters.
+    __table_args__ = (
+        Index("ix_ipdrlogmodel_AadhaarNo_StartTime", "AadhaarNo", "StartTime"),
+        Index("ix_ipdrlogmodel_DestinationIP_AadhaarNo", "DestinationIP", "AadhaarNo"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     AadhaarNo: str
-    IMEI: str
-    MSISDN: str
-    StartTime: datetime
+    IMEI: str = Field(index=True)
+    MSISDN: str = Field(index=True)
+    StartTime: datetime = Field(index=True)
     EndTime: datetime
     Duration: int
 
-    SourceIP: str
+    SourceIP: str = _ip_field(index=True)
     SourcePort: int
-    DestinationIP: str
+    DestinationIP: str = _ip_field()
     DestinationPort: int
 
-    Protocol: str
+    Protocol: str = _dictionary_field("Protocol")
     BytesUpload: int
     BytesDownload: int
-    Service: str
-    AppName: Optional[str] = "Unknown"
-    ISP: str
+    Service: str = _dictionary_field("Service")
+    AppName: Optional[str] = _dictionary_field("AppName", default="Unknown")
+    ISP: str = _dictionary_field("ISP")
     CellTowerID: str
     LAC: str
-    SessionType: str
-    DataType: str
+    SessionType: str = _dictionary_field("SessionType")
+    DataType: str = _dictionary_field("DataType")
 
     # ✅ Store Dict and List as JSON
-    Location: Dict[str, float] = Field(default={}, sa_column=Column(JSON))
+    if COMPACT_STORAGE:
+        Latitude: Optional[float] = None
+        Longitude: Optional[float] = None
+    else:
+        Location: Dict[str, float] = Field(default={}, sa_column=Column(JSON))
     IsSuspicious: bool = False
     SuspiciousFlags: List[str] = Field(default=[], sa_column=Column(JSON))
-    ConnectionQuality: str = "Good"
+    ConnectionQuality: str = _dictionary_field("ConnectionQuality", default="Good")
+
+    @staticmethod
+    def location_values(location: Dict[str, float]) -> Dict[str, Any]:
+        """Column values for a location dict in the active storage layout."""
+        if COMPACT_STORAGE:
+            return {"Latitude": location.get("latitude"), "Longitude": location.get("longitude")}
+        return {"Location": location}
 
     # ✅ Validator for IPs
     @staticmethod
@@ -0,0 +1,18 @@
+# app/models/ipdr_partition_model.py
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class IPDRPartitionModel(SQLModel, table=True):
+    """
+    Catalog of time-partitioned IPDR log tables.
+    Each partition holds the sessions with RangeStart <= StartTime < RangeEnd;
+    the catalog lets queries skip partitions outside a requested window and
+    keeps row counts and the highest assigned log id without scanning them.
+    """
+    TableName: str = Field(primary_key=True)
+    RangeStart: datetime = Field(index=True)
+    RangeEnd: datetime
+    RowCount: int = 0
+    MaxId: int = 0
+    CreatedAt: datetime = Field(default_factory=datetime.now)
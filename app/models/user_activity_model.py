@@ -0,0 +1,47 @@
+# app/models/user_activity_model.py
+from datetime import datetime
+from typing import List, Optional
+from sqlmodel import SQLModel, Field, Column, JSON
+from sqlalchemy import BigInteger
+
+
+class UserActivityModel(SQLModel, table=True):
+    """
+    Running per-user totals of the suspicious-rule inputs, maintained
+    incrementally at ingest. Version is bumped on every change and
+    ScoredVersion records the Version the last evaluation read, so scoring
+    re-evaluates exactly the rows where they differ; IsFlagged and Rules hold
+    the result of that evaluation.
+    """
+    AadhaarNo: str = Field(primary_key=True)
+    SessionCount: int = 0
+    # Byte totals outgrow a 32-bit INTEGER on PostgreSQL
+    BytesUpload: int = Field(default=0, sa_type=BigInteger)
+    BytesDownload: int = Field(default=0, sa_type=BigInteger)
+    LateNightSessions: int = 0
+    ExfiltrationSessions: int = 0
+    Version: int = 1
+    ScoredVersion: int = 0
+    IsFlagged: bool = Field(default=False, index=True)
+    Rules: List[str] = Field(default=[], sa_column=Column(JSON))
+
+
+class UserServiceUsageModel(SQLModel, table=True):
+    """
+    Sessions per (AadhaarNo, Service), kept beside UserActivityModel so the
+    distinct-service rule can be answered (and logs subtracted) exactly.
+    """
+    AadhaarNo: str = Field(primary_key=True)
+    Service: str = Field(primary_key=True)
+    SessionCount: int = 0
+
+
+class ScoringStateModel(SQLModel, table=True):
+    """
+    Time of the last suspicious scoring run and the ANALYSIS_THRESHOLDS the
+    activity aggregates were counted with. No row means the aggregates
+    cannot be trusted and are rebuilt from the IPDR logs.
+    """
+    Name: str = Field(primary_key=True)
+    ScoredAt: Optional[datetime] = None
+    ThresholdsKey: str = ""
@@ -0,0 +1,20 @@
+# app/models/user_destination_model.py
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, BigInteger
+
+
+class UserDestinationModel(SQLModel, table=True):
+    """
+    Bipartite user ↔ destination IP index aggregated from IPDR logs.
+    One row per (AadhaarNo, DestinationIP) pair, maintained incrementally
+    at ingest and used to expand network clusters without touching raw logs.
+    """
+    __table_args__ = (
+        Index("ix_userdestinationmodel_DestinationIP_SessionCount", "DestinationIP", "SessionCount"),
+    )
+
+    AadhaarNo: str = Field(primary_key=True)
+    DestinationIP: str = Field(primary_key=True)
+    SessionCount: int = 0
+    # Byte totals outgrow a 32-bit INTEGER on PostgreSQL
+    TotalBytes: int = Field(default=0, sa_type=BigInteger)
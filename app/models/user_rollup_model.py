@@ -0,0 +1,73 @@
+# app/models/user_rollup_model.py
+from datetime import date
+from sqlmodel import SQLModel, Field
+from sqlalchemy import BigInteger
+
+# Hour-of-day histogram columns, Hour00 .. Hour23
+HOUR_COLUMNS = [f"Hour{hour:02d}" for hour in range(24)]
+
+
+class DailyRollupTotals(SQLModel):
+    """
+    Per-day session totals shared by the rollup tables. The hour histogram is
+    one column per hour of StartTime, so ingest can add to it in SQL.
+    """
+    SessionCount: int = 0
+    # Byte and duration totals outgrow a 32-bit INTEGER on PostgreSQL
+    BytesUpload: int = Field(default=0, sa_type=BigInteger)
+    BytesDownload: int = Field(default=0, sa_type=BigInteger)
+    TotalDuration: int = Field(default=0, sa_type=BigInteger)
+    Hour00: int = 0
+    Hour01: int = 0
+    Hour02: int = 0
+    Hour03: int = 0
+    Hour04: int = 0
+    Hour05: int = 0
+    Hour06: int = 0
+    Hour07: int = 0
+    Hour08: int = 0
+    Hour09: int = 0
+    Hour10: int = 0
+    Hour11: int = 0
+    Hour12: int = 0
+    Hour13: int = 0
+    Hour14: int = 0
+    Hour15: int = 0
+    Hour16: int = 0
+    Hour17: int = 0
+    Hour18: int = 0
+    Hour19: int = 0
+    Hour20: int = 0
+    Hour21: int = 0
+    Hour22: int = 0
+    Hour23: int = 0
+
+
+class UserDailyRollupModel(DailyRollupTotals, table=True):
+    """
+    A user's sessions per day (by StartTime), maintained incrementally at
+    ingest so time-window summaries read one row per day.
+    """
+    AadhaarNo: str = Field(primary_key=True)
+    Day: date = Field(primary_key=True)
+
+
+class UserDestinationDailyRollupModel(DailyRollupTotals, table=True):
+    """A user's sessions with one destination IP per day, for time-window partner summaries."""
+    AadhaarNo: str = Field(primary_key=True)
+    Day: date = Field(primary_key=True)
+    DestinationIP: str = Field(primary_key=True)
+
+
+class UserServiceDailyRollupModel(SQLModel, table=True):
+    """
+    A user's sessions per day by destination, service and protocol, for the
+    service, protocol and partner-detail lists of time-window summaries.
+    Missing values are stored as '' so they can be part of the key.
+    """
+    AadhaarNo: str = Field(primary_key=True)
+    Day: date = Field(primary_key=True)
+    DestinationIP: str = Field(primary_key=True)
+    Service: str = Field(primary_key=True)
+    Protocol: str = Field(primary_key=True)
+    SessionCount: int = 0
@@ -1,69 +1,125 @@
 # app/parsers/dummy_parser.py
 import csv
+import time
+from typing import Optional, List, Dict, Any
 from sqlmodel import Session
 from app.operators.base_parser import BaseParser
-from app.models.user_model import UserModel
 from app.crud.user_crud import UserCRUD
+from app.crud.pg_copy import supports_copy
+from app.core.config import settings
+from app.core.profiling import span, profiled
+from app.core.metrics import ROWS_INGESTED, ROWS_REJECTED
 
 class UserCSVParser(BaseParser):
     """
     A dummy parser to read user data from a CSV file and load it into the database.
     Assumes CSV format: AadhaarNo,Name,Age,Address,Email,PhoneNo,City,State,ISP
+    with optional pipe-separated Devices, AssignedIPs and UsualActiveHours columns
+    as written by the Generator.
+
+    Users are deduplicated on AadhaarNo in memory and written with batched
+    ``INSERT ... ON CONFLICT`` statements instead of a read and a commit per row
+    (via a COPY staging table on PostgreSQL).
     """
-    
-    def __init__(self, crud_instance: UserCRUD):
+
+    def __init__(
+        self,
+        crud_instance: UserCRUD,
+        batch_size: Optional[int] = None,
+        update_existing: bool = False
+    ):
         self.user_crud = crud_instance
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+
+    @staticmethod
+    def _split_pipe(value: Optional[str]) -> List[str]:
+        """Split a pipe-separated CSV cell, ignoring empty entries."""
+        if not value:
+            return []
+        return [item for item in value.split("|") if item]
 
-    def parse_and_load(self, file_path: str, session: Session) -> None:
+    def _transform_row(self, row: Dict[str, str]) -> Dict[str, Any]:
+        """Convert a raw CSV row into a column dict for the user table."""
+        return {
+            "AadhaarNo": row["AadhaarNo"],
+            "Name": row["Name"],
+            "Age": int(row["Age"]),
+            "Address": row["Address"],
+            "Email": row["Email"],
+            "PhoneNo": row["PhoneNo"],
+            "City": row["City"],
+            "State": row["State"],
+            "Devices": self._split_pipe(row.get("Devices")),
+            "AssignedIPs": self._split_pipe(row.get("AssignedIPs")),
+            "ISP": row.get("ISP") or "Unknown",  # .get for optional fields
+            "IsSuspicious": False,
+            "SuspiciousType": [],
+            "HomeLocation": {},
+            "UsualActiveHours": [int(hour) for hour in self._split_pipe(row.get("UsualActiveHours"))],
+        }
+
+    @profiled("load users")
+    def parse_and_load(self, file_path: str, session: Session) -> Dict[str, Any]:
         """
-        Parses a CSV file with user data and inserts it into the database.
+        Parses a CSV file with user data and upserts it into the database in batches.
+
+        Returns:
+            Dict with created, duplicate and error counts plus elapsed time.
         """
         print(f"Starting to parse file: {file_path}")
+        stats = {'created': 0, 'duplicates': 0, 'errors': 0, 'elapsed_seconds': 0.0}
+        started = time.perf_counter()
+        batch_size = self.batch_size or (settings.COPY_BATCH_SIZE if supports_copy(session) else settings.MAX_BATCH_SIZE)
         try:
-            with open(file_path, mode='r', encoding='utf-8') as csvfile:
+            with open(file_path, mode='r', encoding='utf-8', newline='') as csvfile:
                 reader = csv.DictReader(csvfile)
-                users_to_create = []
+                seen = set()
+                batch = []
+                submitted = 0
+
                 for row in reader:
-                    user_data = UserModel(
-                        AadhaarNo=row["AadhaarNo"],
-                        Name=row["Name"],
-                        Age=int(row["Age"]),
-                        Address=row["Address"],
-                        Email=row["Email"],
-                        PhoneNo=row["PhoneNo"],
-                        City=row["City"],
-                        State=row["State"],
-                        ISP=row.get("ISP", "Unknown") # .get for optional fields
-                    )
-                    users_to_create.append(user_data)
-                
-                # Insert users with duplicate handling
-                created_count = 0
-                duplicate_count = 0
-                error_count = 0
-                
-                for user in users_to_create:
                     try:
-                        # Check if user already exists
-                        existing_user = self.user_crud.read(session, user.AadhaarNo)
-                        if existing_user:
-                            duplicate_count += 1
-                            print(f"Duplicate user skipped: {user.AadhaarNo} - {user.Name}")
-                            continue
-                        
-                        self.user_crud.create(session, user)
-                        created_count += 1
-                        
-                    except Exception as user_error:
-                        error_count += 1
-                        print(f"Error creating user {user.AadhaarNo}: {str(user_error)}")
+                        user_data = self._transform_row(row)
+                    except (KeyError, TypeError, ValueError) as row_error:
+                        stats['errors'] += 1
+                        print(f"Error parsing user {row.get('AadhaarNo')}: {str(row_error)}")
                         continue
 
+                    # Duplicates within the file are dropped before reaching the database
+                    if user_data["AadhaarNo"] in seen:
+                        stats['duplicates'] += 1
+                        continue
+                    seen.add(user_data["AadhaarNo"])
+                    batch.append(user_data)
+
+                    if len(batch) >= batch_size:
+                        with span("upsert batch"):
+                            stats['created'] += self.user_crud.bulk_upsert(session, batch, self.update_existing)
+                        submitted += len(batch)
+                        batch = []
+
+                if batch:
+                    with span("upsert batch"):
+                        stats['created'] += self.user_crud.bulk_upsert(session, batch, self.update_existing)
+                    submitted += len(batch)
+
+                # Rows that hit ON CONFLICT DO NOTHING were already in the database
+                if not self.update_existing:
+                    stats['duplicates'] += submitted - stats['created']
+
+            stats['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+            ROWS_INGESTED.inc(stats['created'], table="usermodel")
+            ROWS_REJECTED.inc(stats['errors'], table="usermodel")
             print(f"Successfully processed {file_path}")
-            print(f"Created: {created_count}, Duplicates: {duplicate_count}, Errors: {error_count}")
+            print(f"Created: {stats['created']}, Duplicates: {stats['duplicates']}, Errors: {stats['errors']} "
+                  f"({stats['elapsed_seconds']}s)")
+            return stats
 
         except FileNotFoundError:
             print(f"Error: File not found at {file_path}")
+            return stats
         except Exception as e:
+            session.rollback()
             print(f"An error occurred: {e}")
-            raise
\ No newline at end of file
+            raise
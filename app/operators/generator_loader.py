@@ -0,0 +1,133 @@
+# app/parsers/generator_loader.py
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from sqlmodel import Session
+from app.models.ipdr_log_model import IPDRLogModel
+from app.crud.user_crud import UserCRUD
+from app.crud.ipdr_crud import IPDRLogCRUD
+from app.crud.pg_copy import supports_copy
+from app.core.config import settings
+from app.core.profiling import span, profiled
+from app.core.metrics import ROWS_INGESTED
+
+# IPDR columns taken as generated; times, location and analysis flags are set separately
+IPDR_COPIED_COLUMNS = [
+    "AadhaarNo", "IMEI", "MSISDN", "Duration", "SourceIP", "SourcePort", "DestinationIP", "DestinationPort",
+    "Protocol", "BytesUpload", "BytesDownload", "Service", "AppName", "ISP", "CellTowerID", "LAC",
+    "SessionType", "DataType", "ConnectionQuality",
+]
+
+
+class GeneratorLoader:
+    """
+    Loads Generator output straight into the database, skipping the CSV
+    serialize/parse round trip.
+
+    Users come from RealisticUserGenerator and IPDR logs from
+    BulkIPDRGenerator, one generated hour at a time. The column dicts match
+    what UserCSVParser and IPDRLogCSVParser build from the same data (like
+    them, ground-truth suspicion labels are not loaded) and go through the
+    same CRUD bulk paths: COPY on PostgreSQL, partitions, the compact layout
+    and the user ↔ destination index. Each batch is one transaction.
+    """
+
+    def __init__(self, user_crud: UserCRUD, ipdr_crud: IPDRLogCRUD, batch_size: Optional[int] = None):
+        self.user_crud = user_crud
+        self.ipdr_crud = ipdr_crud
+        self.batch_size = batch_size
+
+    def _resolve_batch_size(self, session: Session) -> int:
+        """Explicit batch size, else COPY_BATCH_SIZE for PostgreSQL COPY loads and MAX_BATCH_SIZE otherwise."""
+        if self.batch_size:
+            return self.batch_size
+        return settings.COPY_BATCH_SIZE if supports_copy(session) else settings.MAX_BATCH_SIZE
+
+    @staticmethod
+    def _user_row(user) -> Dict[str, Any]:
+        """Column dict for a generated UserModel, as UserCSVParser builds it."""
+        return {
+            "AadhaarNo": user.AadhaarNo,
+            "Name": user.Name,
+            "Age": user.Age,
+            "Address": user.Address,
+            "Email": user.Email,
+            "PhoneNo": user.PhoneNo,
+            "City": user.City,
+            "State": user.State,
+            "Devices": list(user.Devices),
+            "AssignedIPs": list(user.AssignedIPs),
+            "ISP": user.ISP or "Unknown",
+            "IsSuspicious": False,
+            "SuspiciousType": [],
+            "HomeLocation": {},
+            "UsualActiveHours": list(user.UsualActiveHours),
+        }
+
+    @staticmethod
+    def _ipdr_rows(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Column dicts for one generated hour, as IPDRLogCSVParser builds them."""
+        names = IPDR_COPIED_COLUMNS + ["StartTime", "EndTime"]
+        values = [columns[name] for name in IPDR_COPIED_COLUMNS] + [
+            columns["StartTime"].astype("datetime64[us]").tolist(),
+            columns["EndTime"].astype("datetime64[us]").tolist(),
+        ]
+        location = IPDRLogModel.location_values({})
+        return [{**dict(zip(names, row)), **location, "IsSuspicious": False, "SuspiciousFlags": []}
+                for row in zip(*values)]
+
+    @profiled("load generated users")
+    def load_users(self, session: Session, users: Iterable) -> Dict[str, Any]:
+        """
+        Upserts generated users in batches. Existing users are left untouched.
+
+        Returns:
+            Dict with the created count and elapsed time.
+        """
+        stats = {'created': 0, 'elapsed_seconds': 0.0}
+        started = time.perf_counter()
+        batch_size = self._resolve_batch_size(session)
+        rows = [self._user_row(user) for user in users]
+        for i in range(0, len(rows), batch_size):
+            with span("upsert batch"):
+                stats['created'] += self.user_crud.bulk_upsert(session, rows[i:i + batch_size])
+        ROWS_INGESTED.inc(stats['created'], table="usermodel")
+        stats['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        print(f"Loaded {stats['created']} generated users ({stats['elapsed_seconds']}s)")
+        return stats
+
+    @profiled("load generated IPDR logs")
+    def load_ipdr(self, session: Session, generator) -> Dict[str, Any]:
+        """
+        Generates IPDR logs hour by hour and inserts them in batches, so
+        memory holds at most one hour plus one batch.
+
+        Returns:
+            Dict with loaded count, batch count, elapsed time and rows/sec.
+        """
+        stats = {'loaded': 0, 'batches': 0, 'elapsed_seconds': 0.0, 'rows_per_second': 0.0}
+        batch_size = self._resolve_batch_size(session)
+        print(f"Generating {generator.total_records} IPDR logs into the database (batch size: {batch_size})")
+        started = time.perf_counter()
+
+        def flush(batch: List[Dict[str, Any]]):
+            with span("insert batch"):
+                loaded = self.ipdr_crud.bulk_insert(session, batch)
+            stats['loaded'] += loaded
+            stats['batches'] += 1
+            ROWS_INGESTED.inc(loaded, table="ipdrlogmodel")
+
+        batch: List[Dict[str, Any]] = []
+        for columns in generator.iter_hours():
+            batch.extend(self._ipdr_rows(columns))
+            while len(batch) >= batch_size:
+                flush(batch[:batch_size])
+                batch = batch[batch_size:]
+        if batch:
+            flush(batch)
+
+        elapsed = time.perf_counter() - started
+        stats['elapsed_seconds'] = round(elapsed, 3)
+        stats['rows_per_second'] = round(stats['loaded'] / elapsed, 1) if elapsed > 0 else 0.0
+        print(f"Successfully loaded {stats['loaded']} generated IPDR logs in {stats['batches']} batches "
+              f"({stats['elapsed_seconds']}s, {stats['rows_per_second']:,.0f} rows/sec).")
+        return stats
@@ -1,95 +1,221 @@
 # app/parsers/ipdr_log_parser.py
 import csv
+import time
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 from sqlmodel import Session
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 from app.operators.base_parser import BaseParser
 from app.models.ipdr_log_model import IPDRLogModel
 from app.crud.ipdr_crud import IPDRLogCRUD
+from app.crud.pg_copy import supports_copy
+from app.core.config import settings
+from app.core.profiling import span, profiled
+from app.core.metrics import ROWS_INGESTED, ROWS_REJECTED
+
+
+class RejectWriter:
+    """
+    Lazily-opened CSV sink for rows that could not be loaded.
+    The file is only created once the first reject is written.
+    """
+
+    def __init__(self, reject_path: str, fieldnames: Optional[List[str]] = None):
+        self.reject_path = reject_path
+        self.fieldnames = list(fieldnames or []) + ["RejectReason"]
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, row: Dict[str, Any], reason: str) -> None:
+        """Append a raw CSV row together with the reason it was rejected."""
+        if self._writer is None:
+            Path(self.reject_path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.reject_path, mode='w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow({**row, "RejectReason": reason})
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
 
 class IPDRLogCSVParser(BaseParser):
     """
     Parses a CSV file containing IPDR log data and loads it into the database.
-    
+
     Assumes CSV format:
     AadhaarNo,IMEI,MSISDN,StartTime,EndTime,SourceIP,SourcePort,DestinationIP,DestinationPort,
     Protocol,BytesUpload,BytesDownload,Service,AppName,ISP,CellTowerID,LAC,SessionType,
     DataType,ConnectionQuality
+
+    The file is streamed: rows are read lazily, bound straight to Core
+    ``insert()`` batches of ``batch_size`` rows (streamed with COPY on
+    PostgreSQL) and committed once per batch. Rows that fail to parse or
+    insert are written to a reject file.
     """
-    
-    def __init__(self, crud_instance: IPDRLogCRUD):
+
+    def __init__(
+        self,
+        crud_instance: IPDRLogCRUD,
+        batch_size: Optional[int] = None,
+        reject_path: Optional[str] = None
+    ):
         self.ipdr_crud = crud_instance
+        self.batch_size = batch_size
+        self.reject_path = reject_path
+
+    def _resolve_batch_size(self, session: Session) -> int:
+        """Explicit batch size, else COPY_BATCH_SIZE for PostgreSQL COPY loads and MAX_BATCH_SIZE otherwise."""
+        if self.batch_size:
+            return self.batch_size
+        return settings.COPY_BATCH_SIZE if supports_copy(session) else settings.MAX_BATCH_SIZE
 
-    def parse_and_load(self, file_path: str, session: Session) -> None:
+    def _transform_row(self, row: Dict[str, str]) -> Dict[str, Any]:
+        """Convert a raw CSV row into a column dict for the IPDR table."""
+        # Convert string times to datetime objects
+        start_time = datetime.fromisoformat(row["StartTime"])
+        end_time = datetime.fromisoformat(row["EndTime"])
+
+        return {
+            "AadhaarNo": row["AadhaarNo"],
+            "IMEI": row["IMEI"],
+            "MSISDN": row["MSISDN"],
+            "StartTime": start_time,
+            "EndTime": end_time,
+            # Calculate duration in seconds
+            "Duration": int((end_time - start_time).total_seconds()),
+            "SourceIP": IPDRLogModel.validate_ip(row["SourceIP"]),
+            "SourcePort": int(row["SourcePort"]),
+            "DestinationIP": IPDRLogModel.validate_ip(row["DestinationIP"]),
+            "DestinationPort": int(row["DestinationPort"]),
+            "Protocol": row["Protocol"],
+            "BytesUpload": int(row["BytesUpload"]),
+            "BytesDownload": int(row["BytesDownload"]),
+            "Service": row["Service"],
+            "AppName": row.get("AppName") or "Unknown",
+            "ISP": row["ISP"],
+            "CellTowerID": row["CellTowerID"],
+            "LAC": row["LAC"],
+            "SessionType": row["SessionType"],
+            "DataType": row["DataType"],
+            **IPDRLogModel.location_values({}),
+            "IsSuspicious": False,
+            "SuspiciousFlags": [],
+            "ConnectionQuality": row.get("ConnectionQuality") or "Good",
+        }
+
+    def _iter_batches(
+        self,
+        reader: csv.DictReader,
+        rejects: RejectWriter,
+        batch_size: int
+    ) -> Iterator[List[Tuple[Dict[str, str], Dict[str, Any]]]]:
+        """Yield (raw_row, column_dict) batches, diverting unparseable rows."""
+        batch = []
+        for row in reader:
+            try:
+                batch.append((row, self._transform_row(row)))
+            except (KeyError, TypeError, ValueError) as parse_error:
+                rejects.write(row, f"parse error: {parse_error}")
+                continue
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _load_batch(
+        self,
+        session: Session,
+        batch: List[Tuple[Dict[str, str], Dict[str, Any]]],
+        rejects: RejectWriter
+    ) -> int:
+        """
+        Insert one batch in a single transaction. If the batch fails, it is
+        retried row by row inside savepoints so only the offending rows are
+        rejected and the rest still commit together.
+        """
+        try:
+            return self.ipdr_crud.bulk_insert(session, [values for _, values in batch])
+        except SQLAlchemyError:
+            session.rollback()
+
+        loaded = []
+        for row, values in batch:
+            try:
+                with session.begin_nested():
+                    self.ipdr_crud.insert_rows(session, [values])
+                loaded.append(values)
+            except SQLAlchemyError as row_error:
+                rejects.write(row, f"insert error: {getattr(row_error, 'orig', row_error)}")
+        self.ipdr_crud.apply_index_increments(session, loaded)
+        session.commit()
+        return len(loaded)
+
+    @profiled("load IPDR logs")
+    def parse_and_load(self, file_path: str, session: Session) -> Dict[str, Any]:
         """
-        Parses the IPDR log CSV and inserts records into the database.
+        Streams the IPDR log CSV into the database in batches.
+
+        Returns:
+            Dict with loaded/rejected counts, batch count, elapsed time and rows/sec.
         """
-        print(f"Starting to parse IPDR log file: {file_path}")
+        stats = {
+            'loaded': 0,
+            'rejected': 0,
+            'batches': 0,
+            'elapsed_seconds': 0.0,
+            'rows_per_second': 0.0,
+            'reject_path': None
+        }
+        batch_size = self._resolve_batch_size(session)
+        print(f"Starting to stream IPDR log file: {file_path} (batch size: {batch_size})")
+        started = time.perf_counter()
         try:
-            with open(file_path, mode='r', encoding='utf-8') as csvfile:
+            with open(file_path, mode='r', encoding='utf-8', newline='') as csvfile:
                 reader = csv.DictReader(csvfile)
-                logs_to_create = []
-                for row in reader:
-                    # Convert string times to datetime objects
-                    start_time = datetime.fromisoformat(row["StartTime"])
-                    end_time = datetime.fromisoformat(row["EndTime"])
-                    
-                    # Calculate duration in seconds
-                    duration = (end_time - start_time).total_seconds()
-
-                    log_data = IPDRLogModel(
-                        AadhaarNo=row["AadhaarNo"],
-                        IMEI=row["IMEI"],
-                        MSISDN=row["MSISDN"],
-                        StartTime=start_time,
-                        EndTime=end_time,
-                        Duration=int(duration),
-                        SourceIP=row["SourceIP"],
-                        SourcePort=int(row["SourcePort"]),
-                        DestinationIP=row["DestinationIP"],
-                        DestinationPort=int(row["DestinationPort"]),
-                        Protocol=row["Protocol"],
-                        BytesUpload=int(row["BytesUpload"]),
-                        BytesDownload=int(row["BytesDownload"]),
-                        Service=row["Service"],
-                        AppName=row.get("AppName", "Unknown"),
-                        ISP=row["ISP"],
-                        CellTowerID=row["CellTowerID"],
-                        LAC=row["LAC"],
-                        SessionType=row["SessionType"],
-                        DataType=row["DataType"],
-                        ConnectionQuality=row.get("ConnectionQuality", "Good")
-                    )
-                    logs_to_create.append(log_data)
-                
-                # Insert logs with better error handling
-                if logs_to_create:
-                    try:
-                        # Use individual inserts for better error handling
-                        created_count = 0
-                        error_count = 0
-                        
-                        for log in logs_to_create:
-                            try:
-                                session.add(log)
-                                session.commit()
-                                created_count += 1
-                            except Exception as log_error:
-                                session.rollback()
-                                error_count += 1
-                                print(f"Error creating log for {log.AadhaarNo}: {str(log_error)}")
-                                continue
-                        
-                        print(f"Successfully loaded {created_count} IPDR logs into the database.")
-                        if error_count > 0:
-                            print(f"Failed to load {error_count} logs due to errors.")
-                    
-                    except Exception as batch_error:
-                        session.rollback()
-                        print(f"Batch error: {str(batch_error)}")
-                        raise
+                reject_path = self.reject_path or str(Path("logs") / f"{Path(file_path).stem}_rejects.csv")
+
+                with RejectWriter(reject_path, reader.fieldnames) as rejects:
+                    # Batch spans cover the inserts; CSV parsing is the parent's self time
+                    for batch in self._iter_batches(reader, rejects, batch_size):
+                        with span("insert batch"):
+                            loaded = self._load_batch(session, batch, rejects)
+                        stats['loaded'] += loaded
+                        ROWS_INGESTED.inc(loaded, table="ipdrlogmodel")
+                        stats['batches'] += 1
+
+                    stats['rejected'] = rejects.count
+                    ROWS_REJECTED.inc(rejects.count, table="ipdrlogmodel")
+                    if rejects.count:
+                        stats['reject_path'] = reject_path
 
         except FileNotFoundError:
             print(f"Error: File not found at {file_path}")
+            return stats
         except Exception as e:
+            session.rollback()
             print(f"An error occurred while parsing IPDR logs: {e}")
-            raise
\ No newline at end of file
+            raise
+
+        elapsed = time.perf_counter() - started
+        stats['elapsed_seconds'] = round(elapsed, 3)
+        stats['rows_per_second'] = round(stats['loaded'] / elapsed, 1) if elapsed > 0 else 0.0
+
+        print(f"Successfully loaded {stats['loaded']} IPDR logs in {stats['batches']} batches "
+              f"({stats['elapsed_seconds']}s, {stats['rows_per_second']:,.0f} rows/sec).")
+        if stats['rejected']:
+            print(f"Rejected {stats['rejected']} rows, see {stats['reject_path']}")
+        return stats
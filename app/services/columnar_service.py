@@ -0,0 +1,160 @@
+# app/services/columnar_service.py
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from sqlmodel import Session, select
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, only needed for columnar snapshots
+    pa = ds = pafs = pq = None
+
+from app.models.ipdr_log_model import IPDRLogModel
+from app.core.logger import get_logger
+from app.core.config import settings
+
+logger = get_logger(__name__)
+
+# Scalar IPDR columns written to the snapshot; the JSON Location and SuspiciousFlags columns are left out
+EXPORT_COLUMNS = [
+    "AadhaarNo", "IMEI", "MSISDN", "StartTime", "EndTime", "Duration",
+    "SourceIP", "SourcePort", "DestinationIP", "DestinationPort", "Protocol",
+    "BytesUpload", "BytesDownload", "Service", "AppName", "ISP", "CellTowerID",
+    "LAC", "SessionType", "DataType", "IsSuspicious", "ConnectionQuality",
+]
+
+# Low-cardinality strings, dictionary-encoded on disk and read back as pandas categoricals
+DICTIONARY_COLUMNS = [
+    "AadhaarNo", "IMEI", "MSISDN", "SourceIP", "DestinationIP", "Protocol", "Service",
+    "AppName", "ISP", "CellTowerID", "LAC", "SessionType", "DataType", "ConnectionQuality",
+]
+
+PARTITION_COLUMN = "Day"
+
+def _require_pyarrow():
+    """Fail with an actionable message when the optional pyarrow dependency is missing."""
+    if pa is None:
+        raise ImportError("Columnar snapshots require pyarrow. Install it with `pip install pyarrow`.")
+
+class ColumnarService:
+    """
+    Day-partitioned Parquet snapshot of the IPDR table for column-oriented analytics.
+
+    ``export`` streams the table out of the database in chunks into a
+    ``Day=YYYY-MM-DD`` hive layout. The read side memory-maps the files and
+    loads only the requested columns into pandas.
+    """
+
+    def __init__(self, path: Optional[str] = None, chunk_size: Optional[int] = None):
+        self.path = Path(path or settings.COLUMNAR_EXPORT_PATH)
+        self.chunk_size = chunk_size or settings.ANALYSIS_CHUNK_SIZE
+
+    def exists(self) -> bool:
+        """Whether a snapshot has been exported."""
+        return self.path.is_dir() and any(self.path.rglob("*.parquet"))
+
+    def export(self, session: Session) -> Dict[str, Any]:
+        """
+        Write the IPDR table to a fresh snapshot, replacing any previous one.
+
+        The export is staged in a sibling directory and swapped in at the end,
+        so readers never see a half-written snapshot.
+
+        Returns:
+            Dict with row, partition and file counts, size on disk and elapsed time.
+        """
+        _require_pyarrow()
+        started = time.perf_counter()
+
+        staging = self.path.with_name(self.path.name + ".tmp")
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir(parents=True)
+
+        table = IPDRLogModel.__table__
+        statement = (
+            select(*[table.c[name] for name in EXPORT_COLUMNS])
+            .order_by(table.c.StartTime)
+            .execution_options(stream_results=True)
+        )
+
+        rows = 0
+        for chunk_number, frame in enumerate(pd.read_sql(statement, session.connection(), chunksize=self.chunk_size)):
+            if frame.empty:
+                continue
+            frame["StartTime"] = pd.to_datetime(frame["StartTime"])
+            frame["EndTime"] = pd.to_datetime(frame["EndTime"])
+            frame[PARTITION_COLUMN] = frame["StartTime"].dt.strftime("%Y-%m-%d")
+            # Clustering by user inside each day keeps AadhaarNo row-group statistics selective
+            frame = frame.sort_values([PARTITION_COLUMN, "AadhaarNo"], kind="stable")
+
+            pq.write_to_dataset(
+                pa.Table.from_pandas(frame, preserve_index=False),
+                root_path=str(staging),
+                partition_cols=[PARTITION_COLUMN],
+                basename_template=f"part-{chunk_number:05d}-{{i}}.parquet",
+                use_dictionary=DICTIONARY_COLUMNS,
+                compression="zstd",
+            )
+            rows += len(frame)
+
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        staging.rename(self.path)
+
+        files = list(self.path.rglob("*.parquet"))
+        stats = {
+            "rows": rows,
+            "partitions": len({f.parent for f in files}),
+            "files": len(files),
+            "size_mb": round(sum(f.stat().st_size for f in files) / (1024 * 1024), 2),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "path": str(self.path),
+        }
+        logger.info(f"Exported {rows} IPDR logs to {stats['partitions']} daily partitions at {self.path}")
+        return stats
+
+    def _dataset(self):
+        _require_pyarrow()
+        if not self.exists():
+            raise FileNotFoundError(
+                f"No columnar snapshot at {self.path}. Run `python main.py export-columnar` first."
+            )
+        parquet_format = ds.ParquetFileFormat(read_options={"dictionary_columns": DICTIONARY_COLUMNS})
+        return ds.dataset(
+            str(self.path),
+            format=parquet_format,
+            partitioning="hive",
+            filesystem=pafs.LocalFileSystem(use_mmap=True),
+        )
+
+    def _filter(self, aadhaar_nos: Optional[List[str]]):
+        if aadhaar_nos is None:
+            return None
+        return ds.field("AadhaarNo").isin(list(aadhaar_nos))
+
+    def read_columns(self, columns: List[str], aadhaar_nos: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load only `columns` from the snapshot, optionally restricted to some users."""
+        table = self._dataset().to_table(columns=columns, filter=self._filter(aadhaar_nos))
+        return table.to_pandas()
+
+    def iter_columns(
+        self,
+        columns: List[str],
+        aadhaar_nos: Optional[List[str]] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Stream `columns` from the snapshot as DataFrames of at most `batch_size` rows."""
+        batches = self._dataset().to_batches(
+            columns=columns,
+            filter=self._filter(aadhaar_nos),
+            batch_size=batch_size or self.chunk_size,
+        )
+        for batch in batches:
+            if batch.num_rows:
+                yield batch.to_pandas()
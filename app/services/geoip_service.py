@@ -1,55 +1,246 @@
 # app/services/geoip_service.py
 import geoip2.database
+import geoip2.errors
 from app.core.config import settings
 from app.core.logger import get_logger
-from typing import Optional, Dict, Any
+from app.core.metrics import GEOIP_CACHE_LOOKUPS
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import atexit
 import ipaddress
 import os
+import threading
 
 logger = get_logger(__name__)
 
+# Sentinel distinguishing "not cached" from a cached negative (None) result
+_MISSING = object()
+
+# Non-global IPv4 ranges, mirroring ipaddress.IPv4Address.is_global, as (network, netmask) integers
+_NON_GLOBAL_IPV4 = [
+    (int(net.network_address), int(net.netmask))
+    for net in map(ipaddress.IPv4Network, (
+        "0.0.0.0/8", "10.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16",
+        "172.16.0.0/12", "192.0.0.0/24", "192.0.2.0/24", "192.168.0.0/16", "198.18.0.0/15",
+        "198.51.100.0/24", "203.0.113.0/24", "240.0.0.0/4",
+    ))
+]
+# Addresses inside the ranges above that are nevertheless global
+_GLOBAL_IPV4_EXCEPTIONS = [int(ipaddress.IPv4Address(ip)) for ip in ("192.0.0.9", "192.0.0.10")]
+_IPV4_OCTET = r"(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_IPV4_PATTERN = r"^" + r"\.".join([_IPV4_OCTET] * 4) + r"$"
+
 class GeoIPService:
     """
     A service to provide geolocation information for IP addresses.
+
+    Lookups go through a bounded in-process LRU cache shared by all instances,
+    which also remembers negative results (private, invalid or unknown IPs).
+    When GEOIP_PERSISTENT_CACHE is enabled, MMDB results are also written to
+    the project database and preloaded on first use, so repeat runs skip the
+    MMDB lookups entirely. Counters are available through `cache_stats()`.
     """
     _reader = None
+    _reader_lock = threading.Lock()
+
+    _cache: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    _cache_warmed = False
+    _pending_writes: List[Dict[str, Any]] = []
+    _stats = {"hits": 0, "misses": 0, "negative_hits": 0, "evictions": 0, "preloaded": 0, "persisted": 0}
+    _flush_registered = False
+
+    # Number of new lookups buffered before they are written to the persistent cache
+    PERSIST_BATCH_SIZE = 500
 
     @classmethod
     def _get_reader(cls):
-        """Initializes and returns a singleton GeoIP2 database reader."""
-        if cls._reader is None:
-            db_path = settings.GEOIP_DATABASE_PATH
-            if not os.path.exists(db_path):
-                logger.error(f"GeoIP database not found at path: {db_path}")
-                raise FileNotFoundError(f"GeoIP database not found at {db_path}")
-            try:
-                logger.info(f"Loading GeoIP database from: {db_path}")
-                cls._reader = geoip2.database.Reader(db_path)
-            except Exception as e:
-                logger.error(f"Failed to load GeoIP database: {e}")
-                raise
+        """
+        Initializes and returns a singleton GeoIP2 database reader.
+        The file is memory-mapped so one reader can serve concurrent lookups.
+        """
+        with cls._reader_lock:
+            if cls._reader is None:
+                cls._reader = cls._open_reader()
         return cls._reader
 
-    def get_ip_location(self, ip_address: str) -> Optional[Dict[str, Any]]:
-        """
-        Get geolocation information for a given IP address.
+    @staticmethod
+    def _open_reader():
+        db_path = settings.GEOIP_DATABASE_PATH
+        if not os.path.exists(db_path):
+            logger.error(f"GeoIP database not found at path: {db_path}")
+            raise FileNotFoundError(f"GeoIP database not found at {db_path}")
+        try:
+            logger.info(f"Loading GeoIP database from: {db_path}")
+            return geoip2.database.Reader(db_path, mode=geoip2.database.MODE_MMAP)
+        except Exception as e:
+            logger.error(f"Failed to load GeoIP database: {e}")
+            raise
 
-        Args:
-            ip_address (str): The IP address to look up.
+    # =========================================================================
+    # Cache management
+    # =========================================================================
+    @classmethod
+    def _cache_get(cls, ip_address: str):
+        """Return the cached result for an IP or the _MISSING sentinel."""
+        with cls._cache_lock:
+            location = cls._cache.get(ip_address, _MISSING)
+            if location is _MISSING:
+                cls._stats["misses"] += 1
+                GEOIP_CACHE_LOOKUPS.inc(result="miss")
+                return _MISSING
+            cls._cache.move_to_end(ip_address)
+            cls._stats["hits"] += 1
+            GEOIP_CACHE_LOOKUPS.inc(result="hit")
+            if location is None:
+                cls._stats["negative_hits"] += 1
+            return location
+
+    @classmethod
+    def _cache_put(cls, ip_address: str, location: Optional[Dict[str, Any]]):
+        """Store a result, evicting the least recently used entries beyond GEOIP_CACHE_SIZE."""
+        with cls._cache_lock:
+            cls._cache[ip_address] = location
+            cls._cache.move_to_end(ip_address)
+            while len(cls._cache) > settings.GEOIP_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+                cls._stats["evictions"] += 1
+
+    @classmethod
+    def _warm_cache(cls):
+        """Preload recent persistent cache entries into the LRU once per process."""
+        if cls._cache_warmed:
+            return
+        cls._cache_warmed = True
+        if not settings.GEOIP_PERSISTENT_CACHE:
+            return
+        try:
+            from sqlmodel import Session
+            from app.core.database import engine
+            from app.crud.geoip_cache_crud import GeoIPCacheCRUD
+
+            cached_after = datetime.now() - timedelta(days=settings.GEOIP_CACHE_TTL_DAYS)
+            with Session(engine) as session:
+                rows = GeoIPCacheCRUD().get_recent(session, settings.GEOIP_CACHE_SIZE, cached_after)
+            # Oldest first so the most recent entries end up most recently used
+            for row in reversed(rows):
+                cls._cache_put(row.IPAddress, cls._from_cache_row(row))
+            cls._stats["preloaded"] += len(rows)
+            logger.info(f"Preloaded {len(rows)} GeoIP lookups from the persistent cache.")
+        except Exception as e:
+            logger.warning(f"Could not load persistent GeoIP cache: {e}")
+
+    @classmethod
+    def _queue_persist(cls, ip_address: str, location: Optional[Dict[str, Any]]):
+        """Buffer an MMDB result for the persistent cache, flushing in batches."""
+        if not settings.GEOIP_PERSISTENT_CACHE:
+            return
+        with cls._cache_lock:
+            cls._pending_writes.append(cls._to_cache_row(ip_address, location))
+            should_flush = len(cls._pending_writes) >= cls.PERSIST_BATCH_SIZE
+            if not cls._flush_registered:
+                atexit.register(cls.flush_cache)
+                cls._flush_registered = True
+        if should_flush:
+            cls.flush_cache()
+
+    @classmethod
+    def flush_cache(cls) -> int:
+        """Write buffered lookups to the persistent cache table. Returns the number written."""
+        with cls._cache_lock:
+            pending, cls._pending_writes = cls._pending_writes, []
+        if not pending:
+            return 0
+        try:
+            from sqlmodel import Session
+            from app.core.database import engine
+            from app.crud.geoip_cache_crud import GeoIPCacheCRUD
+
+            with Session(engine) as session:
+                written = GeoIPCacheCRUD().bulk_upsert(session, pending)
+            cls._stats["persisted"] += written
+            return written
+        except Exception as e:
+            logger.warning(f"Could not write persistent GeoIP cache: {e}")
+            return 0
+
+    @classmethod
+    def cache_stats(cls) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy of the lookup cache, for tuning GEOIP_CACHE_SIZE."""
+        with cls._cache_lock:
+            stats = dict(cls._stats)
+            stats["size"] = len(cls._cache)
+            stats["pending_writes"] = len(cls._pending_writes)
+        stats["capacity"] = settings.GEOIP_CACHE_SIZE
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop the in-process cache and reset counters. The persistent table is left untouched."""
+        with cls._cache_lock:
+            cls._cache.clear()
+            cls._pending_writes = []
+            cls._stats = {key: 0 for key in cls._stats}
+            cls._cache_warmed = False
+
+    @staticmethod
+    def _to_cache_row(ip_address: str, location: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        location = location or {}
+        return {
+            "IPAddress": ip_address,
+            "Found": bool(location),
+            "Country": location.get("country"),
+            "City": location.get("city"),
+            "PostalCode": location.get("postal_code"),
+            "Latitude": location.get("latitude"),
+            "Longitude": location.get("longitude"),
+            "ISP": location.get("isp"),
+            "Organization": location.get("organization"),
+            "CachedAt": datetime.now(),
+        }
+
+    @staticmethod
+    def _from_cache_row(row) -> Optional[Dict[str, Any]]:
+        if not row.Found:
+            return None
+        return {
+            "ip_address": row.IPAddress,
+            "country": row.Country,
+            "city": row.City,
+            "postal_code": row.PostalCode,
+            "latitude": row.Latitude,
+            "longitude": row.Longitude,
+            "isp": row.ISP,
+            "organization": row.Organization,
+        }
+
+    # =========================================================================
+    # Lookups
+    # =========================================================================
+    def _lookup(self, ip_address: str) -> Tuple[Optional[Dict[str, Any]], bool, bool]:
+        """
+        Resolve an IP without the cache.
 
         Returns:
-            Optional[Dict[str, Any]]: A dictionary with location data or None if not found or invalid.
+            (location, cacheable, from_mmdb): errors such as a missing database
+            are not cacheable; only MMDB answers are worth persisting.
         """
         try:
             # Validate that the IP is public and not a private/reserved address
             ip_obj = ipaddress.ip_address(ip_address)
             if not ip_obj.is_global:
                 logger.debug(f"Skipping geolocation for private/reserved IP: {ip_address}")
-                return None
+                return None, True, False
 
             reader = self._get_reader()
             response = reader.city(ip_address)
-            
+
             location_data = {
                 "ip_address": ip_address,
                 "country": response.country.name,
@@ -61,14 +252,127 @@ class GeoIPService:
                 "organization": response.traits.organization,
             }
             logger.debug(f"Successfully geolocated IP {ip_address}: {location_data['city']}, {location_data['country']}")
-            return location_data
+            return location_data, True, True
 
+        except ValueError:
+            logger.warning(f"Invalid IP address for geolocation: {ip_address}")
+            return None, True, False
         except geoip2.errors.AddressNotFoundError:
             logger.warning(f"Geolocation for IP address not found: {ip_address}")
-            return None
+            return None, True, True
         except Exception as e:
             logger.error(f"An error occurred during GeoIP lookup for {ip_address}: {e}")
-            return None
+            return None, False, False
+
+    def get_ip_location(self, ip_address: str) -> Optional[Dict[str, Any]]:
+        """
+        Get geolocation information for a given IP address.
+
+        Args:
+            ip_address (str): The IP address to look up.
+
+        Returns:
+            Optional[Dict[str, Any]]: A dictionary with location data or None if not found or invalid.
+            Cached dictionaries are shared between callers and must not be modified.
+        """
+        self._warm_cache()
+        location = self._cache_get(ip_address)
+        if location is not _MISSING:
+            return location
+
+        location, cacheable, from_mmdb = self._lookup(ip_address)
+        if cacheable:
+            self._cache_put(ip_address, location)
+            if from_mmdb:
+                self._queue_persist(ip_address, location)
+        return location
+
+    @staticmethod
+    def _non_global_mask(ip_addresses: List[str]) -> np.ndarray:
+        """
+        Flag dotted-quad IPv4 addresses in non-global ranges with array operations.
+        Anything that does not parse as IPv4 is left unflagged for a per-address lookup.
+        """
+        octets = pd.Series(ip_addresses, dtype=object).str.extract(_IPV4_PATTERN)
+        parsed = octets.notna().all(axis=1).to_numpy()
+        values = np.zeros(len(ip_addresses), dtype=np.uint32)
+        if parsed.any():
+            parts = octets[parsed].astype(np.uint32).to_numpy()
+            values[parsed] = (parts[:, 0] << 24) | (parts[:, 1] << 16) | (parts[:, 2] << 8) | parts[:, 3]
+
+        non_global = np.zeros(len(ip_addresses), dtype=bool)
+        for network, netmask in _NON_GLOBAL_IPV4:
+            non_global |= (values & np.uint32(netmask)) == np.uint32(network)
+        non_global &= ~np.isin(values, _GLOBAL_IPV4_EXCEPTIONS)
+        return non_global & parsed
+
+    def get_ip_locations(
+        self,
+        ip_addresses: Iterable[str],
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Geolocate a set of IP addresses in one call.
+
+        The input is deduplicated and served from the cache where possible,
+        non-global IPv4 addresses are filtered out in a single vectorized pass,
+        and the remaining lookups share the memory-mapped reader across a
+        thread pool.
+
+        Args:
+            ip_addresses (Iterable[str]): IP addresses to look up, duplicates allowed.
+            max_workers (Optional[int]): Thread count, defaults to GEOIP_LOOKUP_WORKERS.
+
+        Returns:
+            Dict[str, Optional[Dict[str, Any]]]: Location data (or None) for every distinct input IP,
+            in first-seen order.
+        """
+        self._warm_cache()
+        unique_ips = list(dict.fromkeys(ip_addresses))
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+
+        uncached = []
+        for ip_address in unique_ips:
+            location = self._cache_get(ip_address)
+            if location is _MISSING:
+                uncached.append(ip_address)
+            else:
+                results[ip_address] = location
+
+        to_lookup = []
+        if uncached:
+            for ip_address, non_global in zip(uncached, self._non_global_mask(uncached)):
+                if non_global:
+                    results[ip_address] = None
+                    self._cache_put(ip_address, None)
+                else:
+                    to_lookup.append(ip_address)
+
+        if to_lookup:
+            try:
+                self._get_reader()
+            except Exception:
+                # Logged once by the reader; leave these uncached so they are retried later
+                results.update((ip_address, None) for ip_address in to_lookup)
+                to_lookup = []
+
+        if to_lookup:
+            workers = max(1, min(max_workers or settings.GEOIP_LOOKUP_WORKERS, len(to_lookup)))
+            if workers == 1:
+                lookups = list(map(self._lookup, to_lookup))
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    lookups = list(executor.map(self._lookup, to_lookup))
+
+            # Cache updates and persistence stay on the calling thread
+            for ip_address, (location, cacheable, from_mmdb) in zip(to_lookup, lookups):
+                results[ip_address] = location
+                if cacheable:
+                    self._cache_put(ip_address, location)
+                    if from_mmdb:
+                        self._queue_persist(ip_address, location)
+
+        return {ip_address: results[ip_address] for ip_address in unique_ips}
 
     def __del__(self):
         """Ensure the database reader is closed when the service is destroyed."""
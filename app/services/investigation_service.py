@@ -2,17 +2,23 @@
 from typing import List, Dict, Any, Optional, Tuple
 from sqlmodel import Session, select, and_, or_, func
 from datetime import datetime, timedelta
+from collections import deque, defaultdict
 import networkx as nx
 import matplotlib.pyplot as plt
+import pandas as pd
 import os
 
 from app.services.user_service import UserService
 from app.services.ipdr_service import IpdrService
 from app.services.geoip_service import GeoIPService
+from app.services.temporal_profile_service import TemporalProfileService, TemporalProfile
 from app.models.user_model import UserModel
 from app.models.ipdr_log_model import IPDRLogModel
+from app.crud.user_destination_crud import UserDestinationCRUD
 from app.core.logger import get_logger
 from app.core.config import settings
+from app.core.profiling import span, profiled
+from app.core.metrics import NETWORK_NODES_EXPANDED
 
 logger = get_logger(__name__)
 
@@ -21,11 +27,16 @@ class InvestigationService:
     High-level investigation service that combines user and IPDR data
     for comprehensive analysis and investigation features.
     """
+
+    # Destinations paired per step when counting co-temporal sessions
+    COTEMPORAL_DESTINATION_CHUNK = 256
     
     def __init__(self):
         self.user_service = UserService()
         self.ipdr_service = IpdrService()
         self.geoip_service = GeoIPService()
+        self.temporal_profiles = TemporalProfileService()
+        self.destination_index = UserDestinationCRUD()
 
     def investigate_user(self, db: Session, aadhaar_no: str, save_report: bool = False, visualize_graph: bool = False) -> Optional[Dict[str, Any]]:
         """
@@ -43,10 +54,12 @@ class InvestigationService:
             summary = self.get_user_summary(db, aadhaar_no)
             
             if save_report:
-                self._generate_investigation_report(user, summary)
+                with span("write report"):
+                    self._generate_investigation_report(user, summary)
 
             if visualize_graph:
-                self._visualize_network_graph(user, summary['network_analysis']['nodes'], summary['network_analysis']['edges'])
+                with span("visualize graph"):
+                    self._visualize_network_graph(user, summary['network_analysis']['nodes'], summary['network_analysis']['edges'])
 
             logger.info(f"Investigation completed for user: {aadhaar_no}")
             return summary
@@ -55,54 +68,88 @@ class InvestigationService:
             logger.error(f"Error during full investigation for {aadhaar_no}: {e}", exc_info=True)
             return None
 
+    @profiled("get_user_summary")
     def get_user_summary(self, db: Session, aadhaar_no: str) -> Dict[str, Any]:
         """
         Gathers a comprehensive summary of a user's activity and network.
         """
-        user = self.user_service.get_record(db, aadhaar_no)
+        with span("user lookup"):
+            user = self.user_service.get_record(db, aadhaar_no)
         if not user:
             raise ValueError(f"User {aadhaar_no} not found")
 
-        user_logs = self.ipdr_service.get_logs_by_user(db, aadhaar_no)
-        
-        # Basic stats
-        total_data_usage_gb = sum(log.BytesUpload + log.BytesDownload for log in user_logs) / (1024**3)
-        first_seen = min(log.StartTime for log in user_logs) if user_logs else None
-        last_seen = max(log.EndTime for log in user_logs) if user_logs else None
-
-        # Temporal analysis
-        hourly_activity = [log.StartTime.hour for log in user_logs]
-        off_hours_activity = [h for h in hourly_activity if h <= 5 or h >= 23]
-        off_hours_percentage = (len(off_hours_activity) / len(hourly_activity) * 100) if hourly_activity else 0
-        most_active_day = max(set(log.StartTime.strftime('%A') for log in user_logs), key=list(log.StartTime.strftime('%A') for log in user_logs).count) if user_logs else "N/A"
+        with span("temporal profile"):
+            temporal_profile = self.temporal_profiles.get_profile(db, aadhaar_no)
+        with span("activity totals"):
+            activity = self._activity_fields(db, aadhaar_no, temporal_profile)
 
         # Communication network
-        partners = self.ipdr_service.find_communication_partners(db, aadhaar_no)
+        with span("communication partners"):
+            partners = self.ipdr_service.find_communication_partners(db, aadhaar_no)
         
-        # Enrich partners with GeoIP data
+        # Enrich partners with GeoIP data in one batched lookup
+        with span("geoip enrichment"):
+            locations = self.geoip_service.get_ip_locations(partner['destination_ip'] for partner in partners)
         for partner in partners:
-            partner['location'] = self.geoip_service.get_ip_location(partner['destination_ip'])
+            partner['location'] = locations.get(partner['destination_ip'])
 
-        top_partner_by_freq = partners[0]['destination_ip'] if partners else "N/A"
-        top_partner_by_data = max(partners, key=lambda p: p['total_download_mb'] + p['total_upload_mb']) if partners else {}
-        
         # NetworkX analysis
         network_analysis = self.analyze_network_cluster(db, aadhaar_no, depth=settings.NETWORK_ANALYSIS_MAX_DEPTH)
 
         return {
             "user_details": user,
-            "total_sessions": len(user_logs),
-            "total_data_usage_gb": total_data_usage_gb,
+            **activity,
+            **self._partner_fields(partners),
+            "temporal_profile": temporal_profile,
+            "communication_partners": partners,
+            "network_analysis": network_analysis
+        }
+
+    @profiled("get_report_summary")
+    def get_report_summary(self, db: Session, aadhaar_no: str) -> Dict[str, Any]:
+        """
+        Only the activity, temporal and partner fields printed by the suspicious
+        analysis report. Skips log hydration, GeoIP enrichment and the network
+        cluster that get_user_summary computes.
+        """
+        temporal_profile = self.temporal_profiles.get_profile(db, aadhaar_no)
+        partners = self.ipdr_service.find_communication_partners(db, aadhaar_no, include_details=False)
+        return {
+            **self._activity_fields(db, aadhaar_no, temporal_profile),
+            **self._partner_fields(partners),
+        }
+
+    @staticmethod
+    def _activity_fields(db: Session, aadhaar_no: str, temporal_profile: TemporalProfile) -> Dict[str, Any]:
+        """Session, data usage and temporal summary fields from SQL totals and the hour-of-week profile."""
+        sessions, total_bytes, first_seen, last_seen = db.exec(
+            select(
+                func.count(IPDRLogModel.id),
+                func.coalesce(func.sum(IPDRLogModel.BytesUpload + IPDRLogModel.BytesDownload), 0),
+                func.min(IPDRLogModel.StartTime),
+                func.max(IPDRLogModel.EndTime)
+            ).where(IPDRLogModel.AadhaarNo == aadhaar_no)
+        ).one()
+
+        return {
+            "total_sessions": sessions,
+            "total_data_usage_gb": int(total_bytes) / (1024**3),
             "first_seen": first_seen,
             "last_seen": last_seen,
-            "off_hours_activity_percentage": off_hours_percentage,
-            "most_active_day": most_active_day,
+            "off_hours_activity_percentage": temporal_profile.off_hours_percentage,
+            "most_active_day": temporal_profile.most_active_day or "N/A",
+        }
+
+    @staticmethod
+    def _partner_fields(partners: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """B-party summary fields from find_communication_partners output."""
+        top_partner_by_freq = partners[0]['destination_ip'] if partners else "N/A"
+        top_partner_by_data = max(partners, key=lambda p: p['total_download_mb'] + p['total_upload_mb']) if partners else {}
+        return {
             "unique_b_parties": len(partners),
             "top_b_party_by_freq": top_partner_by_freq,
             "top_b_party_by_data": top_partner_by_data.get('destination_ip', "N/A"),
             "top_b_party_data_gb": (top_partner_by_data.get('total_download_mb', 0) + top_partner_by_data.get('total_upload_mb', 0)) / 1024,
-            "communication_partners": partners,
-            "network_analysis": network_analysis
         }
 
     def _generate_investigation_report(self, user: UserModel, summary: Dict[str, Any]):
@@ -136,6 +183,9 @@ class InvestigationService:
             f.write(f"  First Activity: {summary['first_seen']}\n")
             f.write(f"  Last Activity: {summary['last_seen']}\n")
             f.write(f"  Most Active Day: {summary['most_active_day']}\n")
+            most_active_hour = summary['temporal_profile'].most_active_hour
+            if most_active_hour is not None:
+                f.write(f"  Most Active Hour: {most_active_hour:02d}:00-{most_active_hour:02d}:59\n")
             f.write(f"  Off-Hours Activity (11pm-5am): {summary['off_hours_activity_percentage']:.2f}%\n\n")
 
             f.write(f"--- COMMUNICATION NETWORK ANALYSIS ---\n")
@@ -165,6 +215,17 @@ class InvestigationService:
                     f.write(f"  - Connected User: {node['name']} ({node['id']}), Degree: {node['depth']}\n")
             f.write("\n")
 
+            strongest = sorted(edges, key=lambda e: e.get('strength', 1), reverse=True)[:10]
+            if strongest:
+                names = {node['id']: node['name'] for node in nodes}
+                f.write("  Strongest Links:\n")
+                for edge in strongest:
+                    f.write(f"    - {names.get(edge['from'], edge['from'])} <-> {names.get(edge['to'], edge['to'])}: "
+                            f"strength {edge['strength']} (shared destinations: {edge.get('shared_destinations', 0)}, "
+                            f"co-temporal sessions: {edge.get('cotemporal_sessions', 0)}, "
+                            f"shared data: {edge.get('shared_bytes', 0) / (1024 * 1024):.2f} MB)\n")
+                f.write("\n")
+
             f.write("="*80 + "\n")
             f.write("END OF REPORT\n")
             f.write("="*80 + "\n")
@@ -185,7 +246,8 @@ class InvestigationService:
             G.add_edge(edge['from'], edge['to'], weight=edge.get('strength', 1))
 
         # Position nodes
-        pos = nx.spring_layout(G, k=0.5, iterations=50)
+        with span("spring layout"):
+            pos = nx.spring_layout(G, k=0.5, iterations=50)
 
         # Drawing properties
         plt.figure(figsize=(16, 12))
@@ -193,11 +255,12 @@ class InvestigationService:
         node_sizes = [5000 if n == user.AadhaarNo else 2500 for n in G.nodes]
         labels = {n: G.nodes[n]['name'] for n in G.nodes}
 
-        nx.draw(G, pos, labels=labels, with_labels=True, node_color=node_colors, node_size=node_sizes, font_size=10, font_weight='bold', edge_color='gray')
-        
-        plt.title(f"Communication Network for {user.Name} ({user.AadhaarNo})", size=20)
-        plt.savefig(graph_path)
-        plt.close()
+        with span("draw and save"):
+            nx.draw(G, pos, labels=labels, with_labels=True, node_color=node_colors, node_size=node_sizes, font_size=10, font_weight='bold', edge_color='gray')
+            
+            plt.title(f"Communication Network for {user.Name} ({user.AadhaarNo})", size=20)
+            plt.savefig(graph_path)
+            plt.close()
 
     def find_connected_users(self, session: Session, aadhaar_no: str) -> List[Dict[str, Any]]:
         """
@@ -244,66 +307,185 @@ class InvestigationService:
             logger.error(f"Error finding connected users: {str(e)}")
             return []
     
+    def _ensure_destination_index(self, session: Session):
+        """Rebuild the user ↔ destination index unless it is marked complete, e.g. for databases loaded before it existed."""
+        if not self.destination_index.is_complete(session):
+            logger.info("User-destination index is incomplete, rebuilding it from IPDR logs...")
+            rows = self.destination_index.rebuild(session)
+            logger.info(f"User-destination index rebuilt with {rows} pairs.")
+
+    def _count_cotemporal_sessions(
+        self,
+        session: Session,
+        edges: Dict[Tuple[str, str], List[int]],
+        excluded_ips: set
+    ) -> Dict[Tuple[str, str], int]:
+        """
+        Count co-temporal sessions for every edge.
+        
+        Sessions are bucketed by (DestinationIP, NETWORK_COTEMPORAL_WINDOW_MINUTES
+        window); for each pair of linked users sharing a bucket the smaller of
+        their two session counts is added. Hub IPs are left out.
+        
+        Only sessions to destinations that two or more cluster members contacted
+        (per the user ↔ destination index) are loaded, and users are paired one
+        chunk of destinations at a time, so memory follows the busiest chunk
+        rather than the whole cluster's history.
+        """
+        if not edges:
+            return {}
+
+        members = sorted({aadhaar for pair in edges for aadhaar in pair})
+        member_counts = defaultdict(int)
+        for _, dest_ip, _, _ in self.destination_index.get_destinations_for_users(session, members):
+            if dest_ip not in excluded_ips:
+                member_counts[dest_ip] += 1
+        shared_ips = sorted(ip for ip, count in member_counts.items() if count > 1)
+        if not shared_ips:
+            return {}
+
+        logs = pd.DataFrame(
+            self.ipdr_service.crud.get_session_times(session, members, shared_ips),
+            columns=['AadhaarNo', 'DestinationIP', 'StartTime']
+        )
+        if logs.empty:
+            return {}
+
+        window = f"{settings.NETWORK_COTEMPORAL_WINDOW_MINUTES}min"
+        logs['Bucket'] = pd.to_datetime(logs['StartTime']).dt.floor(window)
+        counts = logs.groupby(['DestinationIP', 'Bucket', 'AadhaarNo']).size().rename('n').reset_index()
+        del logs
+
+        # Keep the orientation the BFS stored each edge under
+        edge_index = pd.MultiIndex.from_tuples(list(edges.keys()))
+        chunks = counts.groupby('DestinationIP').ngroup() // self.COTEMPORAL_DESTINATION_CHUNK
+        totals = []
+        for _, part in counts.groupby(chunks):
+            pairs = part.merge(part, on=['DestinationIP', 'Bucket'], suffixes=('_a', '_b'))
+            pairs = pairs.set_index(['AadhaarNo_a', 'AadhaarNo_b'])
+            pairs = pairs[pairs.index.isin(edge_index)]
+            if not pairs.empty:
+                totals.append(pairs[['n_a', 'n_b']].min(axis=1).groupby(level=[0, 1]).sum())
+        if not totals:
+            return {}
+
+        totals = pd.concat(totals).groupby(level=[0, 1]).sum()
+        return {key: int(value) for key, value in totals.items()}
+
+    @profiled("analyze_network_cluster")
     def analyze_network_cluster(self, session: Session, center_aadhaar: str, depth: int = 2) -> Dict[str, Any]:
         """
         Analyze network cluster around a central user.
         Shows connections up to specified depth.
+        
+        The BFS walks the precomputed user ↔ destination IP index one level at
+        a time with batched lookups. Destination IPs contacted by more than
+        NETWORK_HUB_FANOUT_CAP users are hubs: with the 'skip' policy they are
+        ignored, with 'downweight' only their heaviest users are linked.
+        
+        Edges are accumulated in a dict keyed by (from, to) and carry real
+        weights: shared destinations, shared bytes (the smaller side per shared
+        destination) and co-temporal sessions. 'strength' is shared
+        destinations plus co-temporal sessions.
         """
         try:
-            visited = set()
+            self._ensure_destination_index(session)
+            hub_cap = settings.NETWORK_HUB_FANOUT_CAP
+            hub_policy = settings.NETWORK_HUB_POLICY
+
+            discovered = {center_aadhaar}
+            expanded = set()  # users from completed levels
+            fanout: Dict[str, int] = {}
+            hub_ips = set()
             nodes = []
-            edges = []
-            
-            queue = [(center_aadhaar, 0)]
-            
-            while queue:
-                current_aadhaar, current_depth = queue.pop(0)
+            # (from, to) -> [shared_destinations, shared_bytes]
+            edges: Dict[Tuple[str, str], List[int]] = {}
+
+            frontier = deque([center_aadhaar])
+            current_depth = 0
+
+            while frontier and current_depth <= depth:
+                with span(f"depth {current_depth}"):
+                    level = list(frontier)
+                    frontier.clear()
+
+                    users = {u.AadhaarNo: u for u in self.user_service.crud.get_users_by_aadhaar(session, level)}
+                    level = [aadhaar for aadhaar in level if aadhaar in users]
+                    for aadhaar in level:
+                        user = users[aadhaar]
+                        nodes.append({
+                            'id': user.AadhaarNo,
+                            'name': user.Name,
+                            'is_suspicious': user.IsSuspicious,
+                            'depth': current_depth
+                        })
 
-                if current_aadhaar in visited or current_depth > depth:
-                    continue
-                
-                visited.add(current_aadhaar)
-                
-                user = self.user_service.get_record(session, current_aadhaar)
-                if not user:
-                    continue
-
-                nodes.append({
-                    'id': user.AadhaarNo,
-                    'name': user.Name,
-                    'is_suspicious': user.IsSuspicious,
-                    'depth': current_depth
+                    if not level:
+                        break
+                    NETWORK_NODES_EXPANDED.inc(len(level), depth=current_depth)
+                    at_max_depth = current_depth == depth
+
+                    # B-parties contacted by this level
+                    users_by_ip = defaultdict(set)
+                    bytes_by_pair = {}
+                    for aadhaar, dest_ip, _, total_bytes in self.destination_index.get_destinations_for_users(session, level):
+                        users_by_ip[dest_ip].add(aadhaar)
+                        bytes_by_pair[(aadhaar, dest_ip)] = total_bytes
+
+                    unseen_ips = [ip for ip in users_by_ip if ip not in fanout]
+                    fanout.update(self.destination_index.get_fanout(session, unseen_ips))
+                    level_hubs = {ip for ip in users_by_ip if hub_cap and fanout.get(ip, 0) > hub_cap}
+                    hub_ips.update(level_hubs)
+
+                    # Other users who communicated with these B-parties
+                    neighbour_rows = self.destination_index.get_users_for_destinations(
+                        session, [ip for ip in users_by_ip if ip not in level_hubs]
+                    )
+                    if level_hubs and hub_policy == 'downweight':
+                        neighbour_rows += self.destination_index.get_users_for_destinations(
+                            session, level_hubs, per_destination_limit=hub_cap
+                        )
+
+                    level_set = set(level)
+                    for dest_ip, neighbour, _, neighbour_bytes in neighbour_rows:
+                        if neighbour in expanded:
+                            continue  # already linked from an earlier level
+                        if at_max_depth and neighbour not in level_set:
+                            continue  # only link users already in the cluster
+                        same_level = neighbour in level_set
+                        for current in users_by_ip[dest_ip]:
+                            # Same-level pairs are seen from both sides, count them once
+                            if neighbour == current or (same_level and current > neighbour):
+                                continue
+                            weights = edges.setdefault((current, neighbour), [0, 0])
+                            weights[0] += 1
+                            weights[1] += min(bytes_by_pair[(current, dest_ip)], neighbour_bytes)
+                        if neighbour not in discovered:
+                            discovered.add(neighbour)
+                            frontier.append(neighbour)
+
+                    expanded.update(level)
+                current_depth += 1
+
+            # Drop edges to users that are not in the user table
+            node_ids = {node['id'] for node in nodes}
+            edges = {key: weights for key, weights in edges.items() if key[0] in node_ids and key[1] in node_ids}
+            with span("cotemporal sessions"):
+                cotemporal = self._count_cotemporal_sessions(session, edges, hub_ips)
+
+            edge_list = []
+            for (src, dst), (shared_destinations, shared_bytes) in edges.items():
+                cotemporal_sessions = cotemporal.get((src, dst), 0)
+                edge_list.append({
+                    'from': src,
+                    'to': dst,
+                    'strength': shared_destinations + cotemporal_sessions,
+                    'shared_destinations': shared_destinations,
+                    'cotemporal_sessions': cotemporal_sessions,
+                    'shared_bytes': shared_bytes
                 })
 
-                # Find B-parties for the current user
-                partners = self.ipdr_service.find_communication_partners(session, current_aadhaar)
-                common_ips = {p['destination_ip'] for p in partners}
-
-                # Find other users who communicated with these B-parties
-                if not common_ips:
-                    continue
-
-                # This part can be slow, consider optimizing for a real application
-                for ip in common_ips:
-                    related_logs = session.exec(select(IPDRLogModel).where(
-                        and_(IPDRLogModel.DestinationIP == ip, IPDRLogModel.AadhaarNo != current_aadhaar)
-                    )).all()
-
-                    for log in related_logs:
-                        neighbor_aadhaar = log.AadhaarNo
-                        if neighbor_aadhaar not in visited:
-                            edges.append({
-                                'from': current_aadhaar,
-                                'to': neighbor_aadhaar,
-                                'strength': 1 # Simplified strength
-                            })
-                            if (neighbor_aadhaar, current_depth + 1) not in queue:
-                                queue.append((neighbor_aadhaar, current_depth + 1))
-
-            # Deduplicate edges
-            unique_edges = [dict(t) for t in {tuple(sorted(d.items())) for d in edges}]
-
-            return {'nodes': nodes, 'edges': unique_edges}
+            return {'nodes': nodes, 'edges': edge_list, 'hub_destinations': sorted(hub_ips)}
             
         except Exception as e:
             logger.error(f"Error in network cluster analysis: {str(e)}")
@@ -312,88 +494,80 @@ class InvestigationService:
     def _analyze_communication_patterns(self, session: Session, aadhaar_no: str) -> Dict[str, Any]:
         """Analyze communication patterns for a user"""
         try:
-            logs = self.ipdr_service.find_logs_by_user(session, aadhaar_no)
-            
-            if not logs:
-                return {}
-            
             # Time-based patterns
-            hourly_activity = {}
-            daily_activity = {}
-            
-            for log in logs:
-                hour = log.StartTime.hour
-                day = log.StartTime.strftime('%A')
-                
-                hourly_activity[hour] = hourly_activity.get(hour, 0) + 1
-                daily_activity[day] = daily_activity.get(day, 0) + 1
-            
-            # Most active hours and days
-            most_active_hour = max(hourly_activity, key=hourly_activity.get) if hourly_activity else None
-            most_active_day = max(daily_activity, key=daily_activity.get) if daily_activity else None
+            profile = self.temporal_profiles.get_profile(session, aadhaar_no)
+            if not profile.total_sessions:
+                return {}
             
             # Service usage patterns
-            service_usage = {}
-            for log in logs:
-                service_usage[log.Service] = service_usage.get(log.Service, 0) + 1
+            service_usage = dict(session.exec(
+                select(IPDRLogModel.Service, func.count())
+                .where(IPDRLogModel.AadhaarNo == aadhaar_no)
+                .group_by(IPDRLogModel.Service)
+            ).all())
             
             return {
-                'hourly_activity': hourly_activity,
-                'daily_activity': daily_activity,
-                'most_active_hour': most_active_hour,
-                'most_active_day': most_active_day,
+                'hourly_activity': profile.hourly_activity,
+                'daily_activity': profile.daily_activity,
+                'most_active_hour': profile.most_active_hour,
+                'most_active_day': profile.most_active_day,
                 'service_usage': service_usage,
-                'total_unique_destinations': len(set(log.DestinationIP for log in logs))
+                'total_unique_destinations': self._count_unique_destinations(session, aadhaar_no)
             }
             
         except Exception as e:
             logger.error(f"Error analyzing communication patterns: {str(e)}")
             return {}
     
+    def _count_unique_destinations(self, session: Session, aadhaar_no: str) -> int:
+        return session.exec(
+            select(func.count(func.distinct(IPDRLogModel.DestinationIP)))
+            .where(IPDRLogModel.AadhaarNo == aadhaar_no)
+        ).one()
+    
     def _detect_anomalies(self, session: Session, aadhaar_no: str) -> List[Dict[str, Any]]:
         """Detect anomalous behavior patterns"""
         try:
             anomalies = []
-            logs = self.ipdr_service.find_logs_by_user(session, aadhaar_no)
+            profile = self.temporal_profiles.get_profile(session, aadhaar_no)
             
-            if not logs:
+            if not profile.total_sessions:
                 return anomalies
             
             # High data usage sessions
-            high_data_sessions = [
-                log for log in logs 
-                if (log.BytesUpload + log.BytesDownload) > 100 * 1024 * 1024  # 100MB
-            ]
+            high_data_sessions = session.exec(
+                select(func.count(IPDRLogModel.id)).where(
+                    IPDRLogModel.AadhaarNo == aadhaar_no,
+                    (IPDRLogModel.BytesUpload + IPDRLogModel.BytesDownload) > 100 * 1024 * 1024  # 100MB
+                )
+            ).one()
             
             if high_data_sessions:
                 anomalies.append({
                     'type': 'high_data_usage',
-                    'description': f'Found {len(high_data_sessions)} sessions with high data usage (>100MB)',
-                    'count': len(high_data_sessions),
+                    'description': f'Found {high_data_sessions} sessions with high data usage (>100MB)',
+                    'count': high_data_sessions,
                     'severity': 'medium'
                 })
             
             # Unusual time activity (late night sessions)
-            late_night_sessions = [
-                log for log in logs 
-                if log.StartTime.hour >= 23 or log.StartTime.hour <= 5
-            ]
+            late_night_sessions = profile.off_hours_sessions
             
-            if len(late_night_sessions) > len(logs) * 0.3:  # More than 30% late night activity
+            if late_night_sessions > profile.total_sessions * 0.3:  # More than 30% late night activity
                 anomalies.append({
                     'type': 'unusual_timing',
-                    'description': f'High late-night activity: {len(late_night_sessions)} sessions',
-                    'count': len(late_night_sessions),
+                    'description': f'High late-night activity: {late_night_sessions} sessions',
+                    'count': late_night_sessions,
                     'severity': 'low'
                 })
             
             # Multiple unique destinations
-            unique_destinations = set(log.DestinationIP for log in logs)
-            if len(unique_destinations) > 50:  # More than 50 unique destinations
+            unique_destinations = self._count_unique_destinations(session, aadhaar_no)
+            if unique_destinations > 50:  # More than 50 unique destinations
                 anomalies.append({
                     'type': 'high_connectivity',
-                    'description': f'High number of unique destinations: {len(unique_destinations)}',
-                    'count': len(unique_destinations),
+                    'description': f'High number of unique destinations: {unique_destinations}',
+                    'count': unique_destinations,
                     'severity': 'medium'
                 })
             
@@ -443,8 +617,16 @@ class InvestigationService:
             # Communication Partners
             partners = investigation['communication_partners']
             report.append(f"COMMUNICATION PARTNERS ({len(partners)}):")
-            for i, partner in enumerate(partners[:10]):  # Show top 10
+            top_partners = partners[:10]  # Show top 10
+            locations = self.geoip_service.get_ip_locations(
+                partner['destination_ip'] for partner in top_partners
+                if 'location' not in partner and partner.get('destination_ip')
+            )
+            for i, partner in enumerate(top_partners):
                 report.append(f"  {i+1}. IP: {partner.get('destination_ip', 'N/A')}")
+                location = partner.get('location') or locations.get(partner.get('destination_ip'))
+                if location:
+                    report.append(f"     Location: {location.get('city', 'N/A')}, {location.get('country', 'N/A')}")
                 report.append(f"     Sessions: {partner.get('total_sessions', 0)}")
                 report.append(f"     Upload: {partner.get('total_upload_mb', 0.0):.2f} MB")
                 report.append(f"     Download: {partner.get('total_download_mb', 0.0):.2f} MB")
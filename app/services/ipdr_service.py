@@ -1,22 +1,67 @@
 # app/services/ipdr_service.py
-from typing import Optional, List, Dict, Any, Tuple
-from sqlmodel import Session, select, and_, or_
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+from sqlmodel import Session, select, and_, or_, func
+from datetime import date, datetime, timedelta
 from collections import defaultdict
 import statistics
+import pandas as pd
 
 from app.services.base_service import BaseService
+from app.services.columnar_service import ColumnarService
 from app.models.ipdr_log_model import IPDRLogModel
 from app.crud.ipdr_crud import IPDRLogCRUD
+from app.crud.user_rollup_crud import UserRollupCRUD
 from app.core.logger import get_logger
+from app.core.config import settings
 
 logger = get_logger(__name__)
 
 class IpdrService(BaseService[IPDRLogModel]):
-    """Service class for IPDR log operations and analysis."""
+    """
+    Service class for IPDR log operations and analysis.
     
-    def __init__(self):
+    Bulk column scans honour ``read_mode``: 'database' reads the IPDR table,
+    'columnar' reads the Parquet snapshot written by export-columnar.
+    Per-user lookups always use the indexed database.
+    
+    Per-user summaries accept an optional window of whole days
+    (``start_date``/``end_date``, inclusive). Windowed totals, hour
+    histograms and partners are answered from the daily rollups (see
+    UserRollupCRUD), reading one row per day instead of the raw logs.
+    """
+    
+    def __init__(self, read_mode: Optional[str] = None):
         super().__init__(IPDRLogCRUD())
+        self.read_mode = (read_mode or settings.IPDR_READ_MODE).lower()
+        self.columnar = ColumnarService()
+        self.rollups = UserRollupCRUD()
+    
+    def uses_columnar(self) -> bool:
+        """Whether bulk scans read from the Parquet snapshot."""
+        return self.read_mode == "columnar"
+    
+    def iter_log_columns(
+        self,
+        session: Session,
+        columns: List[str],
+        aadhaar_nos: Optional[List[str]] = None,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream only the named IPDR columns as DataFrame chunks.
+        In columnar mode string columns come back as pandas categoricals.
+        """
+        chunk_size = chunk_size or settings.ANALYSIS_CHUNK_SIZE
+        if self.uses_columnar():
+            yield from self.columnar.iter_columns(columns, aadhaar_nos, chunk_size)
+            return
+        
+        table = IPDRLogModel.__table__
+        statement = select(*[table.c[name] for name in columns])
+        if aadhaar_nos is not None:
+            statement = statement.where(table.c.AadhaarNo.in_(aadhaar_nos))
+        statement = statement.execution_options(stream_results=True)
+        yield from pd.read_sql(statement, session.connection(), chunksize=chunk_size)
     
     def get_record(self, session: Session, record_id: str) -> Optional[IPDRLogModel]:
         """Get a single IPDR log by its RecordID."""
@@ -131,13 +176,115 @@ class IpdrService(BaseService[IPDRLogModel]):
             logger.error(f"Error getting all logs: {str(e)}")
             return []
     
-    def get_user_activity_summary(self, session: Session, aadhaar_no: str) -> Dict[str, Any]:
-        """Get comprehensive activity summary for a user."""
+    @staticmethod
+    def _is_windowed(start_date: Optional[date], end_date: Optional[date]) -> bool:
+        return start_date is not None or end_date is not None
+    
+    @staticmethod
+    def _describe_window(start_date: Optional[date], end_date: Optional[date]) -> str:
+        return f"{start_date or 'first log'} to {end_date or 'last log'}"
+    
+    @staticmethod
+    def _window_filter(start_date: Optional[date], end_date: Optional[date]) -> List[Any]:
+        """StartTime conditions covering the whole days from `start_date` to `end_date`."""
+        conditions = []
+        if start_date is not None:
+            conditions.append(IPDRLogModel.StartTime >= datetime.combine(start_date, datetime.min.time()))
+        if end_date is not None:
+            day_after = end_date + timedelta(days=1)
+            conditions.append(IPDRLogModel.StartTime < datetime.combine(day_after, datetime.min.time()))
+        return conditions
+    
+    def _ensure_rollups(self, session: Session):
+        """Rebuild the daily rollups unless they are marked complete, e.g. for databases loaded before they existed."""
+        if not self.rollups.is_complete(session):
+            logger.info("Daily user rollups are incomplete, rebuilding them from IPDR logs...")
+            rows = self.rollups.rebuild(session)
+            logger.info(f"Daily user rollups rebuilt with {rows} user-days.")
+    
+    def _get_user_totals(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Aggregate a user's session count, byte, duration and distinct-destination totals in SQL.
+        Windowed totals come from the daily rollups and also carry the active days
+        and the 24-hour session histogram.
+        """
+        if self._is_windowed(start_date, end_date):
+            self._ensure_rollups(session)
+            totals = self.rollups.get_daily_totals(session, aadhaar_no, start_date, end_date)
+            return {
+                'sessions': totals['SessionCount'],
+                'upload': totals['BytesUpload'],
+                'download': totals['BytesDownload'],
+                'duration': totals['TotalDuration'],
+                'unique_destinations': self.rollups.count_destinations(session, aadhaar_no, start_date, end_date),
+                'active_days': totals['ActiveDays'],
+                'hours': totals['Hours']
+            }
+        
+        row = session.exec(
+            select(
+                func.count(IPDRLogModel.id),
+                func.coalesce(func.sum(IPDRLogModel.BytesUpload), 0),
+                func.coalesce(func.sum(IPDRLogModel.BytesDownload), 0),
+                func.coalesce(func.sum(IPDRLogModel.Duration), 0),
+                func.count(func.distinct(func.nullif(IPDRLogModel.DestinationIP, '')))
+            ).where(IPDRLogModel.AadhaarNo == aadhaar_no)
+        ).one()
+        return {
+            'sessions': row[0],
+            'upload': int(row[1]),
+            'download': int(row[2]),
+            'duration': int(row[3]),
+            'unique_destinations': row[4]
+        }
+
+    def _get_distinct_values(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        column,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[str]:
+        """
+        Distinct non-empty values of a column for a user, optionally within a
+        window of days. Windowed Service and Protocol values come from the daily rollups.
+        """
+        if self._is_windowed(start_date, end_date) and column.key in ("Service", "Protocol"):
+            self._ensure_rollups(session)
+            return self.rollups.get_distinct_values(session, aadhaar_no, column.key, start_date, end_date)
+        return list(session.exec(
+            select(column).where(
+                IPDRLogModel.AadhaarNo == aadhaar_no,
+                column.is_not(None),
+                column != '',
+                *self._window_filter(start_date, end_date)
+            ).distinct()
+        ).all())
+
+    def get_user_activity_summary(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Get comprehensive activity summary for a user, optionally limited to the
+        days from `start_date` to `end_date`. Windowed summaries also report the
+        period, active days and sessions per hour of day.
+        """
         try:
-            logs = self.get_logs_by_user(session, aadhaar_no)
+            totals = self._get_user_totals(session, aadhaar_no, start_date, end_date)
             
-            if not logs:
-                return {
+            if not totals['sessions']:
+                summary = {
                     'total_sessions': 0,
                     'total_upload_mb': 0.0,
                     'total_download_mb': 0.0,
@@ -146,24 +293,22 @@ class IpdrService(BaseService[IPDRLogModel]):
                     'protocols_used': [],
                     'unique_destinations': 0
                 }
-            
-            total_upload = sum(log.BytesUpload or 0 for log in logs)
-            total_download = sum(log.BytesDownload or 0 for log in logs)
-            total_duration = sum(log.Duration or 0 for log in logs)
-            
-            unique_services = list(set(log.Service for log in logs if log.Service))
-            protocols_used = list(set(log.Protocol for log in logs if log.Protocol))
-            unique_destinations = len(set(log.DestinationIP for log in logs if log.DestinationIP))
-            
-            summary = {
-                'total_sessions': len(logs),
-                'total_upload_mb': round(total_upload / (1024 * 1024), 2),
-                'total_download_mb': round(total_download / (1024 * 1024), 2),
-                'total_duration_hours': round(total_duration / 3600, 2),
-                'unique_services': unique_services,
-                'protocols_used': protocols_used,
-                'unique_destinations': unique_destinations
-            }
+            else:
+                summary = {
+                    'total_sessions': totals['sessions'],
+                    'total_upload_mb': round(totals['upload'] / (1024 * 1024), 2),
+                    'total_download_mb': round(totals['download'] / (1024 * 1024), 2),
+                    'total_duration_hours': round(totals['duration'] / 3600, 2),
+                    'unique_services': self._get_distinct_values(
+                        session, aadhaar_no, IPDRLogModel.Service, start_date, end_date),
+                    'protocols_used': self._get_distinct_values(
+                        session, aadhaar_no, IPDRLogModel.Protocol, start_date, end_date),
+                    'unique_destinations': totals['unique_destinations']
+                }
+            if self._is_windowed(start_date, end_date):
+                summary['period'] = self._describe_window(start_date, end_date)
+                summary['active_days'] = totals['active_days']
+                summary['hourly_sessions'] = totals['hours']
             
             logger.info(f"Generated activity summary for {aadhaar_no}")
             return summary
@@ -172,48 +317,70 @@ class IpdrService(BaseService[IPDRLogModel]):
             logger.error(f"Error generating activity summary for {aadhaar_no}: {str(e)}")
             return {}
     
-    def find_communication_partners(self, session: Session, aadhaar_no: str) -> List[Dict[str, Any]]:
-        """Find all communication partners for a user."""
+    def find_communication_partners(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        include_details: bool = True,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find all communication partners for a user, aggregated per DestinationIP in SQL.
+        With include_details=False the per-partner services and protocols are skipped.
+        Within a window of days the partners and their details come from the daily rollups.
+        """
         try:
-            logs = self.get_logs_by_user(session, aadhaar_no)
-            
-            if not logs:
+            user_filter = and_(
+                IPDRLogModel.AadhaarNo == aadhaar_no,
+                IPDRLogModel.DestinationIP.is_not(None),
+                IPDRLogModel.DestinationIP != '',
+                *self._window_filter(start_date, end_date)
+            )
+            windowed = self._is_windowed(start_date, end_date)
+            if windowed:
+                self._ensure_rollups(session)
+                rows = self.rollups.get_destination_totals(session, aadhaar_no, start_date, end_date)
+            else:
+                session_count = func.count(IPDRLogModel.id)
+                rows = session.exec(
+                    select(
+                        IPDRLogModel.DestinationIP,
+                        session_count,
+                        func.coalesce(func.sum(IPDRLogModel.BytesUpload), 0),
+                        func.coalesce(func.sum(IPDRLogModel.BytesDownload), 0)
+                    ).where(user_filter)
+                    .group_by(IPDRLogModel.DestinationIP)
+                    .order_by(session_count.desc())
+                ).all()
+            
+            if not rows:
                 return []
             
-            # Group by destination IP
-            partners = defaultdict(lambda: {
-                'total_sessions': 0,
-                'total_upload': 0,
-                'total_download': 0,
-                'services': set(),
-                'protocols': set()
-            })
-            
-            for log in logs:
-                dest_ip = log.DestinationIP
-                if dest_ip:
-                    partners[dest_ip]['total_sessions'] += 1
-                    partners[dest_ip]['total_upload'] += log.BytesUpload or 0
-                    partners[dest_ip]['total_download'] += log.BytesDownload or 0
-                    if log.Service:
-                        partners[dest_ip]['services'].add(log.Service)
-                    if log.Protocol:
-                        partners[dest_ip]['protocols'].add(log.Protocol)
-            
-            # Convert to list and sort by session count
-            result = []
-            for dest_ip, data in partners.items():
-                result.append({
-                    'destination_ip': dest_ip,
-                    'total_sessions': data['total_sessions'],
-                    'total_upload_mb': round(data['total_upload'] / (1024 * 1024), 2),
-                    'total_download_mb': round(data['total_download'] / (1024 * 1024), 2),
-                    'services': list(data['services']),
-                    'protocols': list(data['protocols'])
-                })
-            
-            # Sort by session count
-            result.sort(key=lambda x: x['total_sessions'], reverse=True)
+            # Distinct (destination, service) and (destination, protocol) pairs
+            services = defaultdict(list)
+            protocols = defaultdict(list)
+            detail_columns = ((services, IPDRLogModel.Service), (protocols, IPDRLogModel.Protocol))
+            for target, column in detail_columns if include_details else ():
+                if windowed:
+                    pairs = self.rollups.get_destination_values(session, aadhaar_no, column.key, start_date, end_date)
+                else:
+                    pairs = session.exec(
+                        select(IPDRLogModel.DestinationIP, column)
+                        .where(user_filter, column.is_not(None), column != '')
+                        .distinct()
+                    ).all()
+                for dest_ip, value in pairs:
+                    target[dest_ip].append(value)
+            
+            result = [{
+                'destination_ip': dest_ip,
+                'total_sessions': total_sessions,
+                'total_upload_mb': round(total_upload / (1024 * 1024), 2),
+                'total_download_mb': round(total_download / (1024 * 1024), 2),
+                'services': services[dest_ip],
+                'protocols': protocols[dest_ip]
+            } for dest_ip, total_sessions, total_upload, total_download in rows]
             
             logger.info(f"Found {len(result)} communication partners for {aadhaar_no}")
             return result
@@ -222,39 +389,34 @@ class IpdrService(BaseService[IPDRLogModel]):
             logger.error(f"Error finding communication partners for {aadhaar_no}: {str(e)}")
             return []
     
-    def get_communication_stats(self, session: Session, aadhaar_no: str) -> Dict[str, Any]:
-        """Get comprehensive communication statistics for a user."""
+    def get_communication_stats(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Get comprehensive communication statistics for a user, optionally within a window of days."""
         try:
-            logs = self.get_logs_by_user(session, aadhaar_no)
+            totals = self._get_user_totals(session, aadhaar_no, start_date, end_date)
             
-            if not logs:
+            if not totals['sessions']:
                 return {}
             
-            total_sessions = len(logs)
-            total_data_up = sum(log.BytesUpload or 0 for log in logs)
-            total_data_down = sum(log.BytesDownload or 0 for log in logs)
+            total_data_up = totals['upload']
+            total_data_down = totals['download']
             total_data = total_data_up + total_data_down
-            
-            # Get unique destinations
-            unique_destinations = set()
-            for log in logs:
-                if log.DestinationIP:
-                    unique_destinations.add(log.DestinationIP)
-            
-            # Get service types
-            service_types = set()
-            for log in logs:
-                if log.Service:
-                    service_types.add(log.Service)
+            service_types = self._get_distinct_values(
+                session, aadhaar_no, IPDRLogModel.Service, start_date, end_date)
             
             stats = {
-                'total_sessions': total_sessions,
+                'total_sessions': totals['sessions'],
                 'total_data_bytes': total_data,
                 'total_data_mb': round(total_data / (1024 * 1024), 2),
                 'data_upload_bytes': total_data_up,
                 'data_download_bytes': total_data_down,
-                'unique_destinations': len(unique_destinations),
-                'service_types': list(service_types),
+                'unique_destinations': totals['unique_destinations'],
+                'service_types': service_types,
                 'unique_services_count': len(service_types),
                 'upload_download_ratio': round(total_data_up / total_data_down, 2) if total_data_down > 0 else 0
             }
@@ -286,40 +448,50 @@ class IpdrService(BaseService[IPDRLogModel]):
             logger.error(f"Error getting logs count: {str(e)}")
             return 0
     
-    def analyze_communication_patterns(self, session: Session, aadhaar_no: str) -> Dict[str, Any]:
-        """Analyze communication patterns for a specific user."""
+    def analyze_communication_patterns(
+        self,
+        session: Session,
+        aadhaar_no: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Analyze communication patterns for a specific user, optionally within a window of days."""
         try:
-            logs = self.get_logs_by_user(session, aadhaar_no)
+            totals = self._get_user_totals(session, aadhaar_no, start_date, end_date)
             
-            if not logs:
+            if not totals['sessions']:
                 return {"error": "No logs found for user"}
             
-            # Time-based analysis
-            time_patterns = defaultdict(int)
-            destination_frequency = defaultdict(int)
-            service_usage = defaultdict(int)
-            
-            for log in logs:
-                # Analyze destinations
-                if log.DestinationIP:
-                    destination_frequency[log.DestinationIP] += 1
-                
-                # Analyze services
-                if log.Service:
-                    service_usage[log.Service] += 1
-            
-            # Sort by frequency
-            top_destinations = sorted(destination_frequency.items(), key=lambda x: x[1], reverse=True)[:10]
-            top_services = sorted(service_usage.items(), key=lambda x: x[1], reverse=True)
+            # Frequency per destination and per service, counted in SQL
+            session_count = func.count(IPDRLogModel.id)
+            if self._is_windowed(start_date, end_date):
+                top_destinations = [(dest_ip, count) for dest_ip, count, _, _ in self.rollups.get_destination_totals(
+                    session, aadhaar_no, start_date, end_date, limit=10)]
+                top_services = self.rollups.get_service_totals(session, aadhaar_no, start_date, end_date)
+            else:
+                top_destinations = [tuple(row) for row in session.exec(
+                    select(IPDRLogModel.DestinationIP, session_count)
+                    .where(IPDRLogModel.AadhaarNo == aadhaar_no, IPDRLogModel.DestinationIP != '')
+                    .group_by(IPDRLogModel.DestinationIP)
+                    .order_by(session_count.desc())
+                    .limit(10)
+                ).all()]
+                top_services = [tuple(row) for row in session.exec(
+                    select(IPDRLogModel.Service, session_count)
+                    .where(IPDRLogModel.AadhaarNo == aadhaar_no, IPDRLogModel.Service != '')
+                    .group_by(IPDRLogModel.Service)
+                    .order_by(session_count.desc())
+                ).all()]
             
             analysis = {
-                'total_logs': len(logs),
-                'analysis_period': 'Available data range',
+                'total_logs': totals['sessions'],
+                'analysis_period': (self._describe_window(start_date, end_date)
+                                    if self._is_windowed(start_date, end_date) else 'Available data range'),
                 'top_destinations': top_destinations,
                 'service_distribution': top_services,
                 'communication_summary': {
-                    'unique_destinations': len(destination_frequency),
-                    'unique_services': len(service_usage),
+                    'unique_destinations': totals['unique_destinations'],
+                    'unique_services': len(top_services),
                     'most_contacted': top_destinations[0] if top_destinations else None,
                     'primary_service': top_services[0] if top_services else None
                 }
@@ -330,4 +502,4 @@ class IpdrService(BaseService[IPDRLogModel]):
             
         except Exception as e:
             logger.error(f"Error analyzing communication patterns: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
@@ -0,0 +1,229 @@
+# app/services/scoring_service.py
+from datetime import datetime
+from typing import Dict, List, Iterable, Iterator, Optional
+from sqlmodel import Session, select, extract
+import pandas as pd
+
+from app.models.ipdr_log_model import IPDRLogModel
+from app.crud import user_activity_crud, user_destination_crud
+from app.services.ipdr_service import IpdrService
+from app.core.logger import get_logger
+from app.core.config import settings
+from app.core.profiling import span, profiled
+from app.core.metrics import USERS_SCORED, USERS_FLAGGED
+
+logger = get_logger(__name__)
+
+# Rule names in the order they are reported on a user
+SUSPICIOUS_RULES = [
+    "HIGH_DATA_USAGE",
+    "EXCESSIVE_SESSIONS",
+    "LATE_NIGHT_ACTIVITY",
+    "MULTIPLE_DESTINATIONS",
+    "UNUSUAL_SERVICES",
+    "DATA_EXFILTRATION",
+]
+
+class ScoringService:
+    """
+    Vectorized suspicious-user scoring over the whole IPDR log table.
+
+    Only the columns the rules need are pulled, chunk by chunk, into pandas.
+    Each chunk is reduced to per-user partial aggregates, which are then
+    combined and checked against ``settings.ANALYSIS_THRESHOLDS`` as grouped
+    array operations instead of per-user Python loops.
+
+    With incremental scoring (INCREMENTAL_SCORING) the rule inputs come from
+    the per-user aggregates maintained at ingest instead (see
+    UserActivityCRUD), and only users whose aggregates changed since they
+    were last evaluated are re-evaluated; earlier results are kept.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, read_mode: Optional[str] = None,
+                 incremental: Optional[bool] = None):
+        self.chunk_size = chunk_size or settings.ANALYSIS_CHUNK_SIZE
+        self.thresholds = settings.ANALYSIS_THRESHOLDS
+        self.ipdr_service = IpdrService(read_mode=read_mode)
+        self.incremental = settings.INCREMENTAL_SCORING if incremental is None else incremental
+
+    def iter_log_chunks(self, session: Session) -> Iterator[pd.DataFrame]:
+        """Stream the scoring columns of the IPDR table (or its Parquet snapshot) as DataFrame chunks."""
+        if self.ipdr_service.uses_columnar():
+            columns = ["AadhaarNo", "DestinationIP", "Service", "BytesUpload", "BytesDownload", "Duration", "StartTime"]
+            for chunk in self.ipdr_service.iter_log_columns(session, columns, chunk_size=self.chunk_size):
+                yield pd.DataFrame({
+                    "AadhaarNo": chunk["AadhaarNo"],
+                    "DestinationIP": chunk["DestinationIP"],
+                    "Service": chunk["Service"],
+                    "TotalBytes": chunk["BytesUpload"] + chunk["BytesDownload"],
+                    "Duration": chunk["Duration"],
+                    "Hour": chunk["StartTime"].dt.hour,
+                })
+            return
+
+        statement = select(
+            IPDRLogModel.AadhaarNo,
+            IPDRLogModel.DestinationIP,
+            IPDRLogModel.Service,
+            (IPDRLogModel.BytesUpload + IPDRLogModel.BytesDownload).label("TotalBytes"),
+            IPDRLogModel.Duration,
+            extract("hour", IPDRLogModel.StartTime).label("Hour"),
+        )
+        # stream_results uses a server-side cursor on PostgreSQL so chunks are not buffered client-side
+        statement = statement.execution_options(stream_results=True)
+        yield from pd.read_sql(statement, session.connection(), chunksize=self.chunk_size)
+
+    def aggregate(self, chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Reduce log chunks to one row of rule inputs per user.
+
+        Returns:
+            DataFrame indexed by AadhaarNo with sessions, total_bytes, late_night,
+            unique_destinations, unique_services and exfiltration columns.
+        """
+        start_hour = self.thresholds["late_night_start_hour"]
+        end_hour = self.thresholds["late_night_end_hour"]
+        short_seconds = self.thresholds["short_duration_minutes"] * 60
+        high_session_bytes = self.thresholds["high_data_session_mb"] * 1024 * 1024
+
+        partials, destinations, services = [], [], []
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            chunk = chunk.assign(
+                late_night=(chunk["Hour"] >= start_hour) | (chunk["Hour"] <= end_hour),
+                exfiltration=(chunk["Duration"] < short_seconds) & (chunk["TotalBytes"] > high_session_bytes),
+            )
+            partials.append(chunk.groupby("AadhaarNo", observed=True).agg(
+                sessions=("TotalBytes", "size"),
+                total_bytes=("TotalBytes", "sum"),
+                late_night=("late_night", "sum"),
+                exfiltration=("exfiltration", "any"),
+            ))
+            # Distinct counts cannot be summed across chunks, so keep the unique pairs
+            destinations.append(chunk[["AadhaarNo", "DestinationIP"]].drop_duplicates())
+            services.append(chunk[["AadhaarNo", "Service"]].drop_duplicates())
+
+        if not partials:
+            return pd.DataFrame(columns=[
+                "sessions", "total_bytes", "late_night", "unique_destinations", "unique_services", "exfiltration"
+            ])
+
+        aggregates = pd.concat(partials).groupby(level=0).agg({
+            "sessions": "sum",
+            "total_bytes": "sum",
+            "late_night": "sum",
+            "exfiltration": "max",
+        })
+        aggregates["unique_destinations"] = (
+            pd.concat(destinations).drop_duplicates().groupby("AadhaarNo", observed=True).size()
+        )
+        aggregates["unique_services"] = (
+            pd.concat(services).drop_duplicates().groupby("AadhaarNo", observed=True).size()
+        )
+        return aggregates
+
+    def evaluate(self, aggregates: pd.DataFrame) -> Dict[str, List[str]]:
+        """
+        Apply the threshold rules to per-user aggregates.
+
+        Returns:
+            Mapping of AadhaarNo to the list of triggered rule names, for flagged users only.
+        """
+        if aggregates.empty:
+            return {}
+
+        t = self.thresholds
+        flags = pd.DataFrame({
+            "HIGH_DATA_USAGE": aggregates["total_bytes"] > t["high_data_usage_mb"] * 1024 * 1024,
+            "EXCESSIVE_SESSIONS": aggregates["sessions"] > t["excessive_sessions"],
+            "LATE_NIGHT_ACTIVITY": aggregates["late_night"] > aggregates["sessions"] * t["late_night_activity_ratio"],
+            "MULTIPLE_DESTINATIONS": aggregates["unique_destinations"] > t["multiple_destinations"],
+            "UNUSUAL_SERVICES": aggregates["unique_services"] > t["unusual_services_count"],
+            "DATA_EXFILTRATION": aggregates["exfiltration"].astype(bool),
+        }, index=aggregates.index)[SUSPICIOUS_RULES]
+
+        flagged = flags[flags.any(axis=1)]
+        rule_names = flagged.columns.to_numpy()
+        return {
+            aadhaar_no: rule_names[row].tolist()
+            for aadhaar_no, row in zip(flagged.index, flagged.to_numpy())
+        }
+
+    def refresh_aggregates(self, session: Session) -> bool:
+        """
+        Make sure the ingest-time aggregates can be scored from, rebuilding them
+        from the IPDR logs if they were never completed or were counted with
+        different thresholds. The user ↔ destination index behind
+        MULTIPLE_DESTINATIONS is rebuilt along with them, and whenever it is
+        not marked complete.
+
+        Returns:
+            True when anything was rebuilt and every user must be evaluated.
+        """
+        state = user_activity_crud.get_state(session)
+        rebuild_aggregates = state is None or state.ThresholdsKey != user_activity_crud.thresholds_key()
+        rebuild_destinations = rebuild_aggregates or not user_destination_crud.is_complete(session)
+        if rebuild_aggregates:
+            logger.info("Rebuilding per-user activity aggregates from IPDR logs...")
+            user_activity_crud.rebuild(session)
+        if rebuild_destinations:
+            logger.info("Rebuilding user-destination index from IPDR logs...")
+            user_destination_crud.rebuild(session)
+        return rebuild_aggregates or rebuild_destinations
+
+    def changed_aggregates(self, session: Session, include_all: bool = False) -> pd.DataFrame:
+        """
+        Rule inputs, in the shape ``aggregate`` returns plus the ``version``
+        they were read at, of the users whose aggregates changed since they
+        were last evaluated (every user with `include_all`).
+        """
+        rows = user_activity_crud.get_changed(session, include_all)
+        aggregates = pd.DataFrame.from_records(rows, columns=[
+            "AadhaarNo", "sessions", "upload", "download", "late_night", "exfiltration_sessions", "version"
+        ]).set_index("AadhaarNo")
+        aadhaar_nos = None if include_all else aggregates.index.tolist()
+        aggregates["total_bytes"] = aggregates["upload"] + aggregates["download"]
+        aggregates["exfiltration"] = aggregates["exfiltration_sessions"] > 0
+        destinations = user_destination_crud.count_destinations(session, aadhaar_nos)
+        services = user_activity_crud.count_services(session, aadhaar_nos)
+        aggregates["unique_destinations"] = aggregates.index.map(lambda a: destinations.get(a, 0))
+        aggregates["unique_services"] = aggregates.index.map(lambda a: services.get(a, 0))
+        return aggregates[["sessions", "total_bytes", "late_night", "unique_destinations", "unique_services",
+                           "exfiltration", "version"]]
+
+    @profiled("score_users")
+    def score_users(self, session: Session) -> Dict[str, List[str]]:
+        """
+        Score users against the thresholds. Incrementally, only changed users
+        are evaluated and the flags of all users are returned; otherwise every
+        user with logs is scored in a single chunked pass over the IPDR table.
+        """
+        if self.incremental:
+            return self._score_incremental(session)
+
+        with span("aggregate log chunks"):
+            aggregates = self.aggregate(self.iter_log_chunks(session))
+        with span("evaluate rules"):
+            results = self.evaluate(aggregates)
+        USERS_SCORED.inc(len(aggregates))
+        USERS_FLAGGED.inc(len(results))
+        logger.info(f"Scored {len(aggregates)} users with activity, {len(results)} flagged.")
+        return results
+
+    def _score_incremental(self, session: Session) -> Dict[str, List[str]]:
+        with span("refresh aggregates"):
+            rebuilt = self.refresh_aggregates(session)
+        with span("read changed aggregates"):
+            aggregates = self.changed_aggregates(session, include_all=rebuilt)
+        with span("evaluate rules"):
+            results = self.evaluate(aggregates)
+        user_activity_crud.store_results(session, aggregates["version"].to_dict(), results)
+        user_activity_crud.set_state(session, datetime.now())
+        session.commit()
+
+        flagged = user_activity_crud.get_flagged(session)
+        USERS_SCORED.inc(len(aggregates))
+        USERS_FLAGGED.inc(len(results))
+        logger.info(f"Re-scored {len(aggregates)} users with changed activity, {len(flagged)} flagged in total.")
+        return flagged
@@ -0,0 +1,112 @@
+# app/services/temporal_profile_service.py
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime
+from sqlmodel import Session, select, extract, func
+import numpy as np
+
+from app.models.ipdr_log_model import IPDRLogModel
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Row order of the hour-of-week histogram, matching datetime.weekday()
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Off-hours window used by investigation summaries and anomaly checks (inclusive, wraps midnight)
+OFF_HOURS_START = 23
+OFF_HOURS_END = 5
+
+class TemporalProfile:
+    """
+    A user's session counts as a 7×24 hour-of-week histogram.
+
+    Rows are weekdays (Monday first) and columns are start hours, so every
+    hourly, daily and off-hours figure is a cheap reduction of one array.
+    """
+
+    def __init__(self, counts: Optional[np.ndarray] = None):
+        self.counts = counts if counts is not None else np.zeros((7, 24), dtype=np.int64)
+
+    @classmethod
+    def from_datetimes(cls, start_times: Iterable[datetime]) -> "TemporalProfile":
+        """Build a profile from in-memory session start times with one bincount."""
+        slots = np.fromiter((t.weekday() * 24 + t.hour for t in start_times), dtype=np.int64)
+        return cls(np.bincount(slots, minlength=7 * 24).reshape(7, 24))
+
+    @property
+    def total_sessions(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def hourly_counts(self) -> np.ndarray:
+        return self.counts.sum(axis=0)
+
+    @property
+    def daily_counts(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+    @property
+    def hourly_activity(self) -> Dict[int, int]:
+        """Sessions per start hour, for hours with any activity."""
+        return {hour: int(count) for hour, count in enumerate(self.hourly_counts) if count}
+
+    @property
+    def daily_activity(self) -> Dict[str, int]:
+        """Sessions per weekday name, for days with any activity."""
+        return {WEEKDAYS[day]: int(count) for day, count in enumerate(self.daily_counts) if count}
+
+    @property
+    def most_active_hour(self) -> Optional[int]:
+        return int(self.hourly_counts.argmax()) if self.total_sessions else None
+
+    @property
+    def most_active_day(self) -> Optional[str]:
+        return WEEKDAYS[int(self.daily_counts.argmax())] if self.total_sessions else None
+
+    def sessions_between(self, start_hour: int, end_hour: int) -> int:
+        """Sessions starting in [start_hour, end_hour], wrapping past midnight when start > end."""
+        hours = np.arange(24)
+        if start_hour <= end_hour:
+            mask = (hours >= start_hour) & (hours <= end_hour)
+        else:
+            mask = (hours >= start_hour) | (hours <= end_hour)
+        return int(self.hourly_counts[mask].sum())
+
+    @property
+    def off_hours_sessions(self) -> int:
+        return self.sessions_between(OFF_HOURS_START, OFF_HOURS_END)
+
+    @property
+    def off_hours_percentage(self) -> float:
+        total = self.total_sessions
+        return self.off_hours_sessions / total * 100 if total else 0
+
+class TemporalProfileService:
+    """
+    Builds hour-of-week activity profiles with a single SQL GROUP BY over
+    (AadhaarNo, weekday, hour), so no IPDR rows are hydrated.
+    """
+
+    def __init__(self, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+
+    def get_profile(self, session: Session, aadhaar_no: str) -> TemporalProfile:
+        """Hour-of-week profile for one user. Users without logs get an empty profile."""
+        return self.get_profiles(session, [aadhaar_no])[aadhaar_no]
+
+    def get_profiles(self, session: Session, aadhaar_nos: List[str]) -> Dict[str, TemporalProfile]:
+        """Hour-of-week profiles for many users, keyed by AadhaarNo."""
+        profiles = {aadhaar_no: TemporalProfile() for aadhaar_no in aadhaar_nos}
+        # SQL day-of-week counts from Sunday = 0 on both SQLite and PostgreSQL
+        dow = extract("dow", IPDRLogModel.StartTime)
+        hour = extract("hour", IPDRLogModel.StartTime)
+        for i in range(0, len(aadhaar_nos), self.chunk_size):
+            chunk = aadhaar_nos[i:i + self.chunk_size]
+            rows = session.exec(
+                select(IPDRLogModel.AadhaarNo, dow, hour, func.count())
+                .where(IPDRLogModel.AadhaarNo.in_(chunk))
+                .group_by(IPDRLogModel.AadhaarNo, dow, hour)
+            ).all()
+            for aadhaar_no, day, hour_of_day, count in rows:
+                profiles[aadhaar_no].counts[(int(day) + 6) % 7, int(hour_of_day)] += count
+        return profiles
@@ -76,86 +76,25 @@ class UserService(BaseService[UserModel]):
         """
         Find all suspicious users based on actual data analysis, not database flag.
         This method analyzes user behavior patterns to identify suspicious activities.
+        
+        Users are scored by ScoringService: incrementally from the per-user
+        aggregates kept at ingest, re-evaluating only users whose activity
+        changed since the last run, or in one vectorized pass over the IPDR
+        table. Flagged users are updated with a single statement.
         """
         try:
-            # Get all users for analysis
-            statement = select(UserModel)
-            all_users = session.exec(statement).all()
-            
-            suspicious_users = []
+            from app.services.scoring_service import ScoringService
+            suspicious_types = ScoringService().score_users(session)
             
-            # Import IPDR service for analysis
-            from app.services.ipdr_service import IpdrService
-            ipdr_service = IpdrService()
+            # Only users present in the user table are reported, in a stable order for `limit`
+            user_ids = session.exec(select(UserModel.AadhaarNo).order_by(UserModel.AadhaarNo)).all()
+            flagged = [a for a in user_ids if a in suspicious_types]
+            if limit:
+                flagged = flagged[:limit]
             
-            for user in all_users:
-                is_suspicious = False
-                suspicious_reasons = []
-                
-                # Get user's IPDR logs for analysis
-                user_logs = ipdr_service.find_logs_by_user(session, user.AadhaarNo)
-                
-                if not user_logs:
-                    continue  # Skip users with no activity
-                
-                # Analysis 1: High data usage detection
-                total_data = sum(log.BytesDownload + log.BytesUpload for log in user_logs)
-                if total_data > settings.ANALYSIS_THRESHOLDS["high_data_usage_mb"] * 1024 * 1024:
-                    is_suspicious = True
-                    suspicious_reasons.append("HIGH_DATA_USAGE")
-                
-                # Analysis 2: Excessive session count
-                if len(user_logs) > settings.ANALYSIS_THRESHOLDS["excessive_sessions"]:
-                    is_suspicious = True
-                    suspicious_reasons.append("EXCESSIVE_SESSIONS")
-                
-                # Analysis 3: Late night activity (assuming timestamps)
-                late_night_count = 0
-                for log in user_logs:
-                    # Check if activity is between 11 PM - 5 AM (rough estimation)
-                    hour = log.StartTime.hour if hasattr(log.StartTime, 'hour') else 0
-                    if hour >= settings.ANALYSIS_THRESHOLDS["late_night_start_hour"] or hour <= settings.ANALYSIS_THRESHOLDS["late_night_end_hour"]:
-                        late_night_count += 1
-                
-                if late_night_count > len(user_logs) * settings.ANALYSIS_THRESHOLDS["late_night_activity_ratio"]:
-                    is_suspicious = True
-                    suspicious_reasons.append("LATE_NIGHT_ACTIVITY")
-                
-                # Analysis 4: Multiple unique destinations (possible scanning)
-                unique_destinations = len(set(log.DestinationIP for log in user_logs))
-                if unique_destinations > settings.ANALYSIS_THRESHOLDS["multiple_destinations"]:
-                    is_suspicious = True
-                    suspicious_reasons.append("MULTIPLE_DESTINATIONS")
-                
-                # Analysis 5: Unusual service usage patterns
-                services_used = set(log.Service for log in user_logs)
-                if len(services_used) > settings.ANALYSIS_THRESHOLDS["unusual_services_count"]:
-                    is_suspicious = True
-                    suspicious_reasons.append("UNUSUAL_SERVICES")
-                
-                # Analysis 6: Short duration but high data sessions (possible data exfiltration)
-                for log in user_logs:
-                    duration_minutes = (log.EndTime - log.StartTime).total_seconds() / 60
-                    data_mb = (log.BytesDownload + log.BytesUpload) / (1024 * 1024)
-                    
-                    if duration_minutes < settings.ANALYSIS_THRESHOLDS["short_duration_minutes"] and data_mb > settings.ANALYSIS_THRESHOLDS["high_data_session_mb"]:
-                        is_suspicious = True
-                        if "DATA_EXFILTRATION" not in suspicious_reasons:
-                            suspicious_reasons.append("DATA_EXFILTRATION")
-                        break
-                
-                # If user is found suspicious, mark them and add to list
-                if is_suspicious:
-                    # Update user's suspicious status in database
-                    user.IsSuspicious = True
-                    user.SuspiciousType = suspicious_reasons
-                    session.add(user)
-                    suspicious_users.append(user)
-
-                if limit and len(suspicious_users) >= limit:
-                    break
+            self.crud.bulk_update_suspicion_status(session, {a: suspicious_types[a] for a in flagged})
+            suspicious_users = self.crud.get_users_by_aadhaar(session, flagged)
             
-            session.commit()
             logger.info(f"Found {len(suspicious_users)} suspicious users.")
             return suspicious_users
             
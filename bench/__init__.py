@@ -0,0 +1,13 @@
+# bench/__init__.py
+"""
+Benchmark suite for ingest, the suspicious scan and investigation queries.
+
+Datasets are generated with the Generator package at fixed seeds and sizes,
+each size is timed in its own process against a fresh database, and the
+results are written as JSON so runs can be compared. Run it with
+``python main.py bench``.
+"""
+from bench.datasets import DATASET_SIZES, DEFAULT_SEED, ensure_dataset
+from bench.runner import run_benchmark
+
+__all__ = ["DATASET_SIZES", "DEFAULT_SEED", "ensure_dataset", "run_benchmark"]
@@ -0,0 +1,93 @@
+# bench/runner.py
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from bench.datasets import DEFAULT_SEED, ensure_dataset
+
+logger = get_logger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Settings that change what is being measured, recorded so results are only compared like for like
+RECORDED_SETTINGS = (
+    "DB_PERFORMANCE_PROFILE",
+    "IPDR_STORAGE_LAYOUT",
+    "IPDR_PARTITIONING",
+    "IPDR_READ_MODE",
+    "MAX_BATCH_SIZE",
+    "INCREMENTAL_SCORING",
+    "NETWORK_ANALYSIS_MAX_DEPTH",
+)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_scenario(dataset: Dict[str, Any], repeat: int, database_url: Optional[str]) -> Dict[str, Any]:
+    """Run bench.scenario in a child process bound to a scratch database."""
+    with tempfile.TemporaryDirectory(prefix="ipdr_bench_") as scratch:
+        output = Path(scratch) / "result.json"
+        env = dict(os.environ)
+        env["DATABASE_URL"] = database_url or f"sqlite:///{Path(scratch) / 'bench.db'}"
+        command = [sys.executable, "-m", "bench.scenario", "--users", dataset["users_csv"],
+                   "--ipdr", dataset["ipdr_csv"], "--repeat", str(repeat), "--output", str(output)]
+        subprocess.run(command, cwd=PROJECT_ROOT, env=env, check=True)
+        return json.loads(output.read_text(encoding="utf-8"))
+
+
+def run_benchmark(
+    sizes: List[str],
+    seed: int = DEFAULT_SEED,
+    repeat: int = 3,
+    output: Optional[str] = None,
+    database_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Benchmark ingest, the suspicious scan and investigation queries for each
+    dataset size and write the results as JSON.
+
+    Each size runs in its own process against a fresh database: a temporary
+    SQLite file unless `database_url` names an empty scratch database.
+
+    Returns:
+        The results, with the JSON path under "output".
+    """
+    started_at = datetime.now()
+    results: Dict[str, Any] = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+        "database": "scratch sqlite" if database_url is None else database_url.split("://")[0],
+        "settings": {name: getattr(settings, name) for name in RECORDED_SETTINGS},
+        "runs": {},
+    }
+
+    for size in sizes:
+        dataset = ensure_dataset(size, seed)
+        logger.info(f"⏱️ Benchmarking {size} dataset...")
+        run = _run_scenario(dataset, repeat, database_url)
+        results["runs"][size] = {"dataset": dataset, **run}
+
+    output_path = Path(output or Path(settings.BENCH_RESULTS_PATH) / f"bench_{started_at:%Y%m%d_%H%M%S}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2, default=str), encoding="utf-8")
+    results["output"] = str(output_path)
+    return results
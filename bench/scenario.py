@@ -0,0 +1,195 @@
+# bench/scenario.py
+"""
+One benchmark run against a fresh database: parse, load, suspicious scan and
+investigation queries over a generated dataset.
+
+Run as ``python -m bench.scenario`` by the runner, in its own process with
+DATABASE_URL pointing at a scratch database, so the application engine is
+bound to it and peak RSS covers this dataset only.
+"""
+import argparse
+import csv
+import json
+import re
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.database import engine, init_db
+from app.core.logger import get_logger, log_performance
+from app.crud import user_crud, ipdr_crud, user_activity_crud
+from app.operators.dummy_parser import UserCSVParser
+from app.operators.ipdr_log_parser import IPDRLogCSVParser
+from app.services.investigation_service import InvestigationService
+from app.services.user_service import UserService
+
+logger = get_logger(__name__)
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the kernel's peak-RSS mark so the next `peak_rss_mb` covers only
+    what runs after it. Linux only; returns False where the mark cannot be reset.
+    """
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _proc_status_mb(field: str) -> float:
+    """A kB figure of /proc/self/status in MB. Raises OSError or AttributeError where it is unavailable."""
+    status = Path("/proc/self/status").read_text()
+    return round(int(re.search(rf"{field}:\s+(\d+)", status).group(1)) / 1024, 1)
+
+
+def current_rss_mb() -> float:
+    """Resident set size right now, or 0.0 where /proc is unavailable."""
+    try:
+        return _proc_status_mb("VmRSS")
+    except (OSError, AttributeError):
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size since the last `reset_peak_rss`, or of the whole process where it cannot be reset."""
+    try:
+        # VmHWM honours clear_refs resets; ru_maxrss does not
+        return _proc_status_mb("VmHWM")
+    except (OSError, AttributeError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Scenario:
+    """Times each benchmark phase and collects the results as a JSON-ready dict."""
+
+    def __init__(self, users_csv: str, ipdr_csv: str, repeat: int = 3):
+        self.users_csv = users_csv
+        self.ipdr_csv = ipdr_csv
+        self.repeat = repeat
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.process_peak_rss_mb = 0.0
+
+    def _record(self, name: str, timings: List[float], start_rss: Optional[float]):
+        """`start_rss` is the RSS the phase started from, None where the peak could not be reset for it."""
+        peak = peak_rss_mb()
+        self.process_peak_rss_mb = max(self.process_peak_rss_mb, peak)
+        self.phases[name] = {
+            "seconds": round(statistics.median(timings), 4),
+            "min_seconds": round(min(timings), 4),
+            "runs": len(timings),
+        }
+        if start_rss is None:
+            # Without a resettable peak the figure is the process high-water mark so far
+            self.phases[name]["process_peak_rss_mb"] = peak
+        else:
+            # Freed memory stays with the process, so the phase's own share is its growth over the start
+            self.phases[name].update(peak_rss_mb=peak, rss_growth_mb=round(max(peak - start_rss, 0.0), 1))
+        log_performance(f"bench.{name}", statistics.median(timings))
+
+    def _time(self, name: str, func: Callable[[], Any], repeat: int = 1,
+              setup: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Run `func` `repeat` times and record the median and the peak RSS of
+        the runs, calling `setup` untimed before each run. Returns the last result.
+        """
+        timings = []
+        result = None
+        start_rss = current_rss_mb() if reset_peak_rss() else None
+        for _ in range(repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        self._record(name, timings, start_rss)
+        return result
+
+    def run(self) -> Dict[str, Any]:
+        init_db()
+        self._time_parse()
+        self._time_load()
+
+        with Session(engine) as session:
+            def mark_users_pending():
+                user_activity_crud.mark_pending(session)
+                session.commit()
+
+            # Incremental scoring skips users scored before, so every timed run starts with all of them pending
+            suspicious = self._time("find_suspicious_users",
+                                    lambda: UserService().find_suspicious_users(session), self.repeat,
+                                    setup=mark_users_pending)
+            self.phases["find_suspicious_users"]["users_flagged"] = len(suspicious)
+            if settings.INCREMENTAL_SCORING:
+                # Steady state: a run with no activity changed since the last one
+                self._time("find_suspicious_users_unchanged",
+                           lambda: UserService().find_suspicious_users(session), self.repeat)
+
+            # The first flagged user, or any user, in a stable order so runs investigate the same person
+            target = suspicious[0].AadhaarNo if suspicious else user_crud.read_multi(session, limit=1)[0].AadhaarNo
+            investigation = InvestigationService()
+            self._time("get_user_summary", lambda: investigation.get_user_summary(session, target), self.repeat)
+
+            for depth in range(1, settings.NETWORK_ANALYSIS_MAX_DEPTH + 1):
+                cluster = self._time(f"analyze_network_cluster_depth{depth}",
+                                     lambda: investigation.analyze_network_cluster(session, target, depth=depth),
+                                     self.repeat)
+                self.phases[f"analyze_network_cluster_depth{depth}"].update(
+                    nodes=len(cluster.get("nodes", [])), edges=len(cluster.get("edges", [])))
+
+        return {"target_aadhaar": target, "phases": self.phases,
+                "peak_rss_mb": max(self.process_peak_rss_mb, peak_rss_mb())}
+
+    def _time_parse(self):
+        """CSV parsing and row conversion alone, without touching the database."""
+        for name, parser, path in (
+            ("parse_users", UserCSVParser(user_crud), self.users_csv),
+            ("parse_ipdr", IPDRLogCSVParser(ipdr_crud), self.ipdr_csv),
+        ):
+            def parse():
+                rows = 0
+                with open(path, mode='r', encoding='utf-8', newline='') as csvfile:
+                    for row in csv.DictReader(csvfile):
+                        parser._transform_row(row)
+                        rows += 1
+                return rows
+
+            rows = self._time(name, parse)
+            self.phases[name].update(rows=rows, rows_per_second=round(rows / self.phases[name]["seconds"], 1))
+
+    def _time_load(self):
+        """Full CSV to database ingest, as `load-data` runs it."""
+        reject_path = str(Path(settings.BENCH_RESULTS_PATH) / "bench_rejects.csv")
+        with Session(engine) as session:
+            stats = self._time("load_users", lambda: UserCSVParser(user_crud).parse_and_load(self.users_csv, session))
+            self.phases["load_users"].update(rows=stats["created"])
+
+            stats = self._time("load_ipdr", lambda: IPDRLogCSVParser(ipdr_crud, reject_path=reject_path)
+                               .parse_and_load(self.ipdr_csv, session))
+            self.phases["load_ipdr"].update(rows=stats["loaded"], rejected=stats["rejected"],
+                                            rows_per_second=stats["rows_per_second"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one benchmark scenario against DATABASE_URL")
+    parser.add_argument("--users", required=True, help="User CSV")
+    parser.add_argument("--ipdr", required=True, help="IPDR CSV")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query phase (median is reported)")
+    parser.add_argument("--output", required=True, help="JSON file for the results")
+    args = parser.parse_args()
+
+    result = Scenario(args.users, args.ipdr, repeat=args.repeat).run()
+    Path(args.output).write_text(json.dumps(result, indent=2, default=str), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,15 +16,36 @@ Usage Examples:
     # Load sample data
     python main.py load-data
     
+    # Generate a dataset straight into DATABASE_URL, skipping CSV
+    python main.py generate-db --users 5000 --hours 720 --records-per-hour 10000 --seed 42
+    
     # Run investigation demo
     python main.py demo
     
     # Investigate specific user
     python main.py investigate 922027456759
     
+    # Create missing indexes on an existing database
+    python main.py index --benchmark
+    
+    # Move IPDR logs into day/week partitions and drop old ones
+    python main.py partition --retain-days 90
+    
+    # Convert IPDR logs to the compact layout (with IPDR_STORAGE_LAYOUT=compact)
+    python main.py compact-storage
+    
+    # Export IPDR logs to Parquet for columnar analytics
+    python main.py export-columnar
+    
+    # Benchmark ingest, suspicious scan and investigation
+    python main.py bench --sizes 10k 1m
+    
     # Show system status
     python main.py status
     
+    # Time each phase of a command (add --profile-dump for cProfile/tracemalloc in logs/)
+    python main.py --profile investigate 922027456759
+    
     # Get help
     python main.py --help
 
@@ -34,6 +55,7 @@ License: Proprietary - For Investigation Use Only
 """
 
 import sys
+import time
 import argparse
 from pathlib import Path
 from typing import Optional
@@ -42,14 +64,23 @@ from typing import Optional
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.core.logger import get_logger
-from app.core.database import init_db, check_db_connection
+from app.core.database import init_db, check_db_connection, get_performance_profile
 from app.core.config import settings, validate_configuration
+from app.core import profiling
+from app.core.metrics import write_command_metrics
 
 # Import handlers
 from app.handlers.load_data_handler import LoadDataHandler
+from app.handlers.generate_data_handler import GenerateDataHandler
 from app.handlers.suspicious_analysis_handler import SuspiciousAnalysisHandler
+from app.handlers.export_columnar_handler import ExportColumnarHandler
+from app.handlers.partition_handler import PartitionHandler
+from app.handlers.compact_storage_handler import CompactStorageHandler
 from app.handlers.demo_handler import DemoHandler
 from app.handlers.investigation_handler import InvestigationHandler
+from app.handlers.index_handler import IndexHandler
+from app.handlers.bench_handler import BenchHandler
+from bench import DATASET_SIZES
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -138,9 +169,42 @@ def show_system_status():
     print(f"   📊 Max batch size: {settings.MAX_BATCH_SIZE}")
     print(f"   📈 Max query results: {settings.MAX_QUERY_RESULTS}")
     print(f"   🌐 Network analysis depth: {settings.NETWORK_ANALYSIS_MAX_DEPTH}")
+    print(f"   🧮 Suspicious scoring: {'incremental' if settings.INCREMENTAL_SCORING else 'full scan'}")
+    print(f"   🧱 IPDR read mode: {settings.IPDR_READ_MODE}")
+    print(f"   🗓️  IPDR partitioning: {settings.IPDR_PARTITIONING}")
+    print(f"   🗜️  IPDR storage layout: {settings.IPDR_STORAGE_LAYOUT}")
+    metrics = f"{settings.METRICS_PATH}/ipdr_<command>.prom" if settings.METRICS_EXPORT else "disabled"
+    print(f"   📈 Metrics export: {metrics}")
+    persistent = "persistent" if settings.GEOIP_PERSISTENT_CACHE else "in-memory only"
+    print(f"   🗺️  GeoIP cache: {settings.GEOIP_CACHE_SIZE:,} entries ({persistent})")
+    try:
+        profile = get_performance_profile()
+        details = ", ".join(f"{key}={value}" for key, value in profile.items() if key not in ("name", "dialect"))
+        print(f"   🏎️  DB profile: {profile['name']} ({profile['dialect']}: {details})")
+    except Exception:
+        print(f"   🏎️  DB profile: {settings.DB_PERFORMANCE_PROFILE} (database unreachable)")
     
     print("\n" + "=" * 50)
 
+def show_profile():
+    """Stop profiling and print the per-phase breakdown, plus where any dumps were written."""
+    dumps = profiling.finish()
+    print("\n⏱️  PROFILE (wall time and SQL statements per phase)")
+    print("=" * 92)
+    print(profiling.report())
+    print("=" * 92)
+    for path in dumps:
+        print(f"   📝 {path}")
+    print()
+
+def export_metrics(command: str, duration: float, succeeded: bool):
+    """Write this run's metrics for a node_exporter textfile collector. Never fails the command."""
+    try:
+        path = write_command_metrics(command, duration, succeeded, settings.METRICS_PATH)
+        logger.info(f"📈 Metrics written to {path}")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write metrics: {e}")
+
 def main():
     """
     Main entry point for the IPDR Analysis System.
@@ -153,9 +217,16 @@ def main():
         epilog="""
 Examples:
   %(prog)s load-data              Load sample data for analysis
+  %(prog)s generate-db --clear    Generate a dataset straight into the database
   %(prog)s demo                   Run investigation demonstration
   %(prog)s investigate 922027456759  Investigate specific user
+  %(prog)s index --benchmark      Create indexes and compare query latency
+  %(prog)s partition --retain-days 90  Partition IPDR logs and drop old ones
+  %(prog)s compact-storage        Convert IPDR logs to the compact layout
+  %(prog)s export-columnar        Write a Parquet snapshot for columnar analytics
+  %(prog)s bench --sizes 10k 1m   Benchmark ingest, suspicious scan and investigation
   %(prog)s status                 Show system status
+  %(prog)s --profile investigate 922027456759  Print a per-phase timing and SQL breakdown
   
 For detailed documentation, see the docs/ directory.
         """
@@ -170,8 +241,25 @@ For detailed documentation, see the docs/ directory.
     # Clear and reload command
     clear_parser = subparsers.add_parser('clear-reload', help='Clear existing data and reload fresh sample data')
     
+    # Generate into database command
+    generate_parser = subparsers.add_parser('generate-db', help='Generate users and IPDR logs straight into the database')
+    generate_parser.add_argument('--users', type=int, default=100,
+                                 help='Number of users to generate (default: 100)')
+    generate_parser.add_argument('--hours', type=int, default=24,
+                                 help='Time window in hours, ending now (default: 24)')
+    generate_parser.add_argument('--records-per-hour', type=int, default=100,
+                                 help='IPDR logs per hour (default: 100)')
+    generate_parser.add_argument('--suspicious-ratio', type=float, default=0.1,
+                                 help='Share of suspicious users (default: 0.1)')
+    generate_parser.add_argument('--seed', type=int, default=None,
+                                 help='Seed for reproducible users and logs')
+    generate_parser.add_argument('--clear', action='store_true',
+                                 help='Delete existing users and IPDR logs first')
+    
     # Suspicious analysis command
     suspicious_parser = subparsers.add_parser('suspicious', help='Analyze suspicious users and activities')
+    suspicious_parser.add_argument('--workers', type=int, default=None,
+                                   help='Worker processes for report generation (default: all CPU cores)')
     
     # Demo command
     demo_parser = subparsers.add_parser('demo', help='Run investigation demonstration')
@@ -180,6 +268,42 @@ For detailed documentation, see the docs/ directory.
     investigate_parser = subparsers.add_parser('investigate', help='Investigate specific user')
     investigate_parser.add_argument('aadhaar', help='12-digit Aadhaar number to investigate')
     
+    # Index command
+    index_parser = subparsers.add_parser('index', help='Create missing database indexes without reloading data')
+    index_parser.add_argument('--benchmark', action='store_true',
+                              help='Time the hot IPDR queries before and after index creation')
+    
+    # Partition command
+    partition_parser = subparsers.add_parser('partition', help='Move IPDR logs into time partitions and apply retention')
+    retention_group = partition_parser.add_mutually_exclusive_group()
+    retention_group.add_argument('--drop-before', metavar='YYYY-MM-DD', default=None,
+                                 help='Drop partitions that end on or before this date')
+    retention_group.add_argument('--retain-days', type=int, default=None,
+                                 help='Drop partitions older than this many days')
+    
+    # Compact storage command
+    compact_parser = subparsers.add_parser('compact-storage', help='Convert IPDR logs to the compact storage layout')
+    
+    # Columnar export command
+    export_parser = subparsers.add_parser('export-columnar', help='Export IPDR logs to a day-partitioned Parquet snapshot')
+    export_parser.add_argument('--output', default=None,
+                               help='Snapshot directory (default: COLUMNAR_EXPORT_PATH)')
+    
+    # Benchmark command
+    bench_parser = subparsers.add_parser('bench', help='Benchmark ingest, suspicious scan and investigation on generated data')
+    bench_parser.add_argument('--sizes', nargs='+', choices=list(DATASET_SIZES), default=['10k'],
+                              help='Dataset sizes in IPDR records (default: 10k)')
+    bench_parser.add_argument('--seed', type=int, default=None,
+                              help='Generator seed (default: 42)')
+    bench_parser.add_argument('--repeat', type=int, default=3,
+                              help='Runs per query phase, the median is reported')
+    bench_parser.add_argument('--output', default=None,
+                              help='Results JSON file (default: BENCH_RESULTS_PATH/bench_<timestamp>.json)')
+    bench_parser.add_argument('--compare', metavar='RESULTS_JSON', default=None,
+                              help='Earlier results file to compare against')
+    bench_parser.add_argument('--database-url', default=None,
+                              help='Empty scratch database to benchmark on (default: a temporary SQLite file)')
+    
     # Status command
     status_parser = subparsers.add_parser('status', help='Show system status')
     
@@ -191,6 +315,12 @@ For detailed documentation, see the docs/ directory.
     parser.add_argument('--debug', action='store_true', 
                        help='Enable debug mode')
     
+    # Profiling flags
+    parser.add_argument('--profile', action='store_true',
+                       help='Print a per-phase timing and SQL query breakdown after the command')
+    parser.add_argument('--profile-dump', action='store_true',
+                       help='With --profile, also write cProfile stats and tracemalloc top allocations to logs/')
+    
     # Parse arguments
     args = parser.parse_args()
     
@@ -200,19 +330,25 @@ For detailed documentation, see the docs/ directory.
         logging.getLogger().setLevel(logging.DEBUG)
         logger.info("🐛 Debug mode enabled")
     
+    started = time.perf_counter()
+    succeeded = False
+    if args.profile or args.profile_dump:
+        profiling.enable(name=args.command, dump=args.profile_dump)
+    
     # Show banner
     show_banner()
     
-    # Initialize database
-    try:
-        init_db()
-        logger.info("✅ Database initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Database initialization failed: {str(e)}")
-        return 1
-    
-    # Execute command using handlers
+    # Initialize the database and execute the command using handlers; both
+    # are guarded so a failed run still exports its metrics
     try:
+        try:
+            with profiling.span("init_db"):
+                init_db()
+            logger.info("✅ Database initialized successfully")
+        except Exception as e:
+            logger.error(f"❌ Database initialization failed: {str(e)}")
+            return 1
+        
         if args.command == 'load-data':
             handler = LoadDataHandler()
             handler.handle()
@@ -221,8 +357,15 @@ For detailed documentation, see the docs/ directory.
             handler = LoadDataHandler(clear_data=True)
             handler.handle()
         
+        elif args.command == 'generate-db':
+            handler = GenerateDataHandler(users=args.users, hours=args.hours,
+                                          records_per_hour=args.records_per_hour,
+                                          suspicious_ratio=args.suspicious_ratio, seed=args.seed,
+                                          clear_data=args.clear)
+            handler.handle()
+        
         elif args.command == 'suspicious':
-            handler = SuspiciousAnalysisHandler()
+            handler = SuspiciousAnalysisHandler(workers=args.workers)
             handler.handle()
         
         elif args.command == 'demo':
@@ -233,9 +376,31 @@ For detailed documentation, see the docs/ directory.
             handler = InvestigationHandler(args.aadhaar)
             handler.handle()
         
+        elif args.command == 'index':
+            handler = IndexHandler(benchmark=args.benchmark)
+            handler.handle()
+        
+        elif args.command == 'partition':
+            handler = PartitionHandler(drop_before=args.drop_before, retain_days=args.retain_days)
+            handler.handle()
+            
+        elif args.command == 'compact-storage':
+            handler = CompactStorageHandler()
+            handler.handle()
+        
+        elif args.command == 'export-columnar':
+            handler = ExportColumnarHandler(output_path=args.output)
+            handler.handle()
+        
+        elif args.command == 'bench':
+            handler = BenchHandler(sizes=args.sizes, seed=args.seed, repeat=args.repeat, output=args.output,
+                                   compare=args.compare, database_url=args.database_url)
+            handler.handle()
+        
         elif args.command == 'status':
             show_system_status()
         
+        succeeded = True
         return 0
     except Exception as e:
         logger.error(f"A critical error occurred: {e}")
@@ -243,6 +408,11 @@ For detailed documentation, see the docs/ directory.
             import traceback
             traceback.print_exc()
         return 1
+    finally:
+        if profiling.is_enabled():
+            show_profile()
+        if settings.METRICS_EXPORT:
+            export_metrics(args.command, time.perf_counter() - started, succeeded)
 
 
 if __name__ == "__main__":